@@ -23,6 +23,10 @@ class JWTAuthentication(BaseAuthentication):
 
         token = auth_token[1]
 
+        return self.authenticate_token(token)
+
+    def authenticate_token(self, token):
+
         try:
             payload = jwt.decode(
                 token, settings.SECRET_KEY, algorithms="HS256")
@@ -45,4 +49,18 @@ class JWTAuthentication(BaseAuthentication):
             raise exceptions.AuthenticationFailed(
                 'No such user')
 
+
+class QueryTokenJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that also takes the token from ?token= when there is no
+    Authorization header. Only for endpoints browsers open with EventSource,
+    which cannot set request headers.
+    """
+
+    def authenticate(self, request):
+
+        token = request.query_params.get('token')
+        if token and not get_authorization_header(request):
+            return self.authenticate_token(token)
+
         return super().authenticate(request)
\ No newline at end of file
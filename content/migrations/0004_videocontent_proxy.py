@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:11
+
+import content.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0003_warningcontent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videocontent',
+            name='proxy',
+            field=models.FileField(blank=True, null=True, upload_to=content.models.video_proxy_upload_to),
+        ),
+        migrations.AddField(
+            model_name='videocontent',
+            name='proxy_status',
+            field=models.CharField(blank=True, choices=[('', 'none'), ('pending', 'pending'), ('running', 'running'), ('ready', 'ready'), ('failed', 'failed')], db_index=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='videocontent',
+            name='proxy_worker',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_videocontent_proxy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='videocontent',
+            name='proxy_status',
+            field=models.CharField(blank=True, choices=[('', 'none'), ('probe', 'probe pending'), ('probing', 'probing'), ('pending', 'pending'), ('running', 'running'), ('ready', 'ready'), ('failed', 'failed')], db_index=True, default='', max_length=10),
+        ),
+    ]
@@ -8,7 +8,22 @@ def video_upload_to(instance, filename: str) -> str:
     return f"videos/{instance.owner_id}/{filename}"
 
 
+def video_proxy_upload_to(instance, filename: str) -> str:
+    # MEDIA_ROOT/proxies/videos/<user_id>/<filename>
+    return f"proxies/videos/{instance.owner_id}/{filename}"
+
+
 class VideoContent(models.Model):
+    PROXY_STATUS_CHOICES = (
+        ("", "none"),
+        ("probe", "probe pending"),   # metadata not read yet (render workers probe uploads)
+        ("probing", "probing"),
+        ("pending", "pending"),
+        ("running", "running"),
+        ("ready", "ready"),
+        ("failed", "failed"),
+    )
+
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -17,6 +32,12 @@ class VideoContent(models.Model):
     name = models.CharField(max_length=255)
     file = models.FileField(upload_to=video_upload_to)  # /media/videos/<uid>/...
     duration_seconds = models.FloatField(null=True, blank=True)  # optional
+    # low-res H.264 copy that preview renders read instead of `file` (built by the render workers)
+    proxy = models.FileField(upload_to=video_proxy_upload_to, null=True, blank=True)
+    proxy_status = models.CharField(
+        max_length=10, choices=PROXY_STATUS_CHOICES, default="", blank=True, db_index=True
+    )
+    proxy_worker = models.CharField(max_length=128, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -8,7 +8,8 @@ class VideoContentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = VideoContent
-        fields = ["id", "name", "file_url", "duration_seconds", "created_at"]
+        fields = ["id", "name", "file_url", "duration_seconds", "proxy_status", "created_at"]
+        read_only_fields = ["proxy_status"]
 
     def get_file_url(self, obj: VideoContent) -> str:
         request = self.context.get("request")
@@ -1,6 +1,7 @@
 # content/views_videos.py
 import pathlib, uuid, mimetypes, urllib.request
 from urllib.parse import urlparse
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.utils.text import get_valid_filename
 from rest_framework import permissions, status, generics
@@ -36,7 +37,8 @@ class VideoUploadView(APIView):
             return Response({"error": f"unsupported type: {mt or 'unknown'}"}, status=400)
 
         filename = _unique_name(f.name)
-        asset = VideoContent(owner=request.user, name=f.name)
+        # metadata (duration, probe cache, proxy decision) is read by an idle render worker
+        asset = VideoContent(owner=request.user, name=f.name, proxy_status="probe")
         asset.file.save(filename, f, save=True)
 
         ser = VideoContentSerializer(asset, context={"request": request})
@@ -72,7 +74,7 @@ class VideoFetchView(APIView):
         original_name = pathlib.Path(parsed.path).name or f"remote{suffix}"
         filename = _unique_name(original_name)
 
-        asset = VideoContent(owner=request.user, name=original_name)
+        asset = VideoContent(owner=request.user, name=original_name, proxy_status="probe")
         asset.file.save(filename, ContentFile(content), save=True)
 
         ser = VideoContentSerializer(asset, context={"request": request})
@@ -1,3 +1,4 @@
+import json
 import os
 import shutil
 from pathlib import Path
@@ -67,6 +68,73 @@ ASSET_FALLBACK_DIRS = [
 ]
 VIDEOS_ROOT = BASE_DIR / "videos"
 VIDEOS_URL = "/videos/"
+# Asset path index: how often (at most) a lookup miss re-checks the indexed dirs' mtimes for new files.
+ASSET_INDEX_RESCAN_SECONDS = float(os.environ.get("ASSET_INDEX_RESCAN_SECONDS", "5"))
+
+# ───────────────────────────── Render workers ─────────────────────────────
+# API views enqueue RenderJob rows; `python manage.py render_worker` executes them.
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "2"))
+RENDER_WORKER_POLL_SECONDS = float(os.environ.get("RENDER_WORKER_POLL_SECONDS", "1.0"))
+# Host-wide cap on concurrent ffmpeg jobs across all worker processes (0 = CPUs // THREADS_PER_JOB);
+# each job gets an explicit thread budget, optionally pinned to its own CPUs (AFFINITY).
+RENDER_MAX_CONCURRENT = int(os.environ.get("RENDER_MAX_CONCURRENT", "0"))
+RENDER_THREADS_PER_JOB = int(os.environ.get("RENDER_THREADS_PER_JOB", "4"))
+RENDER_CPU_AFFINITY = os.environ.get("RENDER_CPU_AFFINITY", "0") == "1"
+# Workers stop claiming jobs while the 1-minute load average exceeds this per CPU (0 = never).
+RENDER_MAX_LOAD_PER_CPU = float(os.environ.get("RENDER_MAX_LOAD_PER_CPU", "0"))
+# New render requests get 429 + Retry-After once this many jobs are queued (0 = unlimited).
+RENDER_MAX_QUEUED = int(os.environ.get("RENDER_MAX_QUEUED", "50"))
+RENDER_SCHEDULER_DIR = os.environ.get("RENDER_SCHEDULER_DIR", os.path.join(BASE_DIR, "cache", "scheduler"))
+# Jobs dispatch by priority (interactive preview > still > final > batch). Each worker process runs
+# INTERACTIVE_WORKERS extra threads for previews/stills, which may use INTERACTIVE_SLOTS beyond the cap;
+# final/batch ffmpeg processes run at these nice values so they yield CPU to interactive encodes.
+RENDER_INTERACTIVE_WORKERS = int(os.environ.get("RENDER_INTERACTIVE_WORKERS", "1"))
+RENDER_INTERACTIVE_SLOTS = int(os.environ.get("RENDER_INTERACTIVE_SLOTS", "1"))
+RENDER_FINAL_NICE = int(os.environ.get("RENDER_FINAL_NICE", "5"))
+RENDER_BATCH_NICE = int(os.environ.get("RENDER_BATCH_NICE", "10"))
+# Within a priority class users get renders in weighted fair share of recent CPU-seconds (WINDOW);
+# USER_WEIGHTS is a JSON object {user id: weight}; USER_MAX_RUNNING caps a user's running final/batch jobs (0 = no cap).
+RENDER_FAIR_SHARE_WINDOW_SECONDS = float(os.environ.get("RENDER_FAIR_SHARE_WINDOW_SECONDS", "3600"))
+RENDER_USER_WEIGHTS = json.loads(os.environ.get("RENDER_USER_WEIGHTS", "{}"))
+RENDER_USER_MAX_RUNNING = int(os.environ.get("RENDER_USER_MAX_RUNNING", "2"))
+# Recent finished renders the cost model is calibrated against (explain endpoint).
+RENDER_COST_CALIBRATION_JOBS = int(os.environ.get("RENDER_COST_CALIBRATION_JOBS", "200"))
+# Long final renders are split into parallel segment encodes joined by stream-copy concat.
+RENDER_SEGMENTED_FINAL = os.environ.get("RENDER_SEGMENTED_FINAL", "1") == "1"
+# Static layouts (no video/animated tracks) are composed once per visible-set change and encoded as a still loop.
+RENDER_STILL_FASTPATH = os.environ.get("RENDER_STILL_FASTPATH", "1") == "1"
+# Live progress: worker writes at most once per interval; the SSE endpoint is a long-poll that
+# answers with the next change or closes empty after WAIT seconds (EventSource reconnects).
+RENDER_PROGRESS_INTERVAL_SECONDS = float(os.environ.get("RENDER_PROGRESS_INTERVAL_SECONDS", "1.0"))
+RENDER_PROGRESS_WAIT_SECONDS = float(os.environ.get("RENDER_PROGRESS_WAIT_SECONDS", "5"))
+# Video previews also stream as fMP4/HLS (media/previews/<rid>/index.m3u8) while they encode.
+RENDER_PREVIEW_HLS = os.environ.get("RENDER_PREVIEW_HLS", "1") == "1"
+# A new preview cancels in-flight ones for the same user/project; identical in-flight requests share one job.
+RENDER_PREVIEW_COALESCE = os.environ.get("RENDER_PREVIEW_COALESCE", "1") == "1"
+# Uploaded videos get a <=720p H.264 short-GOP proxy (built by idle render workers) that previews read instead.
+RENDER_PROXIES = os.environ.get("RENDER_PROXIES", "1") == "1"
+RENDER_PROXY_MAX_DIM = int(os.environ.get("RENDER_PROXY_MAX_DIM", "720"))
+# Remote/local timeline assets are resolved by this many threads per request (pooled keep-alive HTTP).
+RENDER_LOCALIZE_WORKERS = int(os.environ.get("RENDER_LOCALIZE_WORKERS", "8"))
+
+# Finished renders keyed by timeline + asset fingerprints; LRU-evicted past the byte cap.
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", os.path.join(BASE_DIR, "cache", "renders"))
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+
+# Remote assets are downloaded once per host into a content-addressed cache shared by all processes;
+# entries older than FRESH_SECONDS are revalidated (ETag/Last-Modified), LRU-evicted past the byte cap.
+# Entries used within MIN_AGE_SECONDS are never evicted: queued renders reference them by path.
+ASSET_CACHE_DIR = os.environ.get("ASSET_CACHE_DIR", os.path.join(BASE_DIR, "cache", "assets"))
+ASSET_CACHE_MAX_BYTES = int(os.environ.get("ASSET_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+ASSET_CACHE_FRESH_SECONDS = float(os.environ.get("ASSET_CACHE_FRESH_SECONDS", "300"))
+ASSET_CACHE_MIN_AGE_SECONDS = float(os.environ.get("ASSET_CACHE_MIN_AGE_SECONDS", "3600"))
+
+# Rasterized shape sprites (content-addressed PNGs), LRU-evicted past the byte cap.
+SPRITE_CACHE_DIR = os.environ.get("SPRITE_CACHE_DIR", os.path.join(BASE_DIR, "cache", "sprites"))
+SPRITE_CACHE_MAX_BYTES = int(os.environ.get("SPRITE_CACHE_MAX_BYTES", str(256 * 1024 ** 2)))
+
+# ffprobe results (audio/duration/dimensions/codec/GOP) keyed by path + size + mtime.
+PROBE_CACHE_PATH = os.environ.get("PROBE_CACHE_PATH", os.path.join(BASE_DIR, "cache", "probe.sqlite3"))
 
 TEMPLATES = [
     {
@@ -19,7 +19,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
-from django.views.static import serve as media_serve
+from render.ranged_media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -31,7 +31,7 @@ urlpatterns = [
     path('api/', include('content.urls')),
 ]
 
-# Serve MEDIA files at /media/... even when DEBUG=False
+# Serve MEDIA files at /media/... even when DEBUG=False (range-aware: video seeking, HLS previews)
 urlpatterns += [
-    re_path(r'^media/(?P<path>.*)$', media_serve, {'document_root': settings.MEDIA_ROOT}),
+    re_path(r'^media/(?P<path>.*)$', serve_media),
 ]
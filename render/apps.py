@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class RenderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'render'
+
+    def ready(self):
+        from django.conf import settings
+        from .ffmpegkit import probe
+        from .ffmpegkit.shapes import sprite
+        from .asset_index import connect_signals
+
+        # ffmpegkit stays Django-free; hand it the configured cache location here.
+        path = getattr(settings, "PROBE_CACHE_PATH", None)
+        if path:
+            probe.PROBE_CACHE_PATH = str(path)
+        sprite_dir = getattr(settings, "SPRITE_CACHE_DIR", None)
+        if sprite_dir:
+            sprite.SPRITE_DIR = str(sprite_dir)
+        sprite.SPRITE_MAX_BYTES = int(getattr(settings, "SPRITE_CACHE_MAX_BYTES", sprite.SPRITE_MAX_BYTES))
+
+        # keep the asset path index in step with uploads and deletes
+        connect_signals()
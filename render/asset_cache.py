@@ -0,0 +1,264 @@
+# render/asset_cache.py
+"""
+Shared on-disk cache for remote timeline assets.
+
+Downloads land content-addressed under ASSET_CACHE_DIR (blobs/<sha256><ext>),
+so every API process and render worker on the host reuses one copy, and two
+URLs serving the same bytes share it. A sqlite index shared by all processes
+maps URL -> blob together with the validators the server sent (ETag,
+Last-Modified), tracks blob sizes and last use for LRU eviction by total
+bytes, and keeps hit/miss/byte/eviction counters.
+
+A URL is downloaded by one process at a time: the fetcher holds an exclusive
+flock on locks/<sha256(url)>.lock, and everyone waiting on it re-reads the
+index once the lock is released. Entries older than ASSET_CACHE_FRESH_SECONDS
+are revalidated with a conditional GET; a 304 keeps the cached blob.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # no cross-process single-flight without flock; downloads may be duplicated
+    fcntl = None
+
+# (connect, read) seconds; the read timeout applies between chunks, not to the whole download
+DOWNLOAD_TIMEOUT = (5, 30)
+DOWNLOAD_CHUNK_BYTES = 1 << 16
+
+
+def _cache_dir() -> str:
+    return str(getattr(settings, "ASSET_CACHE_DIR", os.path.join(str(settings.BASE_DIR), "cache", "assets")))
+
+
+def _max_bytes() -> int:
+    return int(getattr(settings, "ASSET_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+
+def _fresh_seconds() -> float:
+    return float(getattr(settings, "ASSET_CACHE_FRESH_SECONDS", 300))
+
+
+def _min_age_seconds() -> float:
+    return float(getattr(settings, "ASSET_CACHE_MIN_AGE_SECONDS", 3600))
+
+
+def _connect() -> sqlite3.Connection:
+    root = _cache_dir()
+    os.makedirs(root, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS blobs ("
+        " digest TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs(last_used)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS urls ("
+        " url TEXT PRIMARY KEY, digest TEXT NOT NULL, etag TEXT, last_modified TEXT, checked REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS urls_digest ON urls(digest)")
+    conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    return conn
+
+
+def _bump(conn: sqlite3.Connection, name: str, by: int = 1) -> None:
+    conn.execute(
+        "INSERT INTO counters(name, value) VALUES(?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, by),
+    )
+
+
+@contextmanager
+def _url_lock(url: str):
+    """Exclusive per-URL lock shared by every process (and thread) on this host."""
+    if fcntl is None:
+        yield
+        return
+    lock_dir = os.path.join(_cache_dir(), "locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    fd = os.open(os.path.join(lock_dir, f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # closing the descriptor releases the flock
+
+
+def _lookup(conn: sqlite3.Connection, url: str):
+    """(path, etag, last_modified, checked) for a URL whose blob is still on disk, else None."""
+    row = conn.execute(
+        "SELECT b.path, u.etag, u.last_modified, u.checked FROM urls u JOIN blobs b ON b.digest = u.digest"
+        " WHERE u.url = ?",
+        (url,),
+    ).fetchone()
+    if row and os.path.isfile(row[0]):
+        return row
+    if row:
+        conn.execute("DELETE FROM urls WHERE url = ?", (url,))
+    return None
+
+
+def _touch(conn: sqlite3.Connection, path: str) -> None:
+    conn.execute("UPDATE blobs SET last_used = ? WHERE path = ?", (time.time(), path))
+
+
+def _download(session, url: str, headers: dict):
+    """
+    GET url into the cache. Returns None on 304 Not Modified, else
+    (digest, path, size, etag, last_modified).
+    """
+    root = _cache_dir()
+    tmp_dir = os.path.join(root, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4().hex}.part")
+
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT, headers=headers) as r:
+            if r.status_code == 304:
+                return None
+            r.raise_for_status()
+            etag = r.headers.get("ETag")
+            last_modified = r.headers.get("Last-Modified")
+            with open(tmp_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    f.write(chunk)
+                    h.update(chunk)
+                    size += len(chunk)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    digest = h.hexdigest()
+    # keep the extension: ffmpeg picks demuxers/decoders for images by it
+    ext = os.path.splitext(urlparse(url).path)[1][:16]
+    path = os.path.join(root, "blobs", digest[:2], f"{digest}{ext}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.isfile(path):
+        os.remove(tmp_path)  # same content already cached (possibly under another URL)
+    else:
+        os.replace(tmp_path, path)
+    return digest, path, size, etag, last_modified
+
+
+def fetch(url: str, session) -> tuple[str, str]:
+    """
+    Local path for a remote asset, downloading it at most once across processes.
+    `session` is a requests.Session. Returns (path, "cache" | "download").
+    """
+    conn = _connect()
+    try:
+        row = _lookup(conn, url)
+        if row and time.time() - row[3] < _fresh_seconds():
+            _touch(conn, row[0])
+            _bump(conn, "hits")
+            return row[0], "cache"
+
+        with _url_lock(url):
+            # whoever held the lock may have just fetched or revalidated it
+            row = _lookup(conn, url)
+            if row and time.time() - row[3] < _fresh_seconds():
+                _touch(conn, row[0])
+                _bump(conn, "hits")
+                return row[0], "cache"
+
+            headers = {}
+            if row:
+                if row[1]:
+                    headers["If-None-Match"] = row[1]
+                if row[2]:
+                    headers["If-Modified-Since"] = row[2]
+            try:
+                got = _download(session, url, headers)
+            except Exception:
+                if row is None:
+                    raise
+                # origin unreachable: a stale copy beats failing the render
+                _touch(conn, row[0])
+                _bump(conn, "stale_hits")
+                return row[0], "cache"
+
+            now_ts = time.time()
+            if got is None:
+                conn.execute("UPDATE urls SET checked = ? WHERE url = ?", (now_ts, url))
+                _touch(conn, row[0])
+                _bump(conn, "hits")
+                _bump(conn, "revalidations")
+                return row[0], "cache"
+
+            digest, path, size, etag, last_modified = got
+            conn.execute(
+                "INSERT OR REPLACE INTO blobs(digest, path, size, last_used) VALUES(?, ?, ?, ?)",
+                (digest, path, size, now_ts),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO urls(url, digest, etag, last_modified, checked) VALUES(?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, now_ts),
+            )
+            _bump(conn, "misses")
+            _bump(conn, "downloaded_bytes", size)
+            _evict(conn, _max_bytes(), keep=digest)
+            return path, "download"
+    finally:
+        conn.close()
+
+
+def _evict(conn: sqlite3.Connection, max_bytes: int, keep: str | None = None) -> None:
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+    if total <= max_bytes:
+        return
+    # queued renders reference blobs by path: recently used ones are kept even past the cap
+    cutoff = time.time() - _min_age_seconds()
+    rows = conn.execute(
+        "SELECT digest, path, size FROM blobs WHERE last_used < ? AND digest != ? ORDER BY last_used",
+        (cutoff, keep or ""),
+    ).fetchall()
+    for digest, path, size in rows:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+        conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        total -= size
+        _bump(conn, "evictions")
+        _bump(conn, "evicted_bytes", size)
+
+
+def stats() -> dict:
+    conn = _connect()
+    try:
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        blobs, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        urls = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "urls": urls,
+        "blobs": blobs,
+        "bytes": total,
+        "max_bytes": _max_bytes(),
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+        "revalidations": counters.get("revalidations", 0),
+        "stale_hits": counters.get("stale_hits", 0),
+        "downloaded_bytes": counters.get("downloaded_bytes", 0),
+        "evictions": counters.get("evictions", 0),
+        "evicted_bytes": counters.get("evicted_bytes", 0),
+    }
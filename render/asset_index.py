@@ -0,0 +1,259 @@
+# render/asset_index.py
+"""
+In-memory index of locally stored assets.
+
+Timeline sources arrive as URLs or URL paths (/media/videos/1/clip.mp4,
+https://host/static/logo.png, videos/intro.mp4, ...). Instead of probing
+MEDIA_ROOT, STATIC_ROOT, every ASSET_FALLBACK_DIRS entry and VIDEOS_ROOT with
+os.path.isfile for every candidate on every render, each process keeps a map
+from URL path (leading slashes stripped, unquoted) to absolute file path:
+
+  - uploaded content (the content app's models and LockedContent) under MEDIA_URL
+  - every file under STATIC_ROOT (as STATIC_URL paths), the fallback dirs and VIDEOS_ROOT
+
+A hit costs one stat to confirm the file is still there. Uploads and deletes in
+this process update the map through model signals; changes made by other
+processes are picked up from directory mtimes, checked at most every
+ASSET_INDEX_RESCAN_SECONDS. Files under MEDIA_URL that are not indexed yet
+(backgrounds, another worker's upload) are probed directly and remembered.
+"""
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+
+# (app_label, model) whose `file` field points into MEDIA_ROOT
+CONTENT_MODELS = (
+    ("content", "VideoContent"),
+    ("content", "ImageContent"),
+    ("content", "WarningContent"),
+    ("render", "LockedContent"),
+)
+
+# typed timeline references: "<kind>:<pk>" -> (app_label, model)
+REF_MODELS = {
+    "video": ("content", "VideoContent"),
+    "image": ("content", "ImageContent"),
+    "warning": ("content", "WarningContent"),
+}
+_REF_RE = re.compile(r"^(%s):(\d+)$" % "|".join(REF_MODELS))
+
+
+def _url_prefix(url: str) -> str:
+    """MEDIA_URL / STATIC_URL as a key prefix: no leading slash, one trailing slash."""
+    url = (url or "").lstrip("/")
+    if url and not url.endswith("/"):
+        url += "/"
+    return url
+
+
+def _rescan_seconds() -> float:
+    return float(getattr(settings, "ASSET_INDEX_RESCAN_SECONDS", 5))
+
+
+class AssetIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._media: dict[str, str] = {}  # uploaded content, kept current by model signals
+        self._files: dict[str, str] = {}  # static/fallback/videos dirs, rebuilt when a dir changes
+        self._dirs: dict[str, int] = {}   # every walked directory -> mtime_ns when walked
+        self._built = False
+        self._checked = 0.0
+
+    # ---- building ----
+
+    def _walk(self, root: str, prefixes: tuple[str, ...]) -> None:
+        """Index every file under root as <prefix><relative path>; the first root to claim a key wins."""
+        if not root or not os.path.isdir(root):
+            return
+        found = []
+        for dirpath, _dirnames, filenames in os.walk(root):
+            try:
+                self._dirs[dirpath] = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+            rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+            for name in filenames:
+                rel = name if rel_dir == "." else f"{rel_dir}/{name}"
+                found.append((rel, os.path.join(dirpath, name)))
+        for prefix in prefixes:
+            for rel, path in found:
+                self._files.setdefault(prefix + rel, path)
+
+    def _index_content(self) -> None:
+        from django.apps import apps
+
+        media_prefix = _url_prefix(getattr(settings, "MEDIA_URL", ""))
+        media_root = getattr(settings, "MEDIA_ROOT", None)
+        self._media = {}
+        if not media_root:
+            return
+        for app_label, model_name in CONTENT_MODELS:
+            try:
+                model = apps.get_model(app_label, model_name)
+            except LookupError:
+                continue
+            for name in model.objects.exclude(file="").values_list("file", flat=True):
+                if name:
+                    self._media[media_prefix + name] = os.path.join(str(media_root), name)
+
+    def _index_dirs(self) -> None:
+        self._files = {}
+        self._dirs = {}
+        static_root = getattr(settings, "STATIC_ROOT", None)
+        if static_root:
+            self._walk(str(static_root), (_url_prefix(getattr(settings, "STATIC_URL", "")),))
+
+        # "videos/<rel>" also resolves against each dir's own <rel> (legacy video URLs)
+        for base in getattr(settings, "ASSET_FALLBACK_DIRS", []):
+            self._walk(str(base), ("", "videos/"))
+        videos_root = getattr(settings, "VIDEOS_ROOT", None)
+        if videos_root:
+            self._walk(str(videos_root), ("", "videos/"))
+        self._checked = time.monotonic()
+
+    def ensure_built(self) -> None:
+        """Build the index (queries the content models, so call it from a request/worker thread)."""
+        with self._lock:
+            if not self._built:
+                self._index_content()
+                self._index_dirs()
+                self._built = True
+
+    def _dirs_changed(self) -> bool:
+        for d, mtime in self._dirs.items():
+            try:
+                if os.stat(d).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _maybe_rescan(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked < _rescan_seconds():
+            return False
+        self._checked = now
+        if not self._dirs_changed():
+            return False
+        self._index_dirs()
+        return True
+
+    # ---- lookups ----
+
+    def _probe_media(self, key: str) -> str | None:
+        media_prefix = _url_prefix(getattr(settings, "MEDIA_URL", ""))
+        media_root = getattr(settings, "MEDIA_ROOT", None)
+        if not media_root or not media_prefix or not key.startswith(media_prefix):
+            return None
+        root = os.path.realpath(str(media_root))
+        candidate = os.path.realpath(os.path.join(root, key[len(media_prefix):]))
+        if os.path.commonpath([root, candidate]) != root or not os.path.isfile(candidate):
+            return None  # "..", absolute parts and symlinks must not escape MEDIA_ROOT
+        self._media[key] = candidate
+        return candidate
+
+    def _lookup(self, table: dict, key: str) -> str | None:
+        path = table.get(key)
+        if path and os.path.isfile(path):
+            return path
+        if path:
+            del table[key]
+        return None
+
+    def resolve(self, key: str) -> str | None:
+        """Absolute path of the local file served at URL path `key`, or None."""
+        self.ensure_built()
+        with self._lock:
+            hit = self._lookup(self._media, key) or self._probe_media(key) or self._lookup(self._files, key)
+            if hit is None and self._maybe_rescan():
+                hit = self._lookup(self._files, key)
+            return hit
+
+    # ---- invalidation ----
+
+    def add(self, name: str) -> None:
+        """Index a file stored in MEDIA_ROOT under storage name `name`."""
+        media_root = getattr(settings, "MEDIA_ROOT", None)
+        if not name or not media_root:
+            return
+        key = _url_prefix(getattr(settings, "MEDIA_URL", "")) + name
+        with self._lock:
+            self._media[key] = os.path.join(str(media_root), name)
+
+    def discard(self, name: str) -> None:
+        if not name:
+            return
+        key = _url_prefix(getattr(settings, "MEDIA_URL", "")) + name
+        with self._lock:
+            self._media.pop(key, None)
+
+
+ASSET_INDEX = AssetIndex()
+
+
+def _on_content_saved(sender, instance, **kwargs):
+    if instance.file:
+        ASSET_INDEX.add(instance.file.name)
+
+
+def _on_content_deleted(sender, instance, **kwargs):
+    if instance.file:
+        ASSET_INDEX.discard(instance.file.name)
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    for app_label, model_name in CONTENT_MODELS:
+        sender = f"{app_label}.{model_name}"
+        post_save.connect(_on_content_saved, sender=sender, dispatch_uid=f"asset_index_save_{sender}")
+        post_delete.connect(_on_content_deleted, sender=sender, dispatch_uid=f"asset_index_delete_{sender}")
+
+
+# ---- typed references ----
+
+def parse_ref(src) -> tuple[str, int] | None:
+    """('video', 123) for a typed reference like "video:123", else None."""
+    m = _REF_RE.match(src) if isinstance(src, str) else None
+    return (m.group(1), int(m.group(2))) if m else None
+
+
+def resolve_refs(refs, owner) -> dict[str, str]:
+    """
+    {"video:123": absolute path, ...} for typed references to `owner`'s content, looked
+    up in a single query. Raises LookupError for a reference that does not exist or
+    belongs to someone else, FileNotFoundError when its file is gone from MEDIA_ROOT.
+    """
+    from django.apps import apps
+    from django.db.models import CharField, Value
+
+    by_kind: dict[str, set] = {}
+    for ref in refs:
+        kind, pk = parse_ref(ref)
+        by_kind.setdefault(kind, set()).add(pk)
+    if not by_kind:
+        return {}
+
+    qs = None
+    for kind, pks in by_kind.items():
+        model = apps.get_model(*REF_MODELS[kind])
+        q = (
+            model.objects.filter(owner=owner, pk__in=pks).order_by()
+            .annotate(kind=Value(kind, output_field=CharField()))
+            .values_list("pk", "file", "kind")
+        )
+        qs = q if qs is None else qs.union(q, all=True)
+
+    media_root = str(settings.MEDIA_ROOT)
+    found = {f"{kind}:{pk}": os.path.join(media_root, name) for pk, name, kind in qs if name}
+    out = {}
+    for ref in refs:
+        if ref not in found:
+            raise LookupError(f"unknown asset reference: {ref}")
+        if not os.path.isfile(found[ref]):
+            raise FileNotFoundError(f"asset not found: {ref}")
+        out[ref] = found[ref]
+    return out
@@ -0,0 +1,153 @@
+# render/explain.py
+"""
+Dry-run planning: what a render would do and cost, without running ffmpeg.
+
+The explain endpoint builds exactly the plan a render worker would (same proxies,
+cache key, preview window, still/segmented fast paths and thread budget), then
+prices it with the ffmpegkit cost model. The model's raw CPU-seconds are
+calibrated per (kind, mode, plan type) against recently finished renders: every
+job records its predicted CPU in stats["cost"] next to the measured
+cpu_seconds, and the median ratio over the last RENDER_COST_CALIBRATION_JOBS
+such jobs scales the prediction. Wall time divides that by the median number
+of cores those jobs kept busy (cpu_seconds / run time).
+"""
+import os
+import shutil
+import statistics
+import tempfile
+
+from django.conf import settings
+
+from . import render_cache, scheduler
+from .ffmpegkit.builder import _preview_timeline
+from .ffmpegkit.cost import default_parallelism, estimate, plan_commands, plan_cost, plan_type
+from .ffmpegkit.flatten import FlattenReport
+from .ffmpegkit.segments import SegmentedPlan
+from .ffmpegkit.stills import StillPlan
+from .jobs import _proxies_enabled, _use_proxies, build_plan, cache_variant
+from .models import RenderJob
+
+# fewer matching jobs than this and the uncalibrated model is used
+MIN_CALIBRATION_SAMPLES = 3
+
+
+def _calibration_jobs() -> int:
+    return int(getattr(settings, "RENDER_COST_CALIBRATION_JOBS", 200))
+
+
+def calibration(kind: str, mode: str, plan: str) -> dict:
+    """
+    {"samples", "cpu_scale", "parallelism"} from recent uncached renders of this kind,
+    mode and plan type; cpu_scale 1.0 and parallelism None when there are too few.
+    """
+    rows = (
+        RenderJob.objects.filter(status="done", kind=kind, mode=mode, cache_hit=False, cpu_seconds__gt=0,
+                                 started_at__isnull=False, finished_at__isnull=False)
+        .order_by("-finished_at")
+        .values_list("cpu_seconds", "started_at", "finished_at", "stats")[:_calibration_jobs()]
+    )
+    scales, cores = [], []
+    for cpu, started_at, finished_at, stats in rows:
+        predicted = ((stats or {}).get("cost") or {})
+        if predicted.get("plan") != plan or not predicted.get("cpu_seconds"):
+            continue
+        scales.append(cpu / predicted["cpu_seconds"])
+        run = (finished_at - started_at).total_seconds()
+        if run > 0:
+            cores.append(cpu / run)
+    if len(scales) < MIN_CALIBRATION_SAMPLES:
+        return {"samples": len(scales), "cpu_scale": 1.0, "parallelism": None}
+    return {
+        "samples": len(scales),
+        "cpu_scale": round(statistics.median(scales), 4),
+        "parallelism": round(statistics.median(cores), 3) if cores else None,
+    }
+
+
+def _commands(plan) -> list[dict]:
+    cmds = plan_commands(plan)
+    if isinstance(plan, StillPlan):
+        roles = ["still"] * len(plan.still_cmds) + ["encode"]
+    elif isinstance(plan, SegmentedPlan):
+        roles = ["segment"] * len(plan.segment_cmds) + (["audio"] if plan.audio_cmd else []) + ["concat"]
+    else:
+        roles = ["render"]
+    out = []
+    for role, args in zip(roles, cmds):
+        graph = args[args.index("-filter_complex") + 1] if "-filter_complex" in args else None
+        out.append({"role": role, "filter_complex": graph, "args": args})
+    return out
+
+
+def explain_render(timeline: dict, kind: str, mode: str) -> dict:
+    """
+    Plan, optimizations and cost estimate for rendering a validated, localized timeline.
+    Raises ValueError when the filtergraph can't be built.
+    """
+    proxies = 0
+    if mode == "preview" and _proxies_enabled():
+        try:
+            timeline, proxies = _use_proxies(timeline)
+        except Exception:
+            pass
+
+    try:
+        key = render_cache.cache_key(timeline, cache_variant(kind, mode))
+        hit = bool(key) and render_cache.contains(key)
+    except Exception:
+        key, hit = None, False
+
+    threads = scheduler.slot_threads()
+    hls = kind == "video" and mode == "preview" and bool(getattr(settings, "RENDER_PREVIEW_HLS", True))
+    report = FlattenReport()
+    outdir = tempfile.mkdtemp(prefix="explain_")
+    workdir = None
+    try:
+        output_abs = os.path.join(outdir, "explain.png" if kind == "image" else "explain.mp4")
+        try:
+            tl, plan, args, workdir = build_plan(timeline, kind, mode, output_abs, hls=hls,
+                                                 threads=threads, report=report)
+        except Exception as e:
+            raise ValueError(f"Failed to build ffmpeg graph: {e}") from e
+        plan = plan or args
+        features = plan_cost(tl, plan)
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    ptype = plan_type(plan)
+    cal = calibration(kind, mode, ptype)
+    parallelism = cal["parallelism"] or default_parallelism(plan, threads)
+
+    window = None
+    if mode == "preview" and any(timeline.get(k) is not None for k in ("previewStart", "previewEnd", "previewFps")):
+        start = float(timeline.get("previewStart") or 0.0)
+        window = {"start": start, "end": start + tl.duration, "fps": tl.fps}
+    downscaled = kind == "image" or mode == "preview"
+
+    return {
+        "kind": kind,
+        "mode": mode,
+        "plan": ptype,
+        "commands": _commands(plan),
+        "optimizations": {
+            "cache": {"cacheable": key is not None, "hit": hit},
+            "proxies": proxies,
+            "preview_downscale": downscaled and _preview_timeline(tl).width != tl.width,
+            "still_fastpath": {"stills": len(plan.still_cmds)} if isinstance(plan, StillPlan) else None,
+            "segmented": (
+                {"segments": len(plan.segment_cmds), "threads_per_segment": plan.threads_per_segment}
+                if isinstance(plan, SegmentedPlan) else None
+            ),
+            "flatten": report.as_dict(),
+            "window": window,
+        },
+        "cost": {
+            "features": features.as_dict(),
+            "threads": threads,
+            "parallelism": round(parallelism, 3),
+            "calibration": cal,
+            **estimate(features, cal["cpu_scale"], parallelism),
+        },
+    }
@@ -0,0 +1,135 @@
+# render/fairshare.py
+"""
+Weighted fair-share dispatch between users.
+
+Within a priority class, the next job goes to the user with the least usage per
+unit of weight, where usage is the CPU-seconds their renders burned over the
+last RENDER_FAIR_SHARE_WINDOW_SECONDS plus, for their running jobs, the time
+elapsed so far times the job's thread budget (the CPU it can burn meanwhile). Weights come from RENDER_USER_WEIGHTS ({user id: weight},
+default 1). A user with RENDER_USER_MAX_RUNNING final/batch renders running gets
+no further ones until one finishes; interactive previews and stills are never
+held back by the cap, so an export does not block its owner's previews. Ties
+go to the user whose oldest job has waited longest, which is plain arrival
+order when only one user is rendering.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min, OuterRef, Subquery, Sum
+from django.utils.timezone import now
+
+from . import scheduler
+from .models import RenderJob
+
+
+def _window_seconds() -> float:
+    return float(getattr(settings, "RENDER_FAIR_SHARE_WINDOW_SECONDS", 3600))
+
+
+def _max_running() -> int:
+    return int(getattr(settings, "RENDER_USER_MAX_RUNNING", 2))
+
+
+def _weight(user_id) -> float:
+    weights = getattr(settings, "RENDER_USER_WEIGHTS", {}) or {}
+    w = weights.get(str(user_id), weights.get(user_id, 1.0))
+    return max(float(w), 1e-6)
+
+
+def _usage(at) -> tuple[dict, dict]:
+    """({user_id: usage seconds}, {user_id: running final/batch jobs})."""
+    usage: dict = {}
+    capped: dict = {}
+    recent = (
+        RenderJob.objects.filter(finished_at__gte=at - timedelta(seconds=_window_seconds()),
+                                 cpu_seconds__isnull=False)
+        .values("user").annotate(cpu=Sum("cpu_seconds")).order_by()
+    )
+    for row in recent:
+        usage[row["user"]] = row["cpu"] or 0.0
+    running = RenderJob.objects.filter(status="running").values_list("user", "priority", "started_at", "stats")
+    for user_id, priority, started_at, stats in running:
+        if started_at:
+            # jobs record their slot once the plan is built; until then assume an idle-host slot
+            threads = ((stats or {}).get("slot") or {}).get("threads") or scheduler.slot_threads()
+            elapsed = max(0.0, (at - started_at).total_seconds())
+            usage[user_id] = usage.get(user_id, 0.0) + elapsed * threads
+        if priority >= RenderJob.PRIORITY_FINAL:
+            capped[user_id] = capped.get(user_id, 0) + 1
+    return usage, capped
+
+
+def candidates(max_priority: int | None = None):
+    """
+    Queued job ids in dispatch order: priority class first, then weighted
+    fair share between users, then arrival. Each user's next job per class comes
+    from the same grouped query.
+    """
+    queued = RenderJob.objects.filter(status="queued")
+    if max_priority is not None:
+        queued = queued.filter(priority__lte=max_priority)
+    head = (
+        queued.filter(priority=OuterRef("priority"), user=OuterRef("user"))
+        .order_by("created_at", "id").values("id")[:1]
+    )
+    heads = list(
+        queued.values("priority", "user").annotate(oldest=Min("created_at"), head=Subquery(head))
+        .order_by("priority", "oldest")
+    )
+    if not heads:
+        return
+    at = now()
+    usage, capped = _usage(at)
+    limit = _max_running()
+
+    by_priority: dict = {}
+    for h in heads:
+        by_priority.setdefault(h["priority"], []).append(h)
+    for priority in sorted(by_priority):
+        users = by_priority[priority]
+        if limit > 0 and priority >= RenderJob.PRIORITY_FINAL:
+            users = [h for h in users if capped.get(h["user"], 0) < limit]
+        users.sort(key=lambda h: (usage.get(h["user"], 0.0) / _weight(h["user"]), h["oldest"]))
+        for h in users:
+            if h["head"] is not None:
+                yield h["head"]
+
+
+def queue_stats() -> dict:
+    """Per-user queue depth, waits, running jobs and fair-share usage, for the admin stats view."""
+    at = now()
+    since = at - timedelta(seconds=_window_seconds())
+    usage, _capped = _usage(at)
+    users: dict = {}
+
+    def row(user_id):
+        return users.setdefault(user_id, {
+            "user": user_id, "queued": 0, "running": 0, "oldest_wait_seconds": None,
+            "recent_started": 0, "avg_wait_seconds": None, "usage_seconds": 0.0,
+            "weight": _weight(user_id),
+        })
+
+    for user_id, created_at in RenderJob.objects.filter(status="queued").values_list("user", "created_at"):
+        r = row(user_id)
+        r["queued"] += 1
+        wait = (at - created_at).total_seconds()
+        r["oldest_wait_seconds"] = max(r["oldest_wait_seconds"] or 0.0, round(wait, 3))
+    for user_id in RenderJob.objects.filter(status="running").values_list("user", flat=True):
+        row(user_id)["running"] += 1
+
+    waits: dict = {}
+    started = RenderJob.objects.filter(started_at__gte=since).values_list("user", "created_at", "started_at")
+    for user_id, created_at, started_at in started:
+        waits.setdefault(user_id, []).append((started_at - created_at).total_seconds())
+    for user_id, ws in waits.items():
+        r = row(user_id)
+        r["recent_started"] = len(ws)
+        r["avg_wait_seconds"] = round(sum(ws) / len(ws), 3)
+    for user_id, u in usage.items():
+        row(user_id)["usage_seconds"] = round(u, 3)
+
+    return {
+        "window_seconds": _window_seconds(),
+        "max_running_per_user": _max_running(),
+        "users": sorted(users.values(), key=lambda r: (-r["queued"], -r["running"])),
+    }
@@ -1,3 +1,4 @@
-from .builder import build_ffmpeg_cmd
+from .builder import build_ffmpeg_cmd, BUILDER_VERSION
+from .ir import Timeline, compile_timeline
 
-__all__ = ["build_ffmpeg_cmd"]
+__all__ = ["build_ffmpeg_cmd", "BUILDER_VERSION", "Timeline", "compile_timeline"]
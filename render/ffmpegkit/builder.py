@@ -1,14 +1,18 @@
 from __future__ import annotations
 
-import json
-import subprocess
 import os
+from functools import partial
 from typing import List, Tuple, Literal
 
 from .background import _bg_filters, _bg_image_filters
-from .media import _media_filters
+from .ir import Track, Timeline, compile_timeline
+from .media import _media_filters, _audio_chain, _media_input_flags
+from .inputs import plan_media_inputs
+from .flatten import Layer, FlattenReport, emit_layers
 from .textdraw import _emit_text_overlay
 from .audio import _audio_mix_filters
+from .probe import probe_many, probe_media
+from .hls import hls_keyframe_args, hls_tee_output
 from .shapes.circle import _emit_circle_overlays
 from .shapes.triangle import _emit_triangle_overlays
 from .shapes.rectangle import _emit_rectangle_overlays
@@ -19,121 +23,90 @@ from .shapes.weather import _emit_weather_overlays
 
 Mode = Literal["preview", "final"]
 
-# Preview downscale cap (speed boost). Set to None to disable.
+# Bump whenever the emitted commands change rendered output (invalidates render caches).
+BUILDER_VERSION = 4
+
+# Preview canvas cap (speed boost): larger timelines are composed scaled down. Set to None to disable.
 PREVIEW_MAX_DIM = (1280, 720)  # (W, H)
 
 
 def _input_has_audio(src: str) -> bool:
-    try:
-        out = subprocess.check_output(
-            [
-                "ffprobe",
-                "-v", "error",
-                "-select_streams", "a",
-                "-show_entries", "stream=index",
-                "-of", "json",
-                src,
-            ],
-            stderr=subprocess.STDOUT,
-        )
-        data = json.loads(out.decode("utf-8", "ignore"))
-        return bool(data.get("streams"))
-    except Exception:
-        return False
-
-
-def _build_filtergraph_and_inputs(tl: dict, positive_duration: float) -> Tuple[
+    meta = probe_media(src)
+    return bool(meta and meta.get("has_audio"))
+
+
+def _with_fps(emitter, fps: int, t: Track, last_v: str, vcount: int):
+    return emitter(t, last_v, vcount, fps)
+
+
+def _build_filtergraph_and_inputs(tl: Timeline, positive_duration: float, with_audio: bool = True,
+                                  report: FlattenReport | None = None) -> Tuple[
     str,  # filter_complex
     str,  # last_v label
     List[List[str]],  # input flags per input
     List[str],  # input srcs
     List[str],  # audio labels (may be empty)
     int,  # FPS
-    int, int,  # W, H (output canvas before optional preview downscale)
+    int, int,  # W, H (output canvas)
 ]:
-    W, H = int(tl["width"]), int(tl["height"])
-    FPS = int(tl.get("fps", 30))
-    tracks = sorted(tl.get("tracks", []), key=lambda t: t.get("z", 0))
-    bg_color = tl.get("background") or "#000000"
-
-    bg_image = tl.get("backgroundImage") or None
-    bg_opacity = float(tl.get("backgroundOpacity") if tl.get("backgroundOpacity") is not None else 1.0)
-    bg_fit = tl.get("backgroundFit") or "cover"
+    W, H = tl.width, tl.height
+    FPS = tl.fps
+    tracks = tl.tracks  # z order
+    bg_image = tl.background_image
 
     # ---------------- Inputs ----------------
     input_flags: List[List[str]] = []
     input_srcs: List[str] = []
 
+    # One batched, cached probe for every A/V input (usually zero ffprobe processes)
+    probes = probe_many(t.src for t in tl.media("video", "audio")) if with_audio else {}
+
     bg_img_input_idx = None
     if bg_image:
         input_flags.append(["-loop", "1", "-t", f"{positive_duration}"])
-        input_srcs.append(str(bg_image))
+        input_srcs.append(bg_image)
         bg_img_input_idx = 0
 
-    for t in tracks:
-        typ = t.get("type")
-        if typ == "image":
-            input_flags.append(["-loop", "1", "-t", f"{positive_duration}"])
-            input_srcs.append(str(t["src"]))
-            t["_in_idx"] = len(input_srcs) - 1
-            t["_has_audio"] = False
-        elif typ in ("video", "audio"):
-            input_flags.append([])
-            input_srcs.append(str(t["src"]))
-            t["_in_idx"] = len(input_srcs) - 1
-            t["_has_audio"] = _input_has_audio(t["src"])
+    # One input per unique source (+ window); shared ones fan out via split/asplit
+    fanout_filters = plan_media_inputs(tracks, positive_duration, probes, input_flags, input_srcs)
 
     # ---------------- Filters ----------------
     filters: List[str] = []
-    filters += _bg_filters(W, H, FPS, bg_color)  # solid color base
+    filters += _bg_filters(W, H, FPS, tl.background)  # solid color base
+    filters += fanout_filters
     last_v = "[base]"
     vcount = 0
 
     # Background image
-    bg_filters, last_v = _bg_image_filters(bg_img_input_idx, last_v, W, H, bg_fit, bg_opacity)
+    bg_filters, last_v = _bg_image_filters(bg_img_input_idx, last_v, W, H, tl.background_fit,
+                                           tl.background_opacity)
     filters += bg_filters
 
     # Media
     media_filters, last_v, vcount, audio_labels = _media_filters(tracks, last_v, vcount)
     filters += media_filters
 
-    # Text overlays
-    for t in tracks:
-        if t.get("type") in ("text", "datetime"):
-            txt_filters, last_v, vcount = _emit_text_overlay(t, last_v, vcount)
-            filters += txt_filters
-
-    # Vector shapes
-    for t in tracks:
-        if t.get("type") == "circle":
-            circ_filters, last_v, vcount = _emit_circle_overlays(t, last_v, vcount, FPS)
-            filters += circ_filters
-    for t in tracks:
-        if t.get("type") == "triangle":
-            tri_filters, last_v, vcount = _emit_triangle_overlays(t, last_v, vcount, FPS)
-            filters += tri_filters
-    for t in tracks:
-        if t.get("type") == "rectangle":
-            rect_filters, last_v, vcount = _emit_rectangle_overlays(t, last_v, vcount, FPS)
-            filters += rect_filters
-    for t in tracks:
-        if t.get("type") == "line":
-            line_filters, last_v, vcount = _emit_line_overlays(t, last_v, vcount, FPS)
-            filters += line_filters
-    for t in tracks:
-        if t.get("type") == "ellipse":
-            ell_filters, last_v, vcount = _emit_ellipse_overlays(t, last_v, vcount, FPS)
-            filters += ell_filters
-
-    # Sign / Weather
+    # Text, vector shapes, sign / weather: described as layers (same order as always),
+    # then flattened into as few per-frame overlays as possible
+    layers: List[Layer] = []
     for t in tracks:
-        if t.get("type") == "sign":
-            sign_filters, last_v, vcount = _emit_sign_overlays(t, last_v, vcount, FPS)
-            filters += sign_filters
-    for t in tracks:
-        if t.get("type") == "weather":
-            wx_filters, last_v, vcount = _emit_weather_overlays(t, last_v, vcount, FPS)
-            filters += wx_filters
+        if t.type in ("text", "datetime"):
+            layers.append(Layer(t, _emit_text_overlay))
+    for typ, emitter in (
+        ("circle", _emit_circle_overlays),
+        ("triangle", _emit_triangle_overlays),
+        ("rectangle", _emit_rectangle_overlays),
+        ("line", _emit_line_overlays),
+        ("ellipse", _emit_ellipse_overlays),
+        ("sign", _emit_sign_overlays),
+        ("weather", _emit_weather_overlays),
+    ):
+        for t in tracks:
+            if t.type == typ:
+                layers.append(Layer(t, partial(_with_fps, emitter, FPS)))
+
+    layer_filters, last_v, vcount = emit_layers(layers, last_v, vcount, W, H, FPS, positive_duration, report)
+    filters += layer_filters
 
     filter_complex = ";".join(filters)
     return filter_complex, last_v, input_flags, input_srcs, audio_labels, FPS, W, H
@@ -157,11 +130,16 @@ def _encode_settings(mode: Mode) -> dict:
     }
 
 
-def _threading_flags() -> List[str]:
-    # Let ffmpeg pick sensible defaults; still expose for clarity
-    threads = "0"  # auto
-    # Filter graph threading: use a conservative parallelism
-    filter_threads = str(max(2, (os.cpu_count() or 4) // 2))
+def _threading_flags(threads: int | None = None) -> List[str]:
+    if threads:
+        # Explicit budget (e.g. one of several parallel segment encodes)
+        filter_threads = str(max(1, int(threads)))
+        threads = str(max(1, int(threads)))
+    else:
+        # Let ffmpeg pick sensible defaults; still expose for clarity
+        threads = "0"  # auto
+        # Filter graph threading: use a conservative parallelism
+        filter_threads = str(max(2, (os.cpu_count() or 4) // 2))
     return [
         "-threads", threads,
         "-filter_threads", filter_threads,
@@ -169,50 +147,48 @@ def _threading_flags() -> List[str]:
         "-nostdin",
         "-hide_banner",
         "-loglevel", "error",
+        # machine-readable key=value progress blocks on stdout (parsed by the render runner)
+        "-progress", "pipe:1",
+        "-nostats",
     ]
 
 
-def _maybe_add_preview_downscale(filter_complex: str, last_v: str, W: int, H: int, mode: Mode):
+def _preview_timeline(tl: Timeline) -> Timeline:
     """
-    Optionally append a fast downscale for preview to speed encoding.
-    Returns (filter_complex, last_v).
+    The timeline scaled to fit within PREVIEW_MAX_DIM (aspect kept). The whole graph
+    (background, media, shapes, text) is then composed at preview size, so preview
+    cost follows preview pixels rather than output pixels.
     """
-    if mode != "preview" or not PREVIEW_MAX_DIM:
-        return filter_complex, last_v
-
+    if not PREVIEW_MAX_DIM:
+        return tl
     maxW, maxH = PREVIEW_MAX_DIM
+    W, H = tl.width, tl.height
     if W <= maxW and H <= maxH:
-        return filter_complex, last_v
-
-    # Keep aspect — scale to fit within maxW x maxH using fast_bilinear
-    # Compute with ffmpeg expressions:
-    # if a >= b: w=maxW, h=-1 else h=maxH, w=-1
-    vout = "[v_preview]"
-    scale_expr = (
-        f"{last_v}scale="
-        f"'if(gt(a,{maxW}/{maxH}),{maxW},-2)':"
-        f"'if(gt(a,{maxW}/{maxH}),-2,{maxH})'"
-        f":flags=fast_bilinear{vout}"
-    )
-    new_fc = f"{filter_complex};{scale_expr}"
-    return new_fc, vout
-
-
-def build_ffmpeg_cmd(tl: dict, output_path: str, mode: Mode = "final") -> List[str]:
+        return tl
+    return tl.scaled(min(maxW / W, maxH / H))
+
+
+def build_ffmpeg_cmd(tl: dict | Timeline, output_path: str, mode: Mode = "final", *,
+                     audio: bool = True, threads: int | None = None,
+                     closed_gop: bool = False, hls_dir: str | None = None,
+                     report: FlattenReport | None = None) -> List[str]:
     """
     Build the VIDEO command (MP4).
-    - Preview mode favors speed (ultrafast, higher CRF, optional downscale)
+    - Preview mode favors speed (ultrafast, higher CRF, composed at most PREVIEW_MAX_DIM)
     - Final mode favors quality (veryfast, CRF 20)
+    - audio=False renders video only (segments get their audio from a separate pass)
+    - threads caps encoder/filter threads; closed_gop forces closed GOPs for stream-copy concat
+    - hls_dir additionally writes a live fMP4/HLS rendition there while encoding (progressive preview)
+    - report (FlattenReport) accumulates what layer flattening removed
+    `tl` is a validated timeline dict or its compiled IR (ffmpegkit.ir).
     """
-    FPS = int(tl.get("fps", 30))
-    raw_D = float(tl.get("duration", 0.0))
-    D = raw_D if raw_D > 0 else max(1.0 / max(FPS, 1), 0.0334)  # >= one frame
+    tl = compile_timeline(tl)
+    if mode == "preview":
+        tl = _preview_timeline(tl)
+    D = tl.positive_duration  # >= one frame
 
     filter_complex, last_v, input_flags, input_srcs, audio_labels, FPS, W, H = \
-        _build_filtergraph_and_inputs(tl, D)
-
-    # Optional downscale for preview to speed up encode
-    filter_complex, last_v = _maybe_add_preview_downscale(filter_complex, last_v, W, H, mode)
+        _build_filtergraph_and_inputs(tl, D, with_audio=audio, report=report)
 
     args: List[str] = []
     # inputs
@@ -222,14 +198,16 @@ def build_ffmpeg_cmd(tl: dict, output_path: str, mode: Mode = "final") -> List[s
         args += flags + ["-i", src]
 
     # threading + logging first for global impact
-    args += _threading_flags()
+    args += _threading_flags(threads)
 
     # filtergraph
     args += ["-filter_complex", filter_complex]
 
     # mapping
     map_args: List[str] = ["-map", last_v]
-    if audio_labels:
+    if not audio:
+        map_args += ["-an"]
+    elif audio_labels:
         a_filters, afinal = _audio_mix_filters(audio_labels)
         # extend filter_complex VALUE
         try:
@@ -255,28 +233,139 @@ def build_ffmpeg_cmd(tl: dict, output_path: str, mode: Mode = "final") -> List[s
         "-crf", enc["crf"],
         "-pix_fmt", "yuv420p",
         *enc["extra"],
-        "-movflags", "+faststart",
+        *(["-flags", "+cgop"] if closed_gop else []),
+        *(hls_keyframe_args() if hls_dir else []),
         "-t", f"{D}",
         "-shortest",
         "-y",
+    ]
+    if hls_dir:
+        args += hls_tee_output(hls_dir, output_path)
+    else:
+        args += ["-movflags", "+faststart", output_path]
+    return args
+
+
+def _audio_sources(tl: Timeline, first_idx: int = 0) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Inputs (-ss/-t ... -i src) and per-track chains for every video/audio track that
+    has an audio stream, numbered from first_idx. Returns (input args, filters, labels).
+    """
+    media = tl.media("video", "audio")
+    probes = probe_many(t.src for t in media)
+
+    args: List[str] = []
+    filters: List[str] = []
+    labels: List[str] = []
+    for t in media:
+        if not (probes.get(t.src) or {}).get("has_audio"):
+            continue
+        idx = first_idx + len(labels)
+        args += _media_input_flags(t) + ["-i", t.src]
+        chain, label = _audio_chain(t, idx)
+        filters.append(chain)
+        labels.append(label)
+    return args, filters, labels
+
+
+def build_ffmpeg_audio_cmd(tl: dict | Timeline, output_path: str, *,
+                           threads: int | None = None) -> List[str] | None:
+    """
+    Build an AUDIO-only command (AAC in .m4a) mixing every video/audio track that has
+    an audio stream, exactly as build_ffmpeg_cmd would. Returns None if nothing is audible.
+    """
+    tl = compile_timeline(tl)
+    D = tl.positive_duration
+
+    args, filters, labels = _audio_sources(tl)
+    if not labels:
+        return None
+
+    a_filters, afinal = _audio_mix_filters(labels)
+    args += _threading_flags(threads)
+    args += [
+        "-filter_complex", ";".join(filters + a_filters),
+        "-map", afinal,
+        "-vn",
+        "-c:a", "aac",
+        "-t", f"{D}",
+        "-y",
         output_path,
     ]
     return args
 
 
-def build_ffmpeg_cmd_still(tl: dict, output_path: str, fmt: str = "png") -> List[str]:
+def build_ffmpeg_cmd_from_stills(tl: dict | Timeline, stills: List[Tuple[str, float]], output_path: str,
+                                 mode: Mode = "final", *, hls_dir: str | None = None,
+                                 threads: int | None = None) -> List[str]:
+    """
+    Build the VIDEO command for a timeline whose frames are fully described by a few
+    pre-composed stills: each (png, seconds) is looped at the timeline fps, the loops
+    are concatenated and encoded with x264's stillimage tuning. Audio is mixed as in
+    build_ffmpeg_cmd.
+    """
+    tl = compile_timeline(tl)
+    FPS = tl.fps
+    D = tl.positive_duration
+
+    args: List[str] = []
+    for path, seconds in stills:
+        args += ["-loop", "1", "-framerate", str(FPS), "-t", f"{seconds:.6f}", "-i", path]
+    n = len(stills)
+
+    a_args, a_chains, a_labels = _audio_sources(tl, first_idx=n)
+    args += a_args
+    args += _threading_flags(threads)
+
+    pads = "".join(f"[{i}:v]" for i in range(n))
+    filters = [f"{pads}concat=n={n}:v=1:a=0,format=yuv420p[vout]" if n > 1 else "[0:v]format=yuv420p[vout]"]
+    map_args = ["-map", "[vout]"]
+    if a_labels:
+        a_filters, afinal = _audio_mix_filters(a_labels)
+        filters += a_chains + a_filters
+        map_args += ["-map", afinal, "-c:a", "aac"]
+    else:
+        map_args += ["-an"]
+    args += ["-filter_complex", ";".join(filters), *map_args]
+
+    enc = _encode_settings(mode)
+    # repeated identical frames cost x264 almost nothing; stillimage tunes psy for flat graphics
+    tune = "stillimage,zerolatency" if mode == "preview" else "stillimage"
+    args += [
+        "-r", str(FPS),
+        "-c:v", "libx264",
+        "-preset", enc["preset"],
+        "-crf", enc["crf"],
+        "-pix_fmt", "yuv420p",
+        "-tune", tune,
+        *(hls_keyframe_args() if hls_dir else []),
+        "-t", f"{D}",
+        "-shortest",
+        "-y",
+    ]
+    if hls_dir:
+        args += hls_tee_output(hls_dir, output_path)
+    else:
+        args += ["-movflags", "+faststart", output_path]
+    return args
+
+
+def build_ffmpeg_cmd_still(tl: dict | Timeline, output_path: str, fmt: str = "png", *, downscale: bool = True,
+                           threads: int | None = None, report: FlattenReport | None = None) -> List[str]:
     """
     Build a SINGLE-FRAME render (PNG/JPG).
     Also uses threading/log optimizations for snappier stills.
+    downscale=False keeps the full canvas (frames composed for a final video).
+    threads caps filter threads (as in build_ffmpeg_cmd).
     """
-    FPS = int(tl.get("fps", 30))
-    D = max(1.0 / max(FPS, 1), 0.0334)
+    tl = compile_timeline(tl)
+    # For stills, optionally compose at preview size if canvas is huge (keeps parity with preview look)
+    if downscale:
+        tl = _preview_timeline(tl)
+    D = max(1.0 / max(tl.fps, 1), 0.0334)
 
     filter_complex, last_v, input_flags, input_srcs, _audio_labels, FPS, W, H = \
-        _build_filtergraph_and_inputs(tl, D)
-
-    # For stills, optionally downscale if canvas is huge (keeps parity with preview look)
-    filter_complex, last_v = _maybe_add_preview_downscale(filter_complex, last_v, W, H, mode="preview")
+        _build_filtergraph_and_inputs(tl, D, with_audio=False, report=report)
 
     args: List[str] = []
     for flags, src in zip(input_flags, input_srcs):
@@ -284,7 +373,7 @@ def build_ffmpeg_cmd_still(tl: dict, output_path: str, fmt: str = "png") -> List
             flags = []
         args += flags + ["-i", src]
 
-    args += _threading_flags()
+    args += _threading_flags(threads)
 
     args += [
         "-filter_complex", filter_complex,
@@ -74,9 +74,24 @@ def _ff_color(c: str | None, alpha_override: float | None = None) -> str:
         return f"{c}@{a:.3f}"
     return c
 
-def _drawtext_font_opt(t: dict) -> str:
-    font_path = t.get("fontPath")
-    font_family = t.get("fontFamily") or "Arial"
+def _alpha_byte(c: str | None, alpha_override: float | None = None) -> int:
+    """
+    The 0..255 alpha _ff_color(c, alpha_override) carries: what a shape's geq fallback
+    writes inside the shape, and what its sprite writes where a pixel is fully covered.
+    """
+    a = None
+    if c:
+        rgb_hex, a = _parse_hex_color(c.strip())
+        if not rgb_hex:
+            _rgb, a = _parse_rgb_func(c.strip())
+    if alpha_override is not None:
+        a = max(0.0, min(1.0, float(alpha_override)))
+    return int(round(255.0 * (1.0 if a is None else a)))
+
+def _drawtext_font_opt(t) -> str:
+    """drawtext font option for an IR track carrying font_path / font_family."""
+    font_path = t.font_path
+    font_family = t.font_family or "Arial"
 
     if font_path and os.path.isfile(font_path):
         safe_path = font_path.replace(":", r"\:").replace("'", r"\'")
@@ -0,0 +1,316 @@
+# ffmpegkit/cost.py
+"""
+Render cost model.
+
+Reads built ffmpeg commands (not the timeline), so whatever the builder and
+its fast paths decided (preview downscale, flattening, sprites, still loops,
+segments) is what gets counted:
+
+  - inputs, and the pixels decoded from them (source size x frames read,
+    plus the frames decoded from the keyframe before every -ss)
+  - overlay and drawtext evaluations (node x frames it is enabled for)
+  - geq pixel evaluations (clip size x frames)
+  - encoded pixels (output canvas x frames), weighted by encoder/preset
+
+Each count has a CPU-seconds coefficient measured on a typical x86 core; the
+render app scales the sum by the ratio observed on recently finished jobs
+(see render.explain), so the defaults only need to be roughly proportional.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, fields
+from typing import List
+
+from .ir import Timeline, compile_timeline
+from .probe import probe_many
+from .segments import SegmentedPlan
+from .stills import StillPlan
+
+# CPU seconds per unit
+COST_PER_PROCESS = 0.15
+COST_PER_INPUT = 0.03
+COST_PER_DECODED_PIXEL = 2.5e-9
+COST_PER_OVERLAY = 4e-4          # per overlay node per frame
+COST_PER_DRAWTEXT = 3e-4         # per drawtext node per frame
+COST_PER_GEQ_PIXEL = 1.5e-8
+COST_PER_ENCODED_PIXEL = {       # by -preset, or by codec for image outputs
+    "ultrafast": 2e-9,
+    "veryfast": 6e-9,
+    "png": 1.5e-8,
+}
+DEFAULT_ENCODED_PIXEL = 6e-9
+IMAGE2_FPS = 25.0                # rate a looped image input is read at without -framerate
+DEFAULT_SOURCE_FPS = 30.0
+
+_LABEL = r"\[[^\]]*\]"
+_CHAIN_RE = re.compile(rf"^((?:{_LABEL})*)(.*?)((?:{_LABEL})*)$", re.S)
+_SIZE_RE = re.compile(r"(?:^|:)s=(\d+)x(\d+)")
+_BASE_RE = re.compile(r"color=[^;\[]*?:s=(\d+)x(\d+)")
+_BETWEEN_RE = re.compile(r"between\(t,\s*([-\d.e]+)\s*,\s*([-\d.e]+)\s*\)")
+
+
+@dataclass
+class CostFeatures:
+    processes: int = 0
+    inputs: int = 0
+    decoded_pixels: float = 0.0
+    overlay_nodes: int = 0
+    overlay_evals: float = 0.0
+    drawtext_nodes: int = 0
+    drawtext_evals: float = 0.0
+    geq_nodes: int = 0
+    geq_pixels: float = 0.0
+    encoded_pixels: float = 0.0
+    frames: int = 0
+    duration: float = 0.0
+    cpu_seconds: float = 0.0     # unscaled model estimate
+
+    def __add__(self, other: CostFeatures) -> CostFeatures:
+        out = CostFeatures(**{f.name: getattr(self, f.name) + getattr(other, f.name) for f in fields(self)})
+        # processes of one plan cover the same output: frames/duration don't add up
+        out.frames = max(self.frames, other.frames)
+        out.duration = max(self.duration, other.duration)
+        return out
+
+    @property
+    def decoded_pixels_per_second(self) -> float:
+        return self.decoded_pixels / self.duration if self.duration > 0 else self.decoded_pixels
+
+    def as_dict(self) -> dict:
+        d = {f.name: getattr(self, f.name) for f in fields(self)}
+        d["decoded_pixels_per_second"] = self.decoded_pixels_per_second
+        return {k: round(v, 4) if isinstance(v, float) else v for k, v in d.items()}
+
+
+def _split_top(s: str, sep: str) -> List[str]:
+    """Split on `sep` outside single quotes and backslash escapes (filtergraph syntax)."""
+    parts, cur, quoted, i = [], [], False, 0
+    while i < len(s):
+        c = s[i]
+        if c == "\\" and i + 1 < len(s):
+            cur.append(s[i:i + 2])
+            i += 2
+            continue
+        if c == "'":
+            quoted = not quoted
+        elif c == sep and not quoted:
+            parts.append("".join(cur))
+            cur = []
+            i += 1
+            continue
+        cur.append(c)
+        i += 1
+    parts.append("".join(cur))
+    return [p for p in parts if p.strip()]
+
+
+def _opt(flags: List[str], name: str) -> str | None:
+    """Last value of option `name` in flags."""
+    val = None
+    for i, a in enumerate(flags[:-1]):
+        if a == name:
+            val = flags[i + 1]
+    return val
+
+
+def _float(v, default: float | None = None) -> float | None:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_cmd(args: List[str]):
+    """([(input flags, src), ...], output options, filter_complex)."""
+    inputs, pending, last_i = [], [], -1
+    for i, a in enumerate(args):
+        if a == "-i" and i + 1 < len(args):
+            inputs.append((pending, args[i + 1]))
+            pending = []
+            last_i = i + 1
+        elif i > last_i:
+            pending.append(a)
+    out = list(args[last_i + 1:])
+    return inputs, out, _opt(out, "-filter_complex") or ""
+
+
+def _enabled_seconds(body: str, duration: float) -> float:
+    m = _BETWEEN_RE.search(body)
+    if not m:
+        return duration
+    a, b = float(m.group(1)), float(m.group(2))
+    return max(0.0, min(b, duration) - max(a, 0.0))
+
+
+def _graph_cost(graph: str, fps: float, duration: float, feats: CostFeatures) -> None:
+    frames = max(1.0, fps * duration)
+    single: set = set()  # labels carrying a single (looped later) frame
+    for chain in _split_top(graph, ";"):
+        m = _CHAIN_RE.match(chain.strip())
+        ins = re.findall(_LABEL, m.group(1))
+        outs = re.findall(_LABEL, m.group(3))
+        filters = _split_top(m.group(2), ",")
+        names = [f.split("=", 1)[0].strip() for f in filters]
+
+        one_frame = bool(ins) and ins[0] in single
+        size = None
+        for name, f in zip(names, filters):
+            if name in ("color", "nullsrc"):
+                sm = _SIZE_RE.search(f.split("=", 1)[-1])
+                size = (int(sm.group(1)), int(sm.group(2))) if sm else size
+            elif name == "trim" and "end_frame=1" in f:
+                one_frame = True
+            elif name == "loop":
+                one_frame = False
+        n_frames = 1.0 if one_frame else frames
+
+        for name, f in zip(names, filters):
+            if name == "overlay":
+                feats.overlay_nodes += 1
+                feats.overlay_evals += 1.0 if one_frame else fps * _enabled_seconds(f, duration)
+            elif name == "drawtext":
+                feats.drawtext_nodes += 1
+                feats.drawtext_evals += 1.0 if one_frame else fps * _enabled_seconds(f, duration)
+            elif name == "geq":
+                feats.geq_nodes += 1
+                w, h = size or (0, 0)
+                feats.geq_pixels += w * h * n_frames
+
+        if one_frame and "loop" not in names:
+            single.update(outs)
+
+
+def command_cost(args: List[str], probes: dict, canvas: tuple[int, int], fps: float,
+                 duration: float) -> CostFeatures:
+    """
+    Cost of one ffmpeg command. `probes` maps input paths to probe metadata (missing
+    entries are assumed canvas-sized); canvas/fps/duration describe the timeline it
+    renders, and are overridden by what the command itself states (-r, -t, -frames:v).
+    """
+    feats = CostFeatures(processes=1)
+    inputs, out, graph = _parse_cmd(args)
+    W, H = canvas
+
+    frames_opt = _opt(out, "-frames:v")
+    fps = _float(_opt(out, "-r"), fps) or fps
+    duration = _float(_opt(out, "-t"), duration) or duration
+    if frames_opt is not None:
+        frames = max(1, int(_float(frames_opt, 1)))
+        duration = frames / max(fps, 1.0)
+    else:
+        frames = max(1, int(round(fps * duration)))
+    feats.frames = frames
+    feats.duration = duration
+
+    codec = _opt(out, "-c:v") or _opt(out, "-vcodec") or _opt(out, "-c")
+    # stream copies (concat) and audio passes never decode or encode a video frame
+    video = "-vn" not in out and codec != "copy"
+
+    for flags, src in inputs:
+        feats.inputs += 1
+        meta = probes.get(src) or {}
+        if not video:
+            continue
+        if meta and not meta.get("has_video", True):
+            continue  # audio only: decoding it is noise next to video
+        w = meta.get("width") or W
+        h = meta.get("height") or H
+        seconds = _float(_opt(flags, "-t"), duration) or duration
+        if "-loop" in flags:
+            rate = _float(_opt(flags, "-framerate"), IMAGE2_FPS)
+            read = 1.0 if frames == 1 else seconds * rate
+        else:
+            rate = meta.get("fps") or DEFAULT_SOURCE_FPS
+            if meta.get("duration"):
+                seconds = min(seconds, float(meta["duration"]))
+            read = max(1.0, seconds * rate) if frames > 1 else 1.0
+            if _opt(flags, "-ss") and meta.get("keyframe_interval"):
+                read += rate * float(meta["keyframe_interval"]) / 2  # decode from the keyframe before the seek
+        feats.decoded_pixels += w * h * read
+
+    base = _BASE_RE.search(graph)
+    if base:
+        W, H = int(base.group(1)), int(base.group(2))
+    if graph and video:
+        _graph_cost(graph, fps, duration, feats)
+
+    per_pixel = 0.0
+    if video:
+        key = _opt(out, "-preset") if codec == "libx264" else codec
+        feats.encoded_pixels = float(W * H * frames)
+        per_pixel = COST_PER_ENCODED_PIXEL.get(key or "", DEFAULT_ENCODED_PIXEL)
+
+    feats.cpu_seconds = (
+        COST_PER_PROCESS
+        + COST_PER_INPUT * feats.inputs
+        + COST_PER_DECODED_PIXEL * feats.decoded_pixels
+        + COST_PER_OVERLAY * feats.overlay_evals
+        + COST_PER_DRAWTEXT * feats.drawtext_evals
+        + COST_PER_GEQ_PIXEL * feats.geq_pixels
+        + per_pixel * feats.encoded_pixels
+    )
+    return feats
+
+
+def plan_type(plan) -> str:
+    """'still', 'segmented' or 'single' (a plain ffmpeg argument list)."""
+    if isinstance(plan, StillPlan):
+        return "still"
+    if isinstance(plan, SegmentedPlan):
+        return "segmented"
+    return "single"
+
+
+def plan_commands(plan) -> List[List[str]]:
+    """Every ffmpeg command a plan (or a single argument list) runs."""
+    if isinstance(plan, StillPlan):
+        return [*plan.still_cmds, plan.encode_cmd]
+    if isinstance(plan, SegmentedPlan):
+        return [*plan.segment_cmds, *([plan.audio_cmd] if plan.audio_cmd else []), plan.concat_cmd]
+    return [plan]
+
+
+def plan_cost(tl: dict | Timeline, plan) -> CostFeatures:
+    """
+    Summed cost of every command in `plan` (a StillPlan, SegmentedPlan or single
+    argument list) built for `tl`. Inputs are probed through the shared probe cache.
+    """
+    tl = compile_timeline(tl)
+    cmds = plan_commands(plan)
+    probes = probe_many(src for args in cmds for _flags, src in _parse_cmd(args)[0])
+    # the composed canvas (preview-downscaled or not) is stated by the first graph's base layer;
+    # the stills encode has none of its own
+    canvas = (tl.width, tl.height)
+    for args in cmds:
+        base = _BASE_RE.search(_parse_cmd(args)[2])
+        if base:
+            canvas = (int(base.group(1)), int(base.group(2)))
+            break
+
+    total = CostFeatures()
+    for args in cmds:
+        total = total + command_cost(args, probes, canvas, tl.fps, tl.positive_duration)
+    return total
+
+
+def default_parallelism(plan, threads: int | None) -> float:
+    """
+    Cores a plan keeps busy on average, before any calibration: x264 and the filter
+    graph scale sublinearly with threads; stills and segments run as parallel processes.
+    """
+    threads = max(1, threads or 1)
+    if isinstance(plan, StillPlan):
+        return float(max(1, min(threads, len(plan.still_cmds))))
+    if isinstance(plan, SegmentedPlan):
+        return float(max(1, min(threads, len(plan.segment_cmds))))
+    return max(1.0, 0.6 * min(threads, 8))
+
+
+def estimate(features: CostFeatures, cpu_scale: float = 1.0, parallelism: float = 1.0) -> dict:
+    """Predicted CPU seconds and wall seconds of a plan: model CPU x calibration, spread over `parallelism` cores."""
+    cpu = features.cpu_seconds * cpu_scale
+    return {
+        "cpu_seconds": round(cpu, 3),
+        "wall_seconds": round(cpu / max(parallelism, 1.0), 3),
+    }
@@ -0,0 +1,223 @@
+# ffmpegkit/flatten.py
+"""
+Layer flattening.
+
+The builder describes every non-media overlay (text, shapes, signs, weather)
+as a Layer in emission order. flatten_layers() then:
+
+  - drops layers that can never be seen: zero duration, outside the timeline,
+    zero opacity, or geometry entirely off the canvas
+  - groups consecutive static layers that share the same enable window (a
+    dropped layer in between no longer separates them) into one RGBA layer
+
+A group is composed once inside the graph: its members are drawn onto a
+single-frame transparent canvas cropped to their joint bounding box, and that
+frame is looped. Per output frame the group then costs one overlay instead of
+one node per member component (a weather card alone is a dozen).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Tuple
+
+from .ir import Track, BoxShapeTrack, CircleTrack, LineTrack, SignTrack, WeatherTrack
+
+# types whose emitters apply `opacity` (text ignores it, so it is never dropped for it)
+_OPACITY_TYPES = ("circle", "triangle", "rectangle", "line", "ellipse", "sign", "weather")
+
+
+@dataclass
+class Layer:
+    track: Track
+    emit: Callable  # (track, last_v, vcount) -> (filters, last_v, vcount)
+
+    @property
+    def window(self) -> Tuple[float, float]:
+        return self.track.start, self.track.end
+
+
+@dataclass
+class FlattenReport:
+    tracks_dropped: int = 0
+    groups: int = 0
+    tracks_flattened: int = 0
+    overlays_before: int = 0
+    overlays_after: int = 0
+
+    @property
+    def overlays_eliminated(self) -> int:
+        return self.overlays_before - self.overlays_after
+
+    def as_dict(self) -> dict:
+        return {
+            "tracks_dropped": self.tracks_dropped,
+            "groups": self.groups,
+            "tracks_flattened": self.tracks_flattened,
+            "overlays_before": self.overlays_before,
+            "overlays_after": self.overlays_after,
+            "overlays_eliminated": self.overlays_eliminated,
+        }
+
+
+@dataclass
+class _Group:
+    layers: List[Layer] = field(default_factory=list)
+
+
+def _per_frame_nodes(filters: List[str]) -> int:
+    return sum(f.count("overlay=") + f.count("drawtext=") for f in filters)
+
+
+_WEATHER_PARTS = ("icon", "summary", "date", "attribution", "temperature", "maxTemp", "minTemp",
+                  "humidity", "windSpeed", "windDirection")
+
+
+def _unflattened_nodes(t: Track) -> int:
+    """
+    Per-frame overlay/drawtext nodes a track costs when emitted on its own, read from
+    the track instead of emitting it (emitting rasterizes sprites). Exact for text and
+    shapes; signs and weather cards count their enabled components (report only).
+    """
+    if t.type in ("text", "datetime", "line"):
+        return 1
+    if isinstance(t, (BoxShapeTrack, CircleTrack)):
+        return 2 if t.outline_width > 0 and t.outline else 1
+    if isinstance(t, SignTrack):
+        sc = t.show_components
+        parts = sum(bool(sc.get(k)) for k in ("border", "icon", "arrow"))
+        parts += bool(sc.get("background")) and bool(t.colors.get("background"))
+        parts += 2 if sc.get("symbol") and sc.get("text") else int(bool(sc.get("symbol") or sc.get("text")))
+        return 1 + parts
+    if isinstance(t, WeatherTrack):
+        sc = t.show_components
+        parts = sum(bool(sc.get(k)) for k in _WEATHER_PARTS) + bool(sc.get("location", True))
+        parts += bool(t.colors.get("background")) + bool(t.colors.get("border"))
+        return 1 + parts
+    return 1
+
+
+def _bbox(t: Track, W: int, H: int) -> Tuple[int, int, int, int]:
+    """Conservative canvas-space box (x0, y0, x1, y1) a track can paint into."""
+    x, y = t.x, t.y
+    if isinstance(t, CircleTrack):
+        r = t.radius
+        box = (x - r, y - r, x + r, y + r)
+    elif isinstance(t, LineTrack):
+        L = t.length
+        box = (x - L, y - L, x + L, y + L)
+    elif isinstance(t, SignTrack):
+        w, h = t.width, t.height
+        r = math.hypot(w, h) / 2.0  # any rotation stays inside the circumscribed circle
+        box = (x + w / 2 - r, y + h / 2 - r, x + w / 2 + r, y + h / 2 + r)
+    elif isinstance(t, (BoxShapeTrack, WeatherTrack)):
+        box = (x, y, x + t.width, y + t.height)
+    else:
+        # text: size depends on the font; it starts at (x, y) and may run to the canvas edge
+        box = (x, y, W, H)
+    return math.floor(box[0]) - 1, math.floor(box[1]) - 1, math.ceil(box[2]) + 1, math.ceil(box[3]) + 1
+
+
+def _clip(box, W: int, H: int):
+    x0, y0, x1, y1 = max(0, box[0]), max(0, box[1]), min(W, box[2]), min(H, box[3])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
+
+
+def _droppable(t: Track, W: int, H: int, duration: float) -> bool:
+    if t.end <= t.start or t.start > duration:
+        return True
+    if t.type in _OPACITY_TYPES and t.opacity <= 0:
+        return True
+    return _clip(_bbox(t, W, H), W, H) is None
+
+
+def flatten_layers(layers: List[Layer], W: int, H: int, duration: float) -> List[object]:
+    """Returns the emission plan: Layer (emit as-is) or _Group (emit flattened)."""
+    plan: List[object] = []
+    run: List[Layer] = []
+
+    def close_run():
+        if len(run) > 1:
+            plan.append(_Group(layers=list(run)))
+        else:
+            plan.extend(run)
+        run.clear()
+
+    for layer in layers:
+        if _droppable(layer.track, W, H, duration):
+            continue
+        if not layer.track.static:
+            close_run()
+            plan.append(layer)
+            continue
+        if run and run[-1].window != layer.window:
+            close_run()
+        run.append(layer)
+    close_run()
+
+    # a lone sign/weather card is a whole sub-graph per frame: flatten it too
+    return [
+        _Group(layers=[p]) if isinstance(p, Layer) and isinstance(p.track, (SignTrack, WeatherTrack)) and p.track.static
+        else p
+        for p in plan
+    ]
+
+
+def _emit_group(group: _Group, last_v: str, vcount: int, W: int, H: int, fps: int):
+    boxes = [_clip(_bbox(l.track, W, H), W, H) for l in group.layers]
+    # even origin: the group lands on the yuv420 chroma grid of the main canvas
+    bx0 = min(b[0] for b in boxes) // 2 * 2
+    by0 = min(b[1] for b in boxes) // 2 * 2
+    bx1 = max(b[2] for b in boxes)
+    by1 = max(b[3] for b in boxes)
+    gw, gh = bx1 - bx0, by1 - by0
+    s, e = group.layers[0].window
+    span = max(e - s, 1.0)
+
+    filters: List[str] = []
+    gid = vcount
+    cur = f"[grp{gid}_base]"
+    filters.append(f"color=c=black@0:s={gw}x{gh}:r={fps},format=rgba,trim=end_frame=1{cur}")
+    vcount += 1
+    for layer in group.layers:
+        # composed at the group's t=0, shifted into the group's box
+        x, y = layer.track.x, layer.track.y
+        t = replace(layer.track, start=0.0, end=span, x=x - bx0, y=y - by0)
+        if isinstance(t, WeatherTrack):
+            t.layout_origin = (x, y)
+        f, cur, vcount = layer.emit(t, cur, vcount)
+        filters += f
+
+    looped = f"[grp{gid}]"
+    filters.append(f"{cur}loop=loop=-1:size=1,setpts=N/({fps}*TB){looped}")
+    out = f"[grp{gid}_o]"
+    filters.append(f"{last_v}{looped}overlay={bx0}:{by0}:enable='between(t,{s},{e})'{out}")
+    return filters, out, vcount
+
+
+def emit_layers(layers: List[Layer], last_v: str, vcount: int, W: int, H: int, fps: int,
+                duration: float, report: FlattenReport | None = None):
+    """Flatten and emit. Returns (filters, last_v, vcount) like the individual emitters."""
+    plan = flatten_layers(layers, W, H, duration)
+
+    if report is not None:
+        report.overlays_before += sum(_unflattened_nodes(layer.track) for layer in layers)
+        kept = sum(len(p.layers) if isinstance(p, _Group) else 1 for p in plan)
+        report.tracks_dropped += len(layers) - kept
+
+    filters: List[str] = []
+    for p in plan:
+        if isinstance(p, _Group):
+            f, last_v, vcount = _emit_group(p, last_v, vcount, W, H, fps)
+            if report is not None:
+                report.groups += 1
+                report.tracks_flattened += len(p.layers)
+                report.overlays_after += 1
+        else:
+            f, last_v, vcount = p.emit(p.track, last_v, vcount)
+            if report is not None:
+                report.overlays_after += _per_frame_nodes(f)
+        filters += f
+    return filters, last_v, vcount
@@ -0,0 +1,82 @@
+# ffmpegkit/hls.py
+"""
+Progressive (HLS / fMP4) preview output.
+
+A preview encode writes short fMP4 segments plus an EVENT playlist that grows
+as segments land, so a player can start on segment one while the rest is
+still encoding. The same encode also writes a regular MP4 (tee muxer) that is
+kept for downloads and the render cache.
+
+Layout under the preview directory:
+  index.m3u8     live playlist (placeholder until ffmpeg writes the first one)
+  init.mp4       fMP4 init segment
+  seg_00000.m4s  media segments, HLS_SEGMENT_SECONDS each
+"""
+import os
+from typing import List
+
+HLS_SEGMENT_SECONDS = 2
+HLS_PLAYLIST = "index.m3u8"
+HLS_INIT = "init.mp4"
+HLS_SEGMENT_PATTERN = "seg_%05d.m4s"
+
+
+def _tee_escape(value: str) -> str:
+    # tee slave options are ':'-separated inside [...] and outputs are '|'-separated
+    out = value.replace("\\", "/")
+    for ch in (":", "|", "[", "]"):
+        out = out.replace(ch, "\\" + ch)
+    return out
+
+
+def _hls_options(hls_dir: str, playlist_type: str) -> List[tuple]:
+    return [
+        ("hls_time", str(HLS_SEGMENT_SECONDS)),
+        ("hls_segment_type", "fmp4"),
+        ("hls_fmp4_init_filename", HLS_INIT),
+        ("hls_playlist_type", playlist_type),
+        ("hls_list_size", "0"),
+        ("hls_flags", "independent_segments+temp_file"),
+        ("hls_segment_filename", os.path.join(hls_dir, HLS_SEGMENT_PATTERN)),
+    ]
+
+
+def hls_keyframe_args() -> List[str]:
+    """Keyframe on every segment boundary so segments cut exactly every HLS_SEGMENT_SECONDS."""
+    return ["-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})"]
+
+
+def hls_tee_output(hls_dir: str, mp4_path: str) -> List[str]:
+    """Output args writing the live HLS rendition and a faststart MP4 from one encode."""
+    hls_opts = ":".join(f"{k}={_tee_escape(v)}" for k, v in _hls_options(hls_dir, "event"))
+    playlist = os.path.join(hls_dir, HLS_PLAYLIST)
+    slaves = f"[f=hls:{hls_opts}]{_tee_escape(playlist)}|[f=mp4:movflags=+faststart]{_tee_escape(mp4_path)}"
+    return ["-flags", "+global_header", "-f", "tee", slaves]
+
+
+def build_hls_remux_cmd(src_mp4: str, hls_dir: str) -> List[str]:
+    """Stream-copy an already rendered MP4 into a VOD playlist (render cache hits)."""
+    args = ["-nostdin", "-hide_banner", "-loglevel", "error", "-i", src_mp4, "-map", "0", "-c", "copy", "-f", "hls"]
+    for k, v in _hls_options(hls_dir, "vod"):
+        args += [f"-{k}", v]
+    return args + ["-y", os.path.join(hls_dir, HLS_PLAYLIST)]
+
+
+def write_placeholder_playlist(hls_dir: str) -> str:
+    """
+    An empty EVENT playlist so the URL resolves before ffmpeg writes its first one;
+    players treat it as live and reload until segments appear.
+    """
+    os.makedirs(hls_dir, exist_ok=True)
+    path = os.path.join(hls_dir, HLS_PLAYLIST)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(
+            "#EXTM3U\n"
+            "#EXT-X-VERSION:7\n"
+            f"#EXT-X-TARGETDURATION:{HLS_SEGMENT_SECONDS}\n"
+            "#EXT-X-MEDIA-SEQUENCE:0\n"
+            "#EXT-X-PLAYLIST-TYPE:EVENT\n"
+        )
+    os.replace(tmp, path)
+    return path
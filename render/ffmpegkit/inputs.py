@@ -0,0 +1,78 @@
+# ffmpegkit/inputs.py
+"""
+Input planner.
+
+Every unique (localized path, seek window, timing) gets exactly one `-i`, so a
+logo or clip repeated across tracks is opened and decoded once and fanned out
+to its consumers with `split` / `asplit`.
+
+Images are keyed by path alone: every looped image input runs from t=0 at the
+output rate, so all branches consume in lockstep. Video/audio are also keyed
+by their -ss/-t window and track start; branches shifted to different starts
+would make `split` queue decoded frames for the later consumer, which costs
+more memory than the second decoder it saves.
+"""
+from __future__ import annotations
+
+from typing import List
+
+from .ir import MediaTrack
+from .media import _media_input_flags, _fan_label
+
+
+def _input_key(t: MediaTrack) -> tuple:
+    if t.type == "image":
+        return ("image", t.src)
+    return ("av", t.src, tuple(_media_input_flags(t)), t.start)
+
+
+def plan_media_inputs(tracks, positive_duration: float, probes: dict,
+                      input_flags: List[List[str]], input_srcs: List[str]) -> List[str]:
+    """
+    Appends one input per unique media source to input_flags/input_srcs and annotates tracks:
+      t.in_idx     input index
+      t.has_audio  whether that input has an audio stream
+      t.fan        branch number when the input is shared (None otherwise)
+    Returns the split/asplit filters that fan shared inputs out.
+    """
+    by_key: dict = {}
+    consumers: dict = {}
+    for t in tracks:
+        typ = t.type
+        if typ not in ("image", "video", "audio"):
+            continue
+        t.fan = None  # tracks may carry annotations from an earlier build
+        key = _input_key(t)
+        idx = by_key.get(key)
+        if idx is None:
+            if typ == "image":
+                input_flags.append(["-loop", "1", "-t", f"{positive_duration}"])
+            else:
+                input_flags.append(_media_input_flags(t))
+            input_srcs.append(t.src)
+            idx = by_key[key] = len(input_srcs) - 1
+        t.in_idx = idx
+        t.has_audio = typ != "image" and bool((probes.get(t.src) or {}).get("has_audio"))
+        consumers.setdefault(idx, []).append(t)
+
+    filters: List[str] = []
+    for idx, ts in consumers.items():
+        if len(ts) < 2:
+            continue
+        for k, t in enumerate(ts):
+            t.fan = k
+        v_users = [t for t in ts if t.type in ("image", "video")]
+        a_users = [t for t in ts if t.has_audio]
+        if len(v_users) > 1:
+            filters.append(f"[{idx}:v]split={len(v_users)}" + "".join(_fan_labels(idx, "v", v_users)))
+        elif v_users:
+            filters.append(f"[{idx}:v]null" + "".join(_fan_labels(idx, "v", v_users)))
+        if len(a_users) > 1:
+            filters.append(f"[{idx}:a]asplit={len(a_users)}" + "".join(_fan_labels(idx, "a", a_users)))
+        elif a_users:
+            filters.append(f"[{idx}:a]anull" + "".join(_fan_labels(idx, "a", a_users)))
+    return filters
+
+
+def _fan_labels(idx: int, kind: str, ts) -> List[str]:
+    return [_fan_label(idx, kind, t.fan) for t in ts]
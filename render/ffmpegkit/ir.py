@@ -0,0 +1,535 @@
+# ffmpegkit/ir.py
+"""
+Compiled timeline IR.
+
+The API validates a timeline into plain nested dicts (TimelineSerializer) and
+stores them on the RenderJob. Before any command is built the dict is compiled
+once into typed, __slots__ track objects: every field the emitters read is
+coerced and defaulted here (the same rules the emitters used to apply inline
+with t.get()/float()/int()), so the builder, planners and emitters only do
+attribute access.
+
+Per track the enable window is precomputed (`enable`), and the timeline keeps
+the sorted set of track boundaries (`boundaries`) the planners cut on.
+
+Objects are plain dataclasses: derive modified copies with dataclasses.replace()
+(enable/static/boundaries are recomputed). The input planner annotates media
+tracks in place (in_idx / has_audio / fan).
+
+Timeline.scaled(f) is the same timeline drawn on a canvas f times the size:
+every pixel quantity (positions, sizes, font sizes, stroke widths, radii,
+layout boxes) is scaled, so previews compose at preview resolution.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import ClassVar, Dict, Tuple, Type
+
+_ANIMATED_EXTS = (".gif", ".webp", ".apng")
+
+
+def _f(d: dict, key: str, default: float) -> float:
+    v = d.get(key)
+    return float(default) if v is None else float(v)
+
+
+def _px(d: dict, key: str, default: float, lo: int | None = None) -> int:
+    """Rounded pixel value, as the emitters draw it."""
+    v = int(round(_f(d, key, default)))
+    return v if lo is None else max(lo, v)
+
+
+def _str(d: dict, key: str) -> str | None:
+    v = d.get(key)
+    return None if v is None else str(v)
+
+
+def _dict(d: dict, key: str) -> dict:
+    v = d.get(key)
+    return v if isinstance(v, dict) else {}
+
+
+def _opacity(d: dict) -> float:
+    return max(0.0, min(1.0, _f(d, "opacity", 1.0)))
+
+
+def _scale_px(v: int, f: float) -> int:
+    """Scaled pixel value; anything non-zero stays at least one pixel."""
+    r = int(round(v * f))
+    if r == 0 and v:
+        return 1 if v > 0 else -1
+    return r
+
+
+def _scale_sizes(d: dict, f: float) -> dict:
+    """fontSizes-style {name: px}: numeric entries scaled, the rest kept."""
+    return {k: (float(v) * f if isinstance(v, (int, float)) and not isinstance(v, bool) else v) for k, v in d.items()}
+
+
+# ---------------- Tracks ----------------
+
+@dataclass(slots=True, kw_only=True)
+class Track:
+    id: str = ""
+    type: str = ""
+    start: float = 0.0
+    end: float = 0.0
+    z: int = 0
+    enable: str = field(init=False, default="", repr=False)
+    static: bool = field(init=False, default=True, repr=False)  # looks the same on every frame
+
+    # integer pixel fields, scaled by scaled()
+    _PX: ClassVar[Tuple[str, ...]] = ()
+
+    def __post_init__(self):
+        self.enable = f"enable='between(t,{self.start},{self.end})'"
+
+    def visible_at(self, sec: float) -> bool:
+        # same test as enable='between(t,start,end)'
+        return self.start <= sec <= self.end
+
+    def scaled(self, f: float) -> Track:
+        """This track drawn on a canvas f times the size."""
+        return replace(self, **self._scaled_fields(f))
+
+    def _scaled_fields(self, f: float) -> dict:
+        return {k: _scale_px(getattr(self, k), f) for k in self._PX}
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        return {
+            "id": str(d.get("id") or ""),
+            "type": str(d.get("type") or ""),
+            "start": _f(d, "start", 0.0),
+            "end": _f(d, "end", 0.0),
+            "z": int(d.get("z") or 0),
+        }
+
+
+@dataclass(slots=True, kw_only=True)
+class MediaTrack(Track):
+    src: str = ""
+    x: int = 0
+    y: int = 0
+    w: int = 0
+    h: int = 0
+    src_in: float | None = None
+    src_out: float | None = None
+    volume: float = 1.0
+    muted: bool = False
+    # set when rendered inside a time window (segments): skip this far into the source
+    t_offset: float = 0.0
+    # a zero w/h keeps the source's own size, times this (scaled timelines)
+    native_scale: float = 1.0
+    # input planner annotations (inputs.plan_media_inputs)
+    in_idx: int | None = field(default=None, repr=False)
+    has_audio: bool = field(default=False, repr=False)
+    fan: int | None = field(default=None, repr=False)
+
+    _PX = ("x", "y", "w", "h")
+
+    def _scaled_fields(self, f: float) -> dict:
+        return {**Track._scaled_fields(self, f), "native_scale": self.native_scale * f}
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        src_in, src_out = d.get("srcIn"), d.get("srcOut")
+        return {
+            **Track._coerce(d),
+            "src": str(d.get("src") or ""),
+            # overlay position/size are truncated, not rounded (historical behaviour)
+            "x": int(_f(d, "x", 0)),
+            "y": int(_f(d, "y", 0)),
+            "w": int(_f(d, "w", 0)),
+            "h": int(_f(d, "h", 0)),
+            "src_in": None if src_in is None else float(src_in),
+            "src_out": None if src_out is None else float(src_out),
+            "volume": _f(d, "volume", 1.0),
+            "muted": bool(d.get("muted", False)),
+        }
+
+
+@dataclass(slots=True, kw_only=True)
+class VideoTrack(MediaTrack):
+    def __post_init__(self):
+        Track.__post_init__(self)
+        self.static = False
+
+
+@dataclass(slots=True, kw_only=True)
+class ImageTrack(MediaTrack):
+    def __post_init__(self):
+        Track.__post_init__(self)
+        self.static = not self.src.lower().endswith(_ANIMATED_EXTS)
+
+
+@dataclass(slots=True, kw_only=True)
+class AudioTrack(MediaTrack):
+    pass
+
+
+@dataclass(slots=True, kw_only=True)
+class TextTrack(Track):
+    x: int = 0
+    y: int = 0
+    text: str = ""
+    font_size: int = 48
+    font_path: str | None = None
+    font_family: str | None = None
+    color: str = "white"
+    stroke_color: str | None = None
+    stroke_width: float = 0.0
+    bg_color: str | None = None
+    padding: int = 6
+
+    _PX = ("x", "y", "font_size", "padding")
+
+    def _scaled_fields(self, f: float) -> dict:
+        # drawtext's borderw is an integer
+        return {**Track._scaled_fields(self, f), "stroke_width": float(_scale_px(self.stroke_width, f))}
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        bg = d.get("bgColor")
+        return {
+            **Track._coerce(d),
+            "x": int(_f(d, "x", 0)),
+            "y": int(_f(d, "y", 0)),
+            "text": str(d.get("text") or ""),
+            "font_size": int(_f(d, "fontSize", 48)),
+            "font_path": _str(d, "fontPath"),
+            "font_family": _str(d, "fontFamily"),
+            "color": d.get("color") or "white",
+            "stroke_color": d.get("strokeColor") or None,
+            "stroke_width": float(d.get("strokeWidth") or 0),
+            "bg_color": (bg.strip() or None) if isinstance(bg, str) else None,
+            "padding": int(d.get("padding", 6) or 0),
+        }
+
+
+@dataclass(slots=True, kw_only=True)
+class DateTimeTrack(TextTrack):
+    pass
+
+
+@dataclass(slots=True, kw_only=True)
+class CircleTrack(Track):
+    x: int = 0  # center
+    y: int = 0
+    radius: int = 10
+    fill: str = "#000000"
+    outline: str | None = None
+    outline_width: int = 0
+    opacity: float = 1.0
+
+    _PX = ("x", "y", "radius", "outline_width")
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        return {
+            **Track._coerce(d),
+            "x": _px(d, "x", 0),
+            "y": _px(d, "y", 0),
+            "radius": _px(d, "radius", 10, lo=1),
+            "fill": d.get("fill") or "#000000",
+            "outline": d.get("outline") or None,
+            "outline_width": max(0, int(round(float(d.get("outlineWidth") or 0)))),
+            "opacity": _f(d, "opacity", 1.0),
+        }
+
+
+@dataclass(slots=True, kw_only=True)
+class BoxShapeTrack(Track):
+    """Shapes drawn into a width x height box at top-left (x, y)."""
+    x: int = 0
+    y: int = 0
+    width: int = 100
+    height: int = 100
+    fill: str = "#000000"
+    outline: str | None = None
+    outline_width: int = 0
+    opacity: float = 1.0
+
+    _PX = ("x", "y", "width", "height", "outline_width")
+
+    @staticmethod
+    def _coerce(d: dict, default_height: float = 100) -> dict:
+        return {
+            **Track._coerce(d),
+            "x": _px(d, "x", 0),
+            "y": _px(d, "y", 0),
+            "width": _px(d, "width", 100, lo=1),
+            "height": _px(d, "height", default_height, lo=1),
+            "fill": d.get("fill") or d.get("color") or "#000000",
+            "outline": (d.get("outline") or "").strip() or None,
+            "outline_width": max(0, int(round(float(d.get("outlineWidth") or 0)))),
+            "opacity": _f(d, "opacity", 1.0),
+        }
+
+
+@dataclass(slots=True, kw_only=True)
+class TriangleTrack(BoxShapeTrack):
+    direction: str = "up"
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        return {**BoxShapeTrack._coerce(d), "direction": (d.get("direction") or "up").lower()}
+
+
+@dataclass(slots=True, kw_only=True)
+class RectangleTrack(BoxShapeTrack):
+    border_radius: int = 0
+
+    _PX = BoxShapeTrack._PX + ("border_radius",)
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        return {
+            **BoxShapeTrack._coerce(d),
+            "border_radius": max(0, int(round(float(d.get("borderRadius") or 0)))),
+        }
+
+
+@dataclass(slots=True, kw_only=True)
+class EllipseTrack(BoxShapeTrack):
+    height: int = 60
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        return BoxShapeTrack._coerce(d, default_height=60)
+
+
+@dataclass(slots=True, kw_only=True)
+class LineTrack(Track):
+    x: int = 0  # start anchor
+    y: int = 0
+    length: int = 200
+    thickness: int = 2
+    rotation: float = 0.0  # degrees
+    color: str = "#000000"
+    opacity: float = 1.0
+
+    _PX = ("x", "y", "length", "thickness")
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        return {
+            **Track._coerce(d),
+            "x": _px(d, "x", 0),
+            "y": _px(d, "y", 0),
+            "length": _px(d, "length", 200, lo=1),
+            "thickness": _px(d, "thickness", 2, lo=1),
+            "rotation": _f(d, "rotation", 0.0),
+            "color": d.get("color") or "#000000",
+            "opacity": _f(d, "opacity", 1.0),
+        }
+
+
+@dataclass(slots=True, kw_only=True)
+class SignTrack(Track):
+    x: int = 0
+    y: int = 0
+    width: int = 200
+    height: int = 100
+    rotation: float = 0.0  # degrees, around the center
+    opacity: float = 1.0   # clamped to [0, 1]
+    text: str = ""
+    symbol_type: str | None = None
+    custom_symbol: str | None = None
+    font_path: str | None = None
+    font_family: str | None = None
+    icon_size: float | None = None
+    show_components: dict = field(default_factory=dict)
+    colors: dict = field(default_factory=dict)
+    font_sizes: dict = field(default_factory=dict)
+    # canvas scale (scaled timelines): the emitter's fixed pixel caps/floors follow it
+    scale: float = 1.0
+
+    _PX = ("x", "y", "width", "height")
+
+    def _scaled_fields(self, f: float) -> dict:
+        return {
+            **Track._scaled_fields(self, f),
+            "icon_size": None if self.icon_size is None else self.icon_size * f,
+            "font_sizes": _scale_sizes(self.font_sizes, f),
+            "scale": self.scale * f,
+        }
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        return {
+            **Track._coerce(d),
+            "x": _px(d, "x", 0),
+            "y": _px(d, "y", 0),
+            "width": _px(d, "width", 200, lo=1),
+            "height": _px(d, "height", 100, lo=1),
+            "rotation": _f(d, "rotation", 0.0),
+            "opacity": _opacity(d),
+            "text": str(d.get("text") or ""),
+            "symbol_type": _str(d, "symbolType"),
+            "custom_symbol": d.get("customSymbol") or None,
+            "font_path": _str(d, "fontPath"),
+            "font_family": _str(d, "fontFamily"),
+            "icon_size": float(d["iconSize"]) if d.get("iconSize") else None,
+            "show_components": _dict(d, "showComponents"),
+            "colors": _dict(d, "colors"),
+            "font_sizes": _dict(d, "fontSizes"),
+        }
+
+
+@dataclass(slots=True, kw_only=True)
+class WeatherTrack(Track):
+    x: int = 0
+    y: int = 0
+    width: int = 300
+    height: int = 200
+    opacity: float = 1.0  # clamped to [0, 1]
+    location: str = ""    # location, falling back to name
+    name: str | None = None
+    summary: str = ""
+    font_path: str | None = None
+    font_family: str | None = None
+    icon_size: float | None = None
+    h_align: str = "left"
+    v_align: str = "top"
+    show_components: dict = field(default_factory=dict)
+    colors: dict = field(default_factory=dict)
+    font_sizes: dict = field(default_factory=dict)
+    layout: dict = field(default_factory=dict)
+    data: dict = field(default_factory=dict)
+    image: dict = field(default_factory=dict)
+    # canvas position screen-space layout boxes are relative to (set inside flattened groups)
+    layout_origin: Tuple[int, int] | None = None
+    # canvas scale (scaled timelines): the emitter's fixed pixel caps/floors follow it
+    scale: float = 1.0
+
+    _PX = ("x", "y", "width", "height")
+
+    def __post_init__(self):
+        Track.__post_init__(self)
+        # an undated date component prints ffmpeg %{localtime}, which ticks while the video plays
+        self.static = not (self.show_components.get("date") and not self.data.get("dateText"))
+
+    def _scaled_fields(self, f: float) -> dict:
+        return {
+            **Track._scaled_fields(self, f),
+            "icon_size": None if self.icon_size is None else self.icon_size * f,
+            "font_sizes": _scale_sizes(self.font_sizes, f),
+            "layout": {
+                k: (_scale_sizes(box, f) if isinstance(box, dict) else box) for k, box in self.layout.items()
+            },
+            "scale": self.scale * f,
+        }
+
+    @staticmethod
+    def _coerce(d: dict) -> dict:
+        return {
+            **Track._coerce(d),
+            "x": _px(d, "x", 0),
+            "y": _px(d, "y", 0),
+            "width": _px(d, "width", 300, lo=1),
+            "height": _px(d, "height", 200, lo=1),
+            "opacity": _opacity(d),
+            "location": str(d.get("location") or d.get("name") or "").strip(),
+            "name": _str(d, "name"),
+            "summary": str(d.get("summary") or ""),
+            "font_path": _str(d, "fontPath"),
+            "font_family": _str(d, "fontFamily"),
+            "icon_size": float(d["iconSize"]) if d.get("iconSize") else None,
+            "h_align": (d.get("horizontalAlign") or "left").lower(),
+            "v_align": (d.get("verticalAlign") or "top").lower(),
+            "show_components": _dict(d, "showComponents"),
+            "colors": _dict(d, "colors"),
+            "font_sizes": _dict(d, "fontSizes"),
+            "layout": _dict(d, "layout"),
+            "data": _dict(d, "data"),
+            "image": _dict(d, "image"),
+        }
+
+
+TRACK_TYPES: Dict[str, Type[Track]] = {
+    "video": VideoTrack,
+    "image": ImageTrack,
+    "audio": AudioTrack,
+    "text": TextTrack,
+    "datetime": DateTimeTrack,
+    "circle": CircleTrack,
+    "triangle": TriangleTrack,
+    "rectangle": RectangleTrack,
+    "line": LineTrack,
+    "ellipse": EllipseTrack,
+    "sign": SignTrack,
+    "weather": WeatherTrack,
+}
+
+
+def compile_track(d) -> Track:
+    """Typed track for one validated track dict (an already compiled track is returned as-is)."""
+    if isinstance(d, Track):
+        return d
+    cls = TRACK_TYPES.get(d.get("type"), Track)
+    return cls(**cls._coerce(d))
+
+
+# ---------------- Timeline ----------------
+
+@dataclass(slots=True, kw_only=True)
+class Timeline:
+    width: int
+    height: int
+    fps: int = 30
+    duration: float = 0.0
+    background: str = "#000000"
+    background_image: str | None = None
+    background_opacity: float = 1.0
+    background_fit: str = "cover"
+    tracks: Tuple[Track, ...] = ()  # in z order (stable)
+    # sorted, unique start/end seconds of all tracks
+    boundaries: Tuple[float, ...] = field(init=False, default=(), repr=False)
+
+    def __post_init__(self):
+        self.boundaries = tuple(sorted({v for t in self.tracks for v in (t.start, t.end)}))
+
+    @property
+    def positive_duration(self) -> float:
+        """Duration, or at least one frame (ffmpeg needs a positive -t)."""
+        if self.duration > 0:
+            return self.duration
+        return max(1.0 / max(self.fps, 1), 0.0334)
+
+    def media(self, *types: str) -> Tuple[MediaTrack, ...]:
+        return tuple(t for t in self.tracks if t.type in types and isinstance(t, MediaTrack) and t.src)
+
+    def scaled(self, f: float) -> Timeline:
+        """The same timeline on a canvas f times the size (even dimensions, for yuv420p)."""
+        if f == 1:
+            return self
+        return replace(
+            self,
+            width=max(2, int(round(self.width * f / 2)) * 2),
+            height=max(2, int(round(self.height * f / 2)) * 2),
+            tracks=tuple(t.scaled(f) for t in self.tracks),
+        )
+
+
+def compile_timeline(tl) -> Timeline:
+    """
+    Compile a validated timeline dict into the IR. Idempotent: a Timeline is
+    returned unchanged, so every builder entry point accepts either form.
+    """
+    if isinstance(tl, Timeline):
+        return tl
+    tracks = [compile_track(t) for t in tl.get("tracks", [])]
+    tracks.sort(key=lambda t: t.z)
+    bg_opacity = tl.get("backgroundOpacity")
+    return Timeline(
+        width=int(tl["width"]),
+        height=int(tl["height"]),
+        fps=int(tl.get("fps", 30)),
+        duration=float(tl.get("duration") or 0.0),
+        background=tl.get("background") or "#000000",
+        background_image=str(tl["backgroundImage"]) if tl.get("backgroundImage") else None,
+        background_opacity=float(bg_opacity if bg_opacity is not None else 1.0),
+        background_fit=tl.get("backgroundFit") or "cover",
+        tracks=tuple(tracks),
+    )
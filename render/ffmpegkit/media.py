@@ -2,84 +2,133 @@ from __future__ import annotations
 
 from typing import List, Tuple
 
+from .ir import MediaTrack
+
+
+def _src_window(t: MediaTrack) -> Tuple[float, float | None]:
+    """
+    Source range (start, length|None) a video/audio track actually uses.
+    srcIn only applies together with a valid srcOut. `t_offset` is set when the
+    track is rendered inside a time window (segments) and skips that far into the source.
+    The length never exceeds the time the track is on the timeline.
+    """
+    si = 0.0
+    length = None
+    if t.src_out is not None and t.src_out > (t.src_in or 0):
+        si = t.src_in or 0.0
+        length = t.src_out - si
+    off = t.t_offset
+    si += off
+    if length is not None:
+        length = max(0.0, length - off)
+
+    on_timeline = t.end - t.start
+    if on_timeline > 0:
+        length = on_timeline if length is None else min(length, on_timeline)
+    return si, length
+
+
+def _media_input_flags(t: MediaTrack) -> List[str]:
+    """
+    Per-input seek: `-ss` before `-i` jumps to the keyframe preceding srcIn and
+    decodes (accurately) only from there, and `-t` stops reading once the track
+    is done, instead of decoding from frame zero and discarding in a trim filter.
+    """
+    si, length = _src_window(t)
+    flags: List[str] = []
+    if si > 0:
+        flags += ["-ss", f"{si:.3f}"]
+    if length is not None and length > 0:
+        flags += ["-t", f"{length:.3f}"]
+    return flags
+
+
+def _fan_label(idx: int, kind: str, fan: int) -> str:
+    return f"[in{idx}{kind}{fan}]"
+
+
+def _input_pad(t: MediaTrack, kind: str) -> Tuple[str, str]:
+    """
+    (input label, unique suffix) for a media track's video ("v") or audio ("a") stream:
+    the raw `[idx:v]` pad, or its split branch when the input is shared (see inputs.py).
+    """
+    idx = t.in_idx
+    if t.fan is not None:
+        return _fan_label(idx, kind, t.fan), f"{idx}_{t.fan}"
+    return f"[{idx}:{kind}]", f"{idx}"
+
+
+def _audio_chain(t: MediaTrack, idx, pad: Tuple[str, str] | None = None) -> Tuple[str, str]:
+    """
+    Audio filter chain for one input with an audio stream (already seeked/limited
+    by _media_input_flags): align to the track start, apply volume/mute.
+    `pad` overrides the `[idx:a]` input (shared inputs). Returns (filter, output label).
+    """
+    ain, suffix = pad or (f"[{idx}:a]", f"{idx}")
+    ao = f"[a{suffix}]"
+
+    # Volume/mute handling
+    gain = 0.0 if t.muted else max(0.0, min(1.0, t.volume))
+
+    # Align audio start to the track's timeline start
+    delay_ms = max(0, int(round(t.start * 1000)))
+
+    a_chain = f"{ain}asetpts=PTS-STARTPTS,adelay={delay_ms}:all=1"
+    if gain != 1.0:
+        a_chain += f",volume={gain:.3f}"
+    a_chain += f"{ao}"
+    return a_chain, ao
+
+
+def _scale_dim(v: int, native: str, t: MediaTrack):
+    """scale= width/height: 0 keeps the source size ('iw'/'ih'), times native_scale on scaled timelines."""
+    if v or t.native_scale == 1:
+        return v
+    return f"'{native}*{t.native_scale:.6f}'"
+
 
 def _media_filters(tracks, last_v, vcount):
     """
     Build video/image overlays and (conditionally) audio chains.
 
     IMPORTANT:
-    - Expects each media track to have:
-        t["_in_idx"]     -> input index for ffmpeg (set in builder)
-        t["_has_audio"]  -> bool, whether this input actually has an audio stream
-    - Never references [idx:a] unless _has_audio is True.
+    - Expects each media track to have (set by inputs.plan_media_inputs):
+        t.in_idx     -> input index for ffmpeg
+        t.has_audio  -> bool, whether this input actually has an audio stream
+        t.fan        -> split branch when the input is shared, else None
+    - Never references [idx:a] unless has_audio is True.
     """
     filters: List[str] = []
     audio_labels: List[str] = []
 
     for t in tracks:
-        typ = t.get("type")
+        typ = t.type
 
         # ---------- VIDEO & IMAGE (video chain) ----------
         if typ in ("video", "image"):
-            idx = t["_in_idx"]
-            vin = f"[{idx}:v]"
+            vin, _ = _input_pad(t, "v")
             vs = f"[v{vcount}s]"
             vo = f"[v{vcount}o]"
 
-            # optional source trim for video
-            if typ == "video":
-                vtrim = "setpts=PTS-STARTPTS"
-                if t.get("srcIn") is not None or t.get("srcOut") is not None:
-                    si = t.get("srcIn") or 0
-                    so = t.get("srcOut")
-                    if so is not None and float(so) > float(si):
-                        vtrim = f"trim=start={si}:end={so},setpts=PTS-STARTPTS"
-            else:
-                vtrim = "setpts=PTS-STARTPTS"
-
-            w = int(t["w"])
-            h = int(t["h"])
-            filters.append(f"{vin}scale={w}:{h},format=rgba,{vtrim}{vs}")
+            start = t.start
 
-            start = float(t["start"])
-            end = float(t["end"])
-            enable = f"enable='between(t,{start},{end})'"
+            # video inputs are already seeked to srcIn (see _media_input_flags);
+            # shift them so their first frame lands on the track start, like the audio
+            if typ == "video" and start > 0:
+                vpts = f"setpts=PTS-STARTPTS+{start}/TB"
+            else:
+                vpts = "setpts=PTS-STARTPTS"
 
-            x = int(t.get("x", 0))
-            y = int(t.get("y", 0))
-            filters.append(f"{last_v}{vs}overlay={x}:{y}:{enable}{vo}")
+            filters.append(f"{vin}scale={_scale_dim(t.w, 'iw', t)}:{_scale_dim(t.h, 'ih', t)},format=rgba,{vpts}{vs}")
+            filters.append(f"{last_v}{vs}overlay={t.x}:{t.y}:{t.enable}{vo}")
 
             last_v = vo
             vcount += 1
 
         # ---------- AUDIO (audio chain) ----------
         if typ in ("video", "audio"):
-            if t.get("_has_audio"):
-                idx = t["_in_idx"]
-                ain = f"[{idx}:a]"
-                ao = f"[a{idx}]"
-
-                # Volume/mute handling
-                vol = float(t.get("volume", 1.0))
-                muted = bool(t.get("muted", False))
-                gain = 0.0 if muted else max(0.0, min(1.0, vol))
-
-                # Optional trim
-                atrim = "asetpts=PTS-STARTPTS"
-                if t.get("srcIn") is not None or t.get("srcOut") is not None:
-                    si = t.get("srcIn") or 0
-                    so = t.get("srcOut")
-                    if so is not None and float(so) > float(si):
-                        atrim = f"atrim=start={si}:end={so},asetpts=PTS-STARTPTS"
-
-                # Align audio start to the track's timeline start
-                delay_ms = max(0, int(round(float(t.get("start", 0)) * 1000)))
-
-                a_chain = f"{ain}{atrim},adelay={delay_ms}:all=1"
-                if gain != 1.0:
-                    a_chain += f",volume={gain:.3f}"
-                a_chain += f"{ao}"
-
+            if t.has_audio:
+                a_chain, ao = _audio_chain(t, t.in_idx, _input_pad(t, "a"))
                 filters.append(a_chain)
                 audio_labels.append(ao)
             # else: skip cleanly if the input has no audio stream
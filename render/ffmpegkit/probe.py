@@ -0,0 +1,189 @@
+# ffmpegkit/probe.py
+"""
+Persistent ffprobe metadata cache.
+
+One ffprobe run per (path, size, mtime) — ever. Results are stored in a small
+sqlite file shared by every process on the host, so renders of already-seen
+assets spawn no ffprobe at all. The content app probes uploads eagerly; the
+builder probes whatever is still missing in one concurrent batch.
+
+Stored per file:
+  has_audio, has_video, duration, width, height, codec, pix_fmt, fps,
+  keyframe_interval (seconds, measured over the first KEYFRAME_WINDOW seconds)
+"""
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+PROBE_CACHE_PATH = os.environ.get("FFMPEGKIT_PROBE_CACHE") or os.path.join(
+    tempfile.gettempdir(), "ffmpegkit_probe.sqlite3"
+)
+FFPROBE_BIN = os.environ.get("FFPROBE_BIN") or shutil.which("ffprobe") or "ffprobe"
+
+KEYFRAME_WINDOW = 10  # seconds of packets read to estimate GOP length
+MAX_PROBE_WORKERS = 4
+
+
+def _connect() -> sqlite3.Connection:
+    parent = os.path.dirname(PROBE_CACHE_PATH)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    conn = sqlite3.connect(PROBE_CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS probes ("
+        " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, meta TEXT NOT NULL)"
+    )
+    return conn
+
+
+def _stat_key(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _parse_rate(rate: str | None) -> float | None:
+    if not rate or rate in ("0/0", "0"):
+        return None
+    try:
+        if "/" in rate:
+            num, den = rate.split("/", 1)
+            return float(num) / float(den) if float(den) else None
+        return float(rate)
+    except ValueError:
+        return None
+
+
+def _to_float(v) -> float | None:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _run_ffprobe(path: str) -> dict | None:
+    """Single ffprobe process: streams + format + the first few seconds of packets."""
+    try:
+        out = subprocess.check_output(
+            [
+                FFPROBE_BIN,
+                "-v", "error",
+                "-read_intervals", f"%+{KEYFRAME_WINDOW}",
+                "-show_entries",
+                "stream=index,codec_type,codec_name,width,height,pix_fmt,avg_frame_rate,r_frame_rate,duration"
+                ":format=duration"
+                ":packet=stream_index,pts_time,flags",
+                "-of", "json",
+                path,
+            ],
+            stderr=subprocess.DEVNULL,
+        )
+        data = json.loads(out.decode("utf-8", "ignore"))
+    except Exception:
+        return None
+
+    streams = data.get("streams") or []
+    v = next((s for s in streams if s.get("codec_type") == "video"), None)
+    has_audio = any(s.get("codec_type") == "audio" for s in streams)
+
+    duration = _to_float((data.get("format") or {}).get("duration"))
+    if duration is None and v is not None:
+        duration = _to_float(v.get("duration"))
+
+    meta = {
+        "has_audio": has_audio,
+        "has_video": v is not None,
+        "duration": duration,
+        "width": None,
+        "height": None,
+        "codec": None,
+        "pix_fmt": None,
+        "fps": None,
+        "keyframe_interval": None,
+    }
+    if v is not None:
+        meta.update({
+            "width": v.get("width"),
+            "height": v.get("height"),
+            "codec": v.get("codec_name"),
+            "pix_fmt": v.get("pix_fmt"),
+            "fps": _parse_rate(v.get("avg_frame_rate")) or _parse_rate(v.get("r_frame_rate")),
+        })
+        key_times = [
+            t for t in (
+                _to_float(p.get("pts_time"))
+                for p in (data.get("packets") or [])
+                if p.get("stream_index") == v.get("index") and "K" in (p.get("flags") or "")
+            ) if t is not None
+        ]
+        if len(key_times) >= 2:
+            key_times.sort()
+            meta["keyframe_interval"] = round((key_times[-1] - key_times[0]) / (len(key_times) - 1), 3)
+    return meta
+
+
+def probe_many(paths, max_workers: int = MAX_PROBE_WORKERS) -> dict:
+    """
+    Metadata for each readable path: {path: meta}. Cached entries are a single
+    sqlite lookup; uncached files are probed concurrently and persisted.
+    URLs are probed but never persisted; anything that fails to probe is omitted.
+    """
+    unique = list(dict.fromkeys(str(p) for p in paths if p))
+    if not unique:
+        return {}
+
+    keys = {p: _stat_key(p) for p in unique}
+    result: dict = {}
+    missing = []
+
+    try:
+        conn = _connect()
+    except (sqlite3.Error, OSError):
+        conn = None  # cache unavailable: still probe, just don't remember
+
+    try:
+        for p in unique:
+            k = keys[p]
+            if k is None:
+                if "://" in p:
+                    missing.append(p)
+                continue
+            row = None
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT meta FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?", (p, k[0], k[1])
+                ).fetchone()
+            if row:
+                result[p] = json.loads(row[0])
+            else:
+                missing.append(p)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as ex:
+                probed = list(ex.map(_run_ffprobe, missing))
+            for p, meta in zip(missing, probed):
+                if meta is None:
+                    continue  # don't persist failures: the file may still be uploading
+                result[p] = meta
+                k = keys[p]
+                if k is None or conn is None:
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO probes(path, size, mtime_ns, meta) VALUES(?, ?, ?, ?)",
+                    (p, k[0], k[1], json.dumps(meta)),
+                )
+    finally:
+        if conn is not None:
+            conn.close()
+    return result
+
+
+def probe_media(path: str) -> dict | None:
+    return probe_many([path]).get(str(path))
@@ -0,0 +1,53 @@
+# ffmpegkit/proxy.py
+"""
+Preview proxies for uploaded videos.
+
+Phone uploads are often 4K HEVC with multi-second GOPs: a preview decodes
+every full-resolution frame (and every frame from the previous keyframe on a
+seek) only to throw most of the pixels away. A proxy is a one-off transcode
+to at most PROXY_MAX_DIM on the short side, H.264 with a keyframe every
+PROXY_GOP_SECONDS, that preview renders read instead of the original.
+"""
+from typing import List
+
+PROXY_MAX_DIM = 720       # short side, in pixels
+PROXY_GOP_SECONDS = 1
+PROXY_CRF = "23"
+
+
+def needs_proxy(meta: dict | None, max_dim: int = PROXY_MAX_DIM) -> bool:
+    """False when the original is already as cheap to decode as its proxy would be."""
+    if not meta or not meta.get("has_video"):
+        return False
+    w, h = meta.get("width"), meta.get("height")
+    if not w or not h:
+        return True
+    gop = meta.get("keyframe_interval")
+    return (
+        min(w, h) > max_dim
+        or meta.get("codec") != "h264"
+        or meta.get("pix_fmt") not in ("yuv420p", "yuvj420p")
+        or gop is None or gop > 2 * PROXY_GOP_SECONDS
+    )
+
+
+def build_proxy_cmd(src: str, output_path: str, max_dim: int = PROXY_MAX_DIM,
+                    threads: int | None = None) -> List[str]:
+    """ffmpeg args (without the binary) transcoding src into an MP4 proxy, optionally on `threads` threads."""
+    # short side clamped to max_dim, even dimensions for yuv420p, never upscaled
+    f = f"min(1,{max_dim}/min(iw,ih))"
+    scale = f"scale=w='trunc(iw*{f}/2)*2':h='trunc(ih*{f}/2)*2'"
+    return [
+        "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", src,
+        *(["-threads", str(threads)] if threads else []),
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", f"{scale},format=yuv420p",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-crf", PROXY_CRF,
+        "-force_key_frames", f"expr:gte(t,n_forced*{PROXY_GOP_SECONDS})",
+        "-c:a", "aac", "-b:a", "128k",
+        "-movflags", "+faststart",
+        "-y", output_path,
+    ]
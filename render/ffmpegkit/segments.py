@@ -0,0 +1,216 @@
+# ffmpegkit/segments.py
+"""
+Time-segmented final renders.
+
+A long timeline is cut into N windows that are rendered as independent,
+video-only ffmpeg processes (closed GOPs, explicit thread budget), while one
+extra process renders the mixed audio once. The segments are then joined with
+the concat demuxer using stream copy and muxed with the audio track, so the
+final join costs no re-encode.
+
+Windowed previews reuse the same sub-timeline cut (window_timeline) for the
+one range an editor asked to see, optionally at a reduced frame rate.
+
+Cuts prefer track start/end boundaries (fewer overlays alive in each segment)
+and otherwise fall on a fixed GOP grid. Every cut is frame-aligned.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, replace
+from typing import List
+
+from .builder import build_ffmpeg_cmd, build_ffmpeg_audio_cmd, _threading_flags
+from .ir import MediaTrack, Timeline, compile_timeline
+from .probe import probe_many
+
+SEGMENT_MIN_SECONDS = 10.0  # never cut shorter than this
+SEGMENT_GOP_SECONDS = 2.0   # fallback cut grid
+SEGMENT_THREADS = 2         # minimum threads per segment encode
+MAX_SEGMENTS = 16
+SNAP_TOLERANCE = 0.25       # fraction of a segment length a cut may move to hit a track boundary
+
+
+@dataclass
+class SegmentedPlan:
+    windows: List[tuple]                     # [(t0, t1), ...] timeline seconds
+    segment_paths: List[str]
+    segment_cmds: List[List[str]]
+    audio_path: str | None
+    audio_cmd: List[str] | None
+    concat_list_path: str
+    concat_list_body: str
+    concat_cmd: List[str]
+    threads_per_segment: int = 1
+
+
+def _segment_count(duration: float, cpus: int) -> int:
+    by_cpu = max(1, cpus // SEGMENT_THREADS)
+    by_len = max(1, int(duration // SEGMENT_MIN_SECONDS))
+    return max(1, min(by_cpu, by_len, MAX_SEGMENTS))
+
+
+def _plan_cuts(tl: Timeline, duration: float, fps: int, n: int) -> List[float]:
+    boundaries = [b for b in tl.boundaries if 0 < b < duration]
+    seg_len = duration / n
+    cuts: List[float] = []
+    for i in range(1, n):
+        ideal = seg_len * i
+        near = min(boundaries, key=lambda b: abs(b - ideal), default=None)
+        if near is not None and abs(near - ideal) <= SNAP_TOLERANCE * seg_len:
+            c = near
+        else:
+            c = round(ideal / SEGMENT_GOP_SECONDS) * SEGMENT_GOP_SECONDS
+        c = round(c * fps) / fps  # frame grid
+        prev = cuts[-1] if cuts else 0.0
+        if c - prev >= 1.0 and duration - c >= 1.0:
+            cuts.append(c)
+    return cuts
+
+
+def _video_offset(t: MediaTrack, t0: float, meta: dict | None, fps: int) -> float:
+    """
+    Video sources start at their track start, so a track already running at t0 is
+    (t0 - start) seconds into its source. Clamp so a source that already ended still
+    yields its last frame (the full render's overlay would be repeating it).
+    """
+    si = t.src_in or 0.0
+    so = t.src_out
+    limit = None
+    if so is not None and so > si:
+        limit = so - si
+    elif meta and meta.get("duration"):
+        limit = float(meta["duration"])
+    off = max(0.0, t0 - t.start)
+    if limit is not None:
+        off = min(off, max(0.0, limit - 1.0 / max(fps, 1)))
+    return off
+
+
+def _audio_offset(t: MediaTrack, t0: float, meta: dict | None) -> float | None:
+    """Like _video_offset for an audio source; None once the source has already ended at t0."""
+    si = t.src_in or 0.0
+    so = t.src_out
+    limit = None
+    if so is not None and so > si:
+        limit = so - si
+    elif meta and meta.get("duration"):
+        limit = float(meta["duration"])
+    off = max(0.0, t0 - t.start)
+    if limit is not None and off >= limit:
+        return None
+    return off
+
+
+def window_timeline(tl: dict | Timeline, t0: float, t1: float, probes: dict | None = None) -> Timeline:
+    """
+    Sub-timeline covering [t0, t1) re-based to start at 0. Tracks outside the window
+    are dropped; the rest are clipped and shifted.
+    """
+    tl = compile_timeline(tl)
+    probes = probes or {}
+
+    tracks = []
+    for t in tl.tracks:
+        s, e = t.start, t.end
+        # enable=between() is inclusive, so a track ending exactly at t0 still shows on frame t0
+        if e < t0 or s >= t1:
+            continue
+        window = {"start": max(s, t0) - t0, "end": min(e, t1) - t0}
+        if t.type == "video" and s < t0:
+            window["t_offset"] = _video_offset(t, t0, probes.get(t.src), tl.fps)
+        elif t.type == "audio" and s < t0:
+            off = _audio_offset(t, t0, probes.get(t.src))
+            if off is None:
+                continue  # silent for the whole window
+            window["t_offset"] = off
+        tracks.append(replace(t, **window))
+    return replace(tl, duration=t1 - t0, tracks=tuple(tracks))
+
+
+def preview_window(tl: dict | Timeline, t0: float | None = None, t1: float | None = None,
+                   fps: int | None = None) -> Timeline:
+    """
+    The part of a preview an editor asked for: [t0, t1) re-based to 0 (inputs seek
+    straight to t0, tracks outside are dropped) and encoded at `fps` when that is
+    lower than the timeline's. With no window and no fps the timeline is unchanged.
+    """
+    tl = compile_timeline(tl)
+    if t0 is not None or t1 is not None:
+        t0 = t0 or 0.0
+        t1 = tl.duration if t1 is None else t1
+        probes = probe_many(t.src for t in tl.media("video", "audio"))
+        tl = window_timeline(tl, t0, t1, probes)
+    if fps and fps < tl.fps:
+        tl = replace(tl, fps=fps)
+    return tl
+
+
+def _concat_escape(path: str) -> str:
+    return path.replace("'", "'\\''")
+
+
+def plan_segmented_render(tl: dict | Timeline, output_path: str, workdir: str, cpus: int | None = None,
+                          report=None) -> SegmentedPlan | None:
+    """
+    Plan a parallel final render of `tl` into `output_path`, with intermediates in `workdir`.
+    `cpus` is the job's thread budget (default: the whole box), shared by the segments.
+    Returns None when the timeline is too short (or the box too small) to benefit.
+    """
+    tl = compile_timeline(tl)
+    fps = tl.fps
+    duration = tl.duration
+    budget = cpus
+    cpus = cpus or os.cpu_count() or 1
+    n = _segment_count(duration, cpus)
+    if n < 2:
+        return None
+
+    cuts = _plan_cuts(tl, duration, fps, n)
+    if not cuts:
+        return None
+    edges = [0.0, *cuts, duration]
+    windows = list(zip(edges[:-1], edges[1:]))
+    threads = max(1, cpus // len(windows))
+
+    probes = probe_many(t.src for t in tl.media("video"))
+
+    seg_paths: List[str] = []
+    seg_cmds: List[List[str]] = []
+    for i, (t0, t1) in enumerate(windows):
+        p = os.path.join(workdir, f"seg_{i:03d}.mp4")
+        sub = window_timeline(tl, t0, t1, probes)
+        seg_cmds.append(build_ffmpeg_cmd(sub, p, mode="final", audio=False, threads=threads, closed_gop=True,
+                                         report=report))
+        seg_paths.append(p)
+
+    audio_path = os.path.join(workdir, "audio.m4a")
+    # AAC encodes on one thread anyway; don't let it claim more of an explicit budget
+    audio_cmd = build_ffmpeg_audio_cmd(tl, audio_path, threads=1 if budget else None)
+    if audio_cmd is None:
+        audio_path = None
+
+    list_path = os.path.join(workdir, "segments.txt")
+    list_body = "".join(f"file '{_concat_escape(p)}'\n" for p in seg_paths)
+
+    concat = ["-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        concat += ["-i", audio_path]
+    concat += _threading_flags(budget)
+    concat += ["-map", "0:v"]
+    if audio_path:
+        # -shortest mirrors the single-process render's audio/video length behaviour
+        concat += ["-map", "1:a", "-shortest"]
+    concat += ["-c", "copy", "-movflags", "+faststart", "-y", output_path]
+
+    return SegmentedPlan(
+        windows=windows,
+        segment_paths=seg_paths,
+        segment_cmds=seg_cmds,
+        audio_path=audio_path,
+        audio_cmd=audio_cmd,
+        concat_list_path=list_path,
+        concat_list_body=list_body,
+        concat_cmd=concat,
+        threads_per_segment=threads,
+    )
@@ -1,24 +1,30 @@
-from ..colors import _ff_color
+from ..colors import _alpha_byte, _ff_color
+from ..ir import CircleTrack
+from .sprite import _sprite_clip
 
 def _circle_clip(label: str, d: int, r: int, color: str, alpha: float, fps: int) -> str:
+    sprite = _sprite_clip(label, ("circle", r), d, d, color, alpha,
+                          lambda X, Y: (X - r) * (X - r) + (Y - r) * (Y - r) <= r * r)
+    if sprite:
+        return sprite
+
     col = _ff_color(color, alpha)
     return (
         f"color=c={col}:s={d}x{d}:r={fps},format=rgba,"
         f"geq=r='r(X,Y)':g='g(X,Y)':b='b(X,Y)':"
-        f"a='if(lte((X-{r})*(X-{r})+(Y-{r})*(Y-{r}),{r * r}),255,0)'[{label}]"
+        f"a='if(lte((X-{r})*(X-{r})+(Y-{r})*(Y-{r}),{r * r}),{_alpha_byte(color, alpha)},0)'[{label}]"
     )
 
-def _emit_circle_overlays(t: dict, last_v: str, vcount: int, fps: int):
+def _emit_circle_overlays(t: CircleTrack, last_v: str, vcount: int, fps: int):
     filters = []
-    cx = int(round(float(t.get("x", 0))))
-    cy = int(round(float(t.get("y", 0))))
-    r = int(max(1, round(float(t.get("radius", 10)))))
+    cx, cy = t.x, t.y
+    r = t.radius
     d = r * 2
-    enable = f"enable='between(t,{t['start']},{t['end']})'"
+    enable = t.enable
 
-    stroke_w = int(max(0, round(float(t.get("outlineWidth") or 0))))
-    stroke_color = t.get("outline")
-    opac = float(t.get("opacity", 1.0))
+    stroke_w = t.outline_width
+    stroke_color = t.outline
+    opac = t.opacity
     vo = last_v
 
     if stroke_w > 0 and stroke_color:
@@ -32,7 +38,7 @@ def _emit_circle_overlays(t: dict, last_v: str, vcount: int, fps: int):
         vo = vo2
         vcount += 1
 
-    fill_color = t.get("fill") or "#000000"
+    fill_color = t.fill
     r_fill = max(0, r - max(0, stroke_w)) if (stroke_w > 0 and stroke_color) else r
     d_fill = r_fill * 2
     label_fill = f"circ_fill_{vcount}"
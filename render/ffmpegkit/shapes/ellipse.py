@@ -1,5 +1,7 @@
 # ffmpegkit/shapes/ellipse.py
-from ..colors import _ff_color
+from ..colors import _alpha_byte, _ff_color
+from ..ir import EllipseTrack
+from .sprite import _sprite_clip
 
 def _ellipse_inside_expr(w: int, h: int) -> str:
     """
@@ -17,13 +19,35 @@ def _ellipse_inside_expr(w: int, h: int) -> str:
         f"lte(((X-{a})*(X-{a}))*{b2}+((Y-{b})*(Y-{b}))*{a2},{rhs})"
     )
 
+def _ellipse_inside_mask(X, Y, w: int, h: int):
+    """Vectorized twin of _ellipse_inside_expr for sprite rasterization."""
+    a = w / 2.0
+    b = h / 2.0
+    a2 = a * a
+    b2 = b * b
+    return ((X - a) * (X - a)) * b2 + ((Y - b) * (Y - b)) * a2 <= a2 * b2
+
 def _ellipse_clip(label: str, w: int, h: int, color: str, alpha: float, fps: int,
                   inner_offset: int = 0, only_border: bool = False) -> str:
     """
     Create a w×h RGBA clip with a filled ellipse (or border) using geq alpha mask.
-    If only_border=True, alpha=255 where inside(outer) && !inside(inner).
+    If only_border=True, the shape's alpha goes where inside(outer) && !inside(inner).
     inner_offset shrinks width/height for inner mask by 2*offset.
     """
+    def inside(X, Y):
+        if inner_offset > 0:
+            w_in = max(1, w - 2 * inner_offset)
+            h_in = max(1, h - 2 * inner_offset)
+            inner = _ellipse_inside_mask(X - inner_offset, Y - inner_offset, w_in, h_in)
+            if only_border:
+                return _ellipse_inside_mask(X, Y, w, h) & ~inner
+            return inner
+        return _ellipse_inside_mask(X, Y, w, h)
+
+    sprite = _sprite_clip(label, ("ellipse", inner_offset, bool(only_border)), w, h, color, alpha, inside)
+    if sprite:
+        return sprite
+
     col = _ff_color(color, alpha)
 
     # Outer mask (full w×h)
@@ -46,27 +70,25 @@ def _ellipse_clip(label: str, w: int, h: int, color: str, alpha: float, fps: int
         # fill = inner (or full outer when no offset)
         mask = f"({inner_shifted})"
 
-    a_expr = f"if({mask},255,0)"
+    a_expr = f"if({mask},{_alpha_byte(color, alpha)},0)"
 
     return (
         f"color=c={col}:s={w}x{h}:r={fps},format=rgba,"
         f"geq=r='r(X,Y)':g='g(X,Y)':b='b(X,Y)':a='{a_expr}'[{label}]"
     )
 
-def _emit_ellipse_overlays(t: dict, last_v: str, vcount: int, fps: int):
+def _emit_ellipse_overlays(t: EllipseTrack, last_v: str, vcount: int, fps: int):
     """
     Draw stroke (optional) then fill ellipse, positioned by top-left (x,y) with size (width,height).
     """
     filters = []
-    x = int(round(float(t.get("x", 0))))
-    y = int(round(float(t.get("y", 0))))
-    w = int(max(1, round(float(t.get("width", 100)))))
-    h = int(max(1, round(float(t.get("height", 60)))))
-    enable = f"enable='between(t,{t['start']},{t['end']})'"
-    opac = float(t.get("opacity", 1.0))
-    stroke_w = int(max(0, round(float(t.get("outlineWidth") or 0))))
-    stroke_color = (t.get("outline") or "").strip() or None
-    fill_color = (t.get("fill") or t.get("color") or "#000000")
+    x, y = t.x, t.y
+    w, h = t.width, t.height
+    enable = t.enable
+    opac = t.opacity
+    stroke_w = t.outline_width
+    stroke_color = t.outline
+    fill_color = t.fill
 
     vo = last_v
 
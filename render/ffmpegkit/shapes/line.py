@@ -1,8 +1,9 @@
 # ffmpegkit/shapes/line.py
 import math
 from ..colors import _ff_color
+from ..ir import LineTrack
 
-def _emit_line_overlays(t: dict, last_v: str, vcount: int, fps: int):
+def _emit_line_overlays(t: LineTrack, last_v: str, vcount: int, fps: int):
     """
     Draw a straight line using a rotated thin rectangle:
       - Base clip: length x thickness (filled with color @ opacity)
@@ -12,15 +13,13 @@ def _emit_line_overlays(t: dict, last_v: str, vcount: int, fps: int):
     """
     filters = []
 
-    x = int(round(float(t.get("x", 0))))                 # start anchor X
-    y = int(round(float(t.get("y", 0))))                 # start anchor Y
-    L = int(max(1, round(float(t.get("length", 200)))))  # line length (px)
-    T = int(max(1, round(float(t.get("thickness", 2))))) # thickness (px)
-    deg = float(t.get("rotation", 0.0))
-    rad = deg * math.pi / 180.0                          # ffmpeg rotate uses radians
-    color = t.get("color") or "#000000"
-    alpha = float(t.get("opacity", 1.0))
-    enable = f"enable='between(t,{t['start']},{t['end']})'"
+    x, y = t.x, t.y                                      # start anchor
+    L = t.length                                         # line length (px)
+    T = t.thickness                                      # thickness (px)
+    rad = t.rotation * math.pi / 180.0                   # ffmpeg rotate uses radians
+    color = t.color
+    alpha = t.opacity
+    enable = t.enable
 
     # 1) Solid RGBA bar of size L x T
     colspec = _ff_color(color, alpha)  # supports @alpha
@@ -1,4 +1,6 @@
-from ..colors import _ff_color
+from ..colors import _alpha_byte, _ff_color
+from ..ir import RectangleTrack
+from .sprite import _sprite_clip
 
 def _rr_inside_expr(w: int, h: int, r: int) -> str:
     r = max(0, min(r, min(w, h) // 2))
@@ -17,6 +19,18 @@ def _rr_inside_expr(w: int, h: int, r: int) -> str:
     term_corners = f"({tl}+{tr}+{bl}+{br})"
     return f"gt({term1}+{term2}+{term_corners},0)"
 
+def _rr_inside_mask(X, Y, w: int, h: int, r: int):
+    """Vectorized twin of _rr_inside_expr for sprite rasterization."""
+    r = max(0, min(r, min(w, h) // 2))
+    term1 = (X >= r) & (X <= w - r) & (Y >= 0) & (Y <= h)
+    term2 = (Y >= r) & (Y <= h - r) & (X >= 0) & (X <= w)
+    r2 = r * r
+    tl = (X - r) * (X - r) + (Y - r) * (Y - r) <= r2
+    tr = (X - (w - r)) * (X - (w - r)) + (Y - r) * (Y - r) <= r2
+    bl = (X - r) * (X - r) + (Y - (h - r)) * (Y - (h - r)) <= r2
+    br = (X - (w - r)) * (X - (w - r)) + (Y - (h - r)) * (Y - (h - r)) <= r2
+    return term1 | term2 | tl | tr | bl | br
+
 def _rectangle_clip(label: str, w: int, h: int, color: str, alpha: float, fps: int,
                     radius: int = 0, inner_offset: int = 0, only_border: bool = False) -> str:
     col = _ff_color(color, alpha)
@@ -25,6 +39,18 @@ def _rectangle_clip(label: str, w: int, h: int, color: str, alpha: float, fps: i
     h_in = max(1, h - 2 * max(0, inner_offset))
     R_in = max(0, min(R - max(0, inner_offset), min(w_in, h_in) // 2))
 
+    def inside(X, Y):
+        if inner_offset > 0:
+            inner = _rr_inside_mask(X - inner_offset, Y - inner_offset, w_in, h_in, R_in)
+            if only_border:
+                return _rr_inside_mask(X, Y, w, h, R) & ~inner
+            return inner
+        return _rr_inside_mask(X, Y, w, h, R)
+
+    sprite = _sprite_clip(label, ("rect", R, inner_offset, bool(only_border)), w, h, color, alpha, inside)
+    if sprite:
+        return sprite
+
     inside_outer = _rr_inside_expr(w, h, R)
     inside_inner = _rr_inside_expr(w_in, h_in, R_in)
 
@@ -38,25 +64,23 @@ def _rectangle_clip(label: str, w: int, h: int, color: str, alpha: float, fps: i
         else:
             mask = f"({inside_outer})"
 
-    a_expr = f"if({mask},255,0)"
+    a_expr = f"if({mask},{_alpha_byte(color, alpha)},0)"
 
     return (
         f"color=c={col}:s={w}x{h}:r={fps},format=rgba,"
         f"geq=r='r(X,Y)':g='g(X,Y)':b='b(X,Y)':a='{a_expr}'[{label}]"
     )
 
-def _emit_rectangle_overlays(t: dict, last_v: str, vcount: int, fps: int):
+def _emit_rectangle_overlays(t: RectangleTrack, last_v: str, vcount: int, fps: int):
     filters = []
-    x = int(round(float(t.get("x", 0))))
-    y = int(round(float(t.get("y", 0))))
-    w = int(max(1, round(float(t.get("width", 100)))))
-    h = int(max(1, round(float(t.get("height", 100)))))
-    radius = int(max(0, round(float(t.get("borderRadius") or 0))))
-    enable = f"enable='between(t,{t['start']},{t['end']})'"
-    opac = float(t.get("opacity", 1.0))
-    stroke_w = int(max(0, round(float(t.get("outlineWidth") or 0))))
-    stroke_color = (t.get("outline") or "").strip() or None
-    fill_color = (t.get("fill") or t.get("color") or "#000000")
+    x, y = t.x, t.y
+    w, h = t.width, t.height
+    radius = t.border_radius
+    enable = t.enable
+    opac = t.opacity
+    stroke_w = t.outline_width
+    stroke_color = t.outline
+    fill_color = t.fill
 
     vo = last_v
 
@@ -1,6 +1,7 @@
 # ffmpegkit/shapes/sign.py
 import math
 from ..colors import _ff_color, _drawtext_font_opt, _esc_text
+from ..ir import SignTrack
 from .rectangle import _rectangle_clip
 from .triangle import _triangle_clip
 from .circle import _circle_clip
@@ -31,7 +32,7 @@ def _symbol_char(symbol_type: str | None, custom: str | None) -> str:
     }.get(st, "©")
 
 
-def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
+def _emit_sign_overlays(t: SignTrack, last_v: str, vcount: int, fps: int):
     """
     Compose a 'sign' panel off-screen at size (w x h), render components, optionally rotate, then overlay.
     (x,y) is treated as the top-left of the UNROTATED sign (like rectangle).
@@ -40,20 +41,16 @@ def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
     filters = []
 
     # Geometry and timing
-    x = int(round(float(t.get("x", 0))))
-    y = int(round(float(t.get("y", 0))))
-    w = int(max(1, round(float(t.get("width", 200)))))
-    h = int(max(1, round(float(t.get("height", 100)))))
-    rot_deg = float(t.get("rotation", 0.0))
-    rot_rad = rot_deg * math.pi / 180.0
-    enable = f"enable='between(t,{t['start']},{t['end']})'"
+    x, y = t.x, t.y
+    w, h = t.width, t.height
+    rot_rad = t.rotation * math.pi / 180.0
+    enable = t.enable
 
     # Opacity: multiply final alpha by overall opacity
-    overall_opacity = float(_pick(t, "opacity", default=1.0))
-    overall_opacity = max(0.0, min(1.0, overall_opacity))
+    overall_opacity = t.opacity
 
     # Component toggles and styling
-    sc = t.get("showComponents") or {}
+    sc = t.show_components
     show_bg = bool(sc.get("background"))
     show_border = bool(sc.get("border"))
     show_text = bool(sc.get("text"))
@@ -61,7 +58,7 @@ def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
     show_icon = bool(sc.get("icon"))
     show_arrow = bool(sc.get("arrow"))
 
-    cols = t.get("colors") or {}
+    cols = t.colors
     col_bg = _pick(cols, "background", default=None)  # None -> transparent
     col_text = _pick(cols, "text", default="#000000")
     col_border = _pick(cols, "border", default="#000000")
@@ -69,15 +66,16 @@ def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
     col_arrow = _pick(cols, "arrow", default=col_text)
     col_symbol = _pick(cols, "symbol", default=col_text)
 
-    # Sizes
-    fs_cfg = t.get("fontSizes") or {}
-    fs_text = int(max(1, round(float(fs_cfg.get("text") or min(h * 0.35, 48)))))
-    fs_symbol = int(max(1, round(float(fs_cfg.get("symbol") or min(h * 0.40, 56)))))
-    icon_size = int(max(1, round(float(t.get("iconSize") or min(h * 0.40, 36)))))
+    # Sizes (fixed pixel caps/floors follow the canvas scale of preview timelines)
+    s = t.scale
+    fs_cfg = t.font_sizes
+    fs_text = int(max(1, round(float(fs_cfg.get("text") or min(h * 0.35, 48 * s)))))
+    fs_symbol = int(max(1, round(float(fs_cfg.get("symbol") or min(h * 0.40, 56 * s)))))
+    icon_size = int(max(1, round(t.icon_size or min(h * 0.40, 36 * s))))
 
     # Layout helpers
-    margin = int(max(4, round(h * 0.08)))
-    border_w = 2  # fixed for now
+    margin = int(max(4 * s, round(h * 0.08)))
+    border_w = max(1, int(round(2 * s)))  # fixed for now
     bg_radius = int(round(h * 0.12))
 
     # 1) Base transparent canvas for the sign
@@ -122,8 +120,8 @@ def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
 
     # 5) Arrow (triangle) at right center
     if show_arrow:
-        tw = int(max(6, round(h * 0.35)))
-        th = int(max(6, round(h * 0.35)))
+        tw = int(max(6 * s, round(h * 0.35)))
+        th = int(max(6 * s, round(h * 0.35)))
         arr_label = f"sign_arrow_{vcount}"
         filters.append(_triangle_clip(arr_label, tw, th, col_arrow or "#000000", 1.0, "right", fps))
         ax = w - margin - tw
@@ -139,7 +137,7 @@ def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
         gap = int(round(h * 0.05))
 
         if show_symbol and show_text:
-            sym_char = _esc_text(_symbol_char(t.get("symbolType"), t.get("customSymbol")))
+            sym_char = _esc_text(_symbol_char(t.symbol_type, t.custom_symbol))
             vo2 = f"[v{vcount}_sign_sym]"
             filters.append(
                 f"{vo}drawtext={font_opt}:text='{sym_char}':"
@@ -149,7 +147,7 @@ def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
             vo = vo2
             vcount += 1
 
-            text = _esc_text(str(t.get("text") or ""))
+            text = _esc_text(t.text)
             vo2 = f"[v{vcount}_sign_txt]"
             filters.append(
                 f"{vo}drawtext={font_opt}:text='{text}':"
@@ -160,7 +158,7 @@ def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
             vcount += 1
 
         elif show_symbol:
-            sym_char = _esc_text(_symbol_char(t.get("symbolType"), t.get("customSymbol")))
+            sym_char = _esc_text(_symbol_char(t.symbol_type, t.custom_symbol))
             vo2 = f"[v{vcount}_sign_sym2]"
             filters.append(
                 f"{vo}drawtext={font_opt}:text='{sym_char}':"
@@ -171,7 +169,7 @@ def _emit_sign_overlays(t: dict, last_v: str, vcount: int, fps: int):
             vcount += 1
 
         elif show_text:
-            text = _esc_text(str(t.get("text") or ""))
+            text = _esc_text(t.text)
             vo2 = f"[v{vcount}_sign_txt2]"
             filters.append(
                 f"{vo}drawtext={font_opt}:text='{text}':"
@@ -0,0 +1,183 @@
+# ffmpegkit/shapes/sprite.py
+"""
+Pre-rasterized shape sprites.
+
+Static shapes are rasterized once (NumPy, supersampled for anti-aliased
+edges) into an RGBA PNG and fed to the graph through a `movie` source.
+A single-frame overlay input is repeated by `overlay` for the rest of the
+stream, so the per-frame cost is one overlay instead of a full `geq`
+evaluation of every pixel.
+
+Sprites are content-addressed, so identical shapes are rasterized once per
+host and reused across renders. A sqlite index in SPRITE_DIR (shared by all
+processes) tracks their sizes and last use; past SPRITE_MAX_BYTES the least
+recently used are removed, except those used within SPRITE_MIN_AGE_SECONDS,
+which queued or running renders may still reference by path. If NumPy/Pillow
+are unavailable or the color can't be resolved to RGB, callers fall back to
+the `geq` clip.
+"""
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+
+from ..colors import _parse_hex_color, _parse_rgb_func
+
+try:
+    import numpy as np
+    from PIL import Image, ImageColor
+except ImportError:
+    np = None
+
+SPRITE_DIR = os.environ.get("FFMPEGKIT_SPRITE_DIR") or os.path.join(tempfile.gettempdir(), "ffmpegkit_sprites")
+SPRITE_MAX_BYTES = int(os.environ.get("FFMPEGKIT_SPRITE_MAX_BYTES") or 256 * 1024 ** 2)
+SPRITE_MIN_AGE_SECONDS = 3600
+
+# Samples per axis inside each pixel (SUPERSAMPLE**2 samples per pixel).
+SUPERSAMPLE = 4
+
+# Bump when the rasterization itself changes so stale sprites are not reused.
+SPRITE_VERSION = 1
+
+
+def _rgba_tuple(color: str | None, alpha: float | None):
+    """
+    Resolve a CSS-like color (+ opacity) to (r, g, b, a) with a in 0..1.
+    Returns None if the color can't be resolved.
+    """
+    c = (color or "white").strip()
+    rgb_hex, a = _parse_hex_color(c)
+    if not rgb_hex:
+        rgb_hex, a = _parse_rgb_func(c)
+    if rgb_hex:
+        v = int(rgb_hex[2:], 16)
+        rgb = ((v >> 16) & 0xFF, (v >> 8) & 0xFF, v & 0xFF)
+    else:
+        try:
+            rgb = ImageColor.getrgb(c)[:3]
+        except ValueError:
+            return None
+        a = None
+    if alpha is not None:
+        a = max(0.0, min(1.0, float(alpha)))
+    return rgb[0], rgb[1], rgb[2], (1.0 if a is None else a)
+
+
+def _coverage(inside, w: int, h: int):
+    """
+    Fraction of each pixel's area covered by `inside(X, Y)`.
+    Pixel (X, Y) spans [X, X+1) x [Y, Y+1), sampled on a SUPERSAMPLE grid.
+    """
+    acc = np.zeros((h, w), dtype=np.float32)
+    xs = np.arange(w, dtype=np.float64)[None, :]
+    ys = np.arange(h, dtype=np.float64)[:, None]
+    offs = [(k + 0.5) / SUPERSAMPLE for k in range(SUPERSAMPLE)]
+    for dy in offs:
+        Y = ys + dy
+        for dx in offs:
+            acc += inside(xs + dx, Y)
+    acc /= SUPERSAMPLE * SUPERSAMPLE
+    return acc
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(SPRITE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(SPRITE_DIR, "index.sqlite3"), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sprites ("
+        " path TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS sprites_last_used ON sprites(last_used)")
+    return conn
+
+
+def _evict(conn: sqlite3.Connection, keep: str) -> None:
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM sprites").fetchone()[0]
+    if total <= SPRITE_MAX_BYTES:
+        return
+    cutoff = time.time() - SPRITE_MIN_AGE_SECONDS
+    rows = conn.execute(
+        "SELECT path, size FROM sprites WHERE last_used < ? AND path != ? ORDER BY last_used",
+        (cutoff, keep),
+    ).fetchall()
+    for path, size in rows:
+        if total <= SPRITE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        conn.execute("DELETE FROM sprites WHERE path = ?", (path,))
+        total -= size
+
+
+def _record(path: str, created: bool) -> None:
+    """Mark a sprite used (indexing it when just written) and evict down to SPRITE_MAX_BYTES."""
+    conn = _connect()
+    try:
+        if created:
+            conn.execute(
+                "INSERT OR REPLACE INTO sprites(path, size, last_used) VALUES(?, ?, ?)",
+                (path, os.path.getsize(path), time.time()),
+            )
+            _evict(conn, keep=path)
+        else:
+            # sprites written before the index existed are adopted on first reuse
+            conn.execute(
+                "INSERT INTO sprites(path, size, last_used) VALUES(?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET last_used = excluded.last_used",
+                (path, os.path.getsize(path), time.time()),
+            )
+    finally:
+        conn.close()
+
+
+def _escape_movie_path(path: str) -> str:
+    safe = path.replace("\\", "/")
+    return safe.replace(":", r"\:").replace("'", r"\'")
+
+
+def _sprite_clip(label: str, key: tuple, w: int, h: int, color: str, alpha: float, inside) -> str | None:
+    """
+    Rasterize `inside(X, Y)` (vectorized predicate) in `color` at `alpha` into a cached
+    w x h RGBA PNG and return a filter emitting it as [label], or None to request the geq fallback.
+    """
+    if np is None:
+        return None
+    rgba = _rgba_tuple(color, alpha)
+    if rgba is None:
+        return None
+
+    digest = hashlib.sha1(repr((SPRITE_VERSION, SUPERSAMPLE, key, w, h, rgba)).encode("utf-8")).hexdigest()
+    path = os.path.join(SPRITE_DIR, f"{digest}.png")
+
+    created = not os.path.isfile(path)
+    if created:
+        tmp = None
+        try:
+            os.makedirs(SPRITE_DIR, exist_ok=True)
+            cov = _coverage(inside, w, h)
+            img = np.empty((h, w, 4), dtype=np.uint8)
+            img[..., 0] = rgba[0]
+            img[..., 1] = rgba[1]
+            img[..., 2] = rgba[2]
+            img[..., 3] = np.rint(cov * (255.0 * rgba[3])).astype(np.uint8)
+            fd, tmp = tempfile.mkstemp(prefix="sprite_", suffix=".png", dir=SPRITE_DIR)
+            os.close(fd)
+            Image.fromarray(img, "RGBA").save(tmp, format="PNG", compress_level=1)
+            os.replace(tmp, path)  # atomic: concurrent renders never see a partial PNG
+        except Exception:
+            if tmp:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            return None
+    try:
+        _record(path, created)
+    except (sqlite3.Error, OSError):
+        pass  # bookkeeping only: the sprite itself is in place
+
+    return f"movie='{_escape_movie_path(path)}',format=rgba[{label}]"
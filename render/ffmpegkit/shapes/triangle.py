@@ -1,4 +1,6 @@
-from ..colors import _ff_color
+from ..colors import _alpha_byte, _ff_color
+from ..ir import TriangleTrack
+from .sprite import _sprite_clip
 
 def _tri_vertices(w: int, h: int, direction: str):
     if direction == "down":
@@ -22,6 +24,20 @@ def _inside_tri_expr(v0, v1, v2):
     neg = f"(lte({s1},0)*lte({s2},0)*lte({s3},0))"
     return f"gt({pos}+{neg},0)"
 
+def _inside_tri_mask(X, Y, v0, v1, v2):
+    """Vectorized twin of _inside_tri_expr for sprite rasterization."""
+    v0x, v0y = v0
+    v1x, v1y = v1
+    v2x, v2y = v2
+
+    s1 = (X - v2x) * (v1y - v2y) - (Y - v2y) * (v1x - v2x)
+    s2 = (X - v0x) * (v2y - v0y) - (Y - v0y) * (v2x - v0x)
+    s3 = (X - v1x) * (v0y - v1y) - (Y - v1y) * (v0x - v1x)
+
+    pos = (s1 >= 0) & (s2 >= 0) & (s3 >= 0)
+    neg = (s1 <= 0) & (s2 <= 0) & (s3 <= 0)
+    return pos | neg
+
 def _triangle_clip(label: str, w: int, h: int, color: str, alpha: float, direction: str, fps: int,
                    inner_offset: int = 0, only_border: bool = False) -> str:
     col = _ff_color(color, alpha)
@@ -48,6 +64,16 @@ def _triangle_clip(label: str, w: int, h: int, color: str, alpha: float, directi
         vi1 = v1
         vi2 = v2
 
+    def inside(X, Y):
+        inner = _inside_tri_mask(X, Y, vi0, vi1, vi2)
+        if only_border and inner_offset > 0:
+            return _inside_tri_mask(X, Y, v0, v1, v2) & ~inner
+        return inner
+
+    sprite = _sprite_clip(label, ("tri", direction, inner_offset, bool(only_border)), w, h, color, alpha, inside)
+    if sprite:
+        return sprite
+
     inside_outer = _inside_tri_expr(v0, v1, v2)
     inside_inner = _inside_tri_expr(vi0, vi1, vi2)
 
@@ -56,25 +82,23 @@ def _triangle_clip(label: str, w: int, h: int, color: str, alpha: float, directi
     else:
         mask = f"({inside_inner})"
 
-    a_expr = f"if({mask},255,0)"
+    a_expr = f"if({mask},{_alpha_byte(color, alpha)},0)"
 
     return (
         f"color=c={col}:s={w}x{h}:r={fps},format=rgba,"
         f"geq=r='r(X,Y)':g='g(X,Y)':b='b(X,Y)':a='{a_expr}'[{label}]"
     )
 
-def _emit_triangle_overlays(t: dict, last_v: str, vcount: int, fps: int):
+def _emit_triangle_overlays(t: TriangleTrack, last_v: str, vcount: int, fps: int):
     filters = []
-    x = int(round(float(t.get("x", 0))))
-    y = int(round(float(t.get("y", 0))))
-    w = int(max(1, round(float(t.get("width", 100)))))
-    h = int(max(1, round(float(t.get("height", 100)))))
-    direction = (t.get("direction") or "up").lower()
-    enable = f"enable='between(t,{t['start']},{t['end']})'"
-    opac = float(t.get("opacity", 1.0))
-    stroke_w = int(max(0, round(float(t.get("outlineWidth") or 0))))
-    stroke_color = (t.get("outline") or "").strip() or None
-    fill_color = (t.get("fill") or t.get("color") or "#000000")
+    x, y = t.x, t.y
+    w, h = t.width, t.height
+    direction = t.direction
+    enable = t.enable
+    opac = t.opacity
+    stroke_w = t.outline_width
+    stroke_color = t.outline
+    fill_color = t.fill
 
     vo = last_v
 
@@ -1,4 +1,5 @@
 from ..colors import _ff_color, _drawtext_font_opt, _esc_text
+from ..ir import WeatherTrack
 from .rectangle import _rectangle_clip
 from .circle import _circle_clip
 
@@ -55,7 +56,7 @@ def _center_expr_from_box(box):
     return x_expr, y_expr
 
 
-def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
+def _emit_weather_overlays(t: WeatherTrack, last_v: str, vcount: int, fps: int):
     """
     Weather card:
       - Rounded background + optional border
@@ -66,14 +67,12 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
     filters = []
 
     # geometry / timing
-    x = int(round(float(t.get("x", 0))))
-    y = int(round(float(t.get("y", 0))))
-    w = int(max(1, round(float(t.get("width", 300)))))
-    h = int(max(1, round(float(t.get("height", 200)))))
-    enable = f"enable='between(t,{t['start']},{t['end']})'"
+    x, y = t.x, t.y
+    w, h = t.width, t.height
+    enable = t.enable
 
     # colors / sizes
-    cols = t.get("colors") or {}
+    cols = t.colors
     col_bg = _pick(cols, "background", None)
     col_txt = _pick(cols, "text", "#000000")
     col_high = _pick(cols, "highlight", col_txt)
@@ -81,22 +80,24 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
     col_attr = _pick(cols, "attribution", "#666666")
     col_border = _pick(cols, "border", None)
 
-    fs = t.get("fontSizes") or {}
-    fs_location = int(max(10, round(float(fs.get("location") or min(h * 0.18, 64)))))
-    fs_summary  = int(max(10, round(float(fs.get("summary")  or min(h * 0.14, 48)))))
-    fs_date     = int(max(8,  round(float(fs.get("date")     or min(h * 0.12, 36)))))
-    fs_attr     = int(max(8,  round(float(fs.get("attribution") or min(h * 0.10, 28)))))
-    fs_temp     = int(max(10, round(float(fs.get("temperature") or min(h * 0.22, 72)))))
-    fs_maxt     = int(max(10, round(float(fs.get("maxTemp") or min(h * 0.14, 48)))))
-    fs_mint     = int(max(10, round(float(fs.get("minTemp") or min(h * 0.14, 48)))))
-    fs_hum      = int(max(10, round(float(fs.get("humidity") or min(h * 0.14, 44)))))
-    fs_wspd     = int(max(10, round(float(fs.get("windSpeed") or min(h * 0.14, 44)))))
-    fs_wdir     = int(max(10, round(float(fs.get("windDirection") or min(h * 0.14, 44)))))
-
-    icon_size = int(max(1, round(float(t.get("iconSize") or min(h * 0.35, 120)))))
+    # fixed pixel caps/floors follow the canvas scale of preview timelines
+    s = t.scale
+    fs = t.font_sizes
+    fs_location = int(max(10 * s, round(float(fs.get("location") or min(h * 0.18, 64 * s)))))
+    fs_summary  = int(max(10 * s, round(float(fs.get("summary")  or min(h * 0.14, 48 * s)))))
+    fs_date     = int(max(8 * s,  round(float(fs.get("date")     or min(h * 0.12, 36 * s)))))
+    fs_attr     = int(max(8 * s,  round(float(fs.get("attribution") or min(h * 0.10, 28 * s)))))
+    fs_temp     = int(max(10 * s, round(float(fs.get("temperature") or min(h * 0.22, 72 * s)))))
+    fs_maxt     = int(max(10 * s, round(float(fs.get("maxTemp") or min(h * 0.14, 48 * s)))))
+    fs_mint     = int(max(10 * s, round(float(fs.get("minTemp") or min(h * 0.14, 48 * s)))))
+    fs_hum      = int(max(10 * s, round(float(fs.get("humidity") or min(h * 0.14, 44 * s)))))
+    fs_wspd     = int(max(10 * s, round(float(fs.get("windSpeed") or min(h * 0.14, 44 * s)))))
+    fs_wdir     = int(max(10 * s, round(float(fs.get("windDirection") or min(h * 0.14, 44 * s)))))
+
+    icon_size = int(max(1, round(t.icon_size or min(h * 0.35, 120 * s))))
 
     # toggles
-    sc = t.get("showComponents") or {}
+    sc = t.show_components
     show_location    = sc.get("location", True)
     show_summary     = bool(sc.get("summary"))
     show_icon        = bool(sc.get("icon"))
@@ -110,13 +111,16 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
     show_wdir        = bool(sc.get("windDirection"))
 
     # alignment & layout
-    hAlign = (t.get("horizontalAlign") or "left").lower()
-    vAlign = (t.get("verticalAlign") or "top").lower()
-    layout = t.get("layout") or {}
-    data = t.get("data") or {}
+    hAlign = t.h_align
+    vAlign = t.v_align
+    layout = t.layout
+    data = t.data
+    # screen-space layout boxes are relative to the card's canvas position, even when
+    # the card itself is drawn into a flattened layer (ffmpegkit.flatten)
+    lx, ly = t.layout_origin or (x, y)
 
     # visuals
-    margin = int(max(6, round(h * 0.08)))
+    margin = int(max(6 * s, round(h * 0.08)))
     radius = int(round(min(w, h) * 0.08))
     border_w = 1 if col_border else 0
 
@@ -152,7 +156,7 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
         nonlocal vcount
         txt = _esc_text(text or "")
         vo_out = f"[{label}_{vcount}]"
-        box = _get_local_box(layout, box_key, w, h, x, y) if box_key else None
+        box = _get_local_box(layout, box_key, w, h, lx, ly) if box_key else None
         if box:
             x_expr, y_expr = _center_expr_from_box(box)
         else:
@@ -168,12 +172,12 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
 
     # icon (image preferred)
     if show_icon:
-        icon_box = _get_local_box(layout, "icon", w, h, x, y)
+        icon_box = _get_local_box(layout, "icon", w, h, lx, ly)
         d = data.get("icon") or ""
         image_url = None
         # prefer explicit panel image
-        if t.get("image", {}).get("url"):
-            image_url = t["image"]["url"]
+        if t.image.get("url"):
+            image_url = t.image["url"]
         elif d:
             # OpenWeather icon code like "01d"
             image_url = f"https://openweathermap.org/img/wn/{d}@2x.png"
@@ -213,13 +217,13 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
     y_cursor = margin
 
     # location
-    loc_text = str(t.get("location") or t.get("name") or "").strip()
+    loc_text = t.location
     if show_location and loc_text:
         vo = draw_text(vo, loc_text, fs_location, col_high, "location", y_cursor, "wx_loc", halign=hAlign)
         y_cursor += fs_location + int(margin * 0.5)
 
     # summary (prefer data.summary)
-    summary_text = (data.get("summary") or t.get("summary") or "").strip()
+    summary_text = (data.get("summary") or t.summary).strip()
     if show_summary and summary_text:
         vo = draw_text(vo, summary_text, fs_summary, col_txt, "summary", y_cursor, "wx_sum", halign=hAlign)
         y_cursor += fs_summary + int(margin * 0.4)
@@ -259,7 +263,7 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
     if show_date:
         date_color = _pick(cols, "date", col_txt)
         vo2 = f"[v{vcount}_wx_date]"
-        box = _get_local_box(layout, "date", w, h, x, y)
+        box = _get_local_box(layout, "date", w, h, lx, ly)
         if data.get("dateText"):
             # use provided text
             if box:
@@ -290,9 +294,9 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
 
     # attribution (allow override)
     if show_attr:
-        attr_text = str(data.get("attributionText") or _pick(t, "name", "Weather")).strip() or "Weather"
+        attr_text = str(data.get("attributionText") or t.name or "Weather").strip() or "Weather"
         vo2 = f"[v{vcount}_wx_attr]"
-        box = _get_local_box(layout, "attribution", w, h, x, y)
+        box = _get_local_box(layout, "attribution", w, h, lx, ly)
         if box:
             x_expr, y_expr = _center_expr_from_box(box)
         else:
@@ -307,8 +311,7 @@ def _emit_weather_overlays(t: dict, last_v: str, vcount: int, fps: int):
         vcount += 1
 
     # opacity
-    overall_opacity = float(t.get("opacity", 1.0))
-    overall_opacity = max(0.0, min(1.0, overall_opacity))
+    overall_opacity = t.opacity
     vo_op = f"[v{vcount}_wx_alpha]"
     filters.append(f"{vo}format=rgba,colorchannelmixer=aa={overall_opacity:.3f}{vo_op}")
     vo = vo_op
@@ -0,0 +1,94 @@
+# ffmpegkit/stills.py
+"""
+Still-loop renders for static timelines.
+
+A layout made of backgrounds, images, text, shapes, signs and weather cards
+looks the same on every frame while the set of visible tracks stays the same.
+Instead of recomposing every overlay at full fps, the timeline is cut into
+frame intervals with a constant visible set, each interval is composed once
+with build_ffmpeg_cmd_still, and the stills are looped, concatenated and
+encoded (x264 stillimage tuning). Audio is mixed exactly as in a full render.
+
+Anything that changes between frames (video tracks, animated images, weather
+cards printing ffmpeg localtime) disables the fast path.
+"""
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass, replace
+from typing import List
+
+from .builder import build_ffmpeg_cmd_still, build_ffmpeg_cmd_from_stills
+from .ir import Timeline, Track, compile_timeline
+
+STILL_MAX_INTERVALS = 32
+
+
+@dataclass
+class StillPlan:
+    intervals: List[tuple]          # [(first_frame, end_frame), ...]
+    still_paths: List[str]
+    still_cmds: List[List[str]]
+    encode_cmd: List[str]
+
+
+def _frame_intervals(tracks: List[Track], fps: int, total_frames: int) -> List[tuple]:
+    """[(first_frame, end_frame, visible_tracks), ...] with a constant visible set per interval."""
+    candidates = {0}
+    for t in tracks:
+        for f in (math.ceil(t.start * fps - 1e-9), math.floor(t.end * fps + 1e-9) + 1):
+            if 0 < f < total_frames:
+                candidates.add(f)
+
+    intervals: List[tuple] = []
+    for f in sorted(candidates):
+        visible = [t for t in tracks if t.visible_at(f / fps)]
+        ids = [id(t) for t in visible]
+        if intervals and [id(t) for t in intervals[-1][2]] == ids:
+            continue
+        if intervals:
+            intervals[-1] = (intervals[-1][0], f, intervals[-1][2])
+        intervals.append((f, total_frames, visible))
+    return intervals
+
+
+def plan_still_render(tl: dict | Timeline, output_path: str, workdir: str, mode: str = "final", *,
+                      hls_dir: str | None = None, threads: int | None = None, report=None) -> StillPlan | None:
+    """
+    Plan a still-loop render of `tl` into `output_path` (stills composed in `workdir`).
+    Returns None when some visual track changes between frames, or when the layout
+    changes too often for stills to pay off.
+    With a thread budget, each still gets one thread (up to `threads` of them are
+    composed at once) and the final encode gets the whole budget.
+    """
+    tl = compile_timeline(tl)
+    fps = tl.fps
+    total_frames = max(1, int(round(tl.duration * fps)))
+    visual = [t for t in tl.tracks if t.type != "audio"]
+    if not all(t.static for t in visual):
+        return None
+
+    intervals = _frame_intervals(visual, fps, total_frames)
+    if len(intervals) > STILL_MAX_INTERVALS:
+        return None
+
+    paths: List[str] = []
+    cmds: List[List[str]] = []
+    stills: List[tuple] = []
+    for i, (f0, f1, visible) in enumerate(intervals):
+        span = (f1 - f0) / fps
+        # each still is composed at t=0, so visible tracks are pinned on for the frame
+        sub = replace(tl, duration=span, tracks=tuple(replace(t, start=0.0, end=span) for t in visible))
+        p = os.path.join(workdir, f"still_{i:03d}.png")
+        cmds.append(build_ffmpeg_cmd_still(sub, p, fmt="png", downscale=(mode == "preview"),
+                                           threads=1 if threads else None, report=report))
+        paths.append(p)
+        stills.append((p, span))
+
+    return StillPlan(
+        intervals=[(f0, f1) for f0, f1, _ in intervals],
+        still_paths=paths,
+        still_cmds=cmds,
+        encode_cmd=build_ffmpeg_cmd_from_stills(tl, stills, output_path, mode, hls_dir=hls_dir, threads=threads),
+    )
@@ -1,29 +1,25 @@
 from .colors import _esc_text, _ff_color, _drawtext_font_opt
+from .ir import TextTrack
 
-def _emit_text_overlay(t: dict, last_v: str, vcount: int):
+def _emit_text_overlay(t: TextTrack, last_v: str, vcount: int):
     filters = []
     vo = f"[vtxt{vcount}]"
-    enable = f"enable='between(t,{t['start']},{t['end']})'"
     font_opt = _drawtext_font_opt(t)
-    fontcolor = _ff_color(t.get("color") or "white", None)
-    fs = int(t.get("fontSize", 48))
-    x, y = int(t.get("x", 0)), int(t.get("y", 0))
+    fontcolor = _ff_color(t.color, None)
 
     stroke = ""
-    if t.get("strokeColor") and float(t.get("strokeWidth") or 0) > 0:
-        stroke = f":borderw={float(t['strokeWidth'])}:bordercolor={_ff_color(t['strokeColor'])}"
+    if t.stroke_color and t.stroke_width > 0:
+        stroke = f":borderw={t.stroke_width}:bordercolor={_ff_color(t.stroke_color)}"
 
     box_part = ""
-    bgColor = (t.get("bgColor") or "").strip() if isinstance(t.get("bgColor"), str) else None
-    if bgColor:
-        boxcolor = _ff_color(bgColor, None)
-        pad = int(t.get("padding", 6) or 0)
-        box_part = f":box=1:boxcolor={boxcolor}:boxborderw={max(0, pad)}"
+    if t.bg_color:
+        boxcolor = _ff_color(t.bg_color, None)
+        box_part = f":box=1:boxcolor={boxcolor}:boxborderw={max(0, t.padding)}"
 
-    txt = _esc_text(str(t.get("text", "")))
+    txt = _esc_text(t.text)
 
     filters.append(
-        f"{last_v}drawtext={font_opt}:text='{txt}':x={x}:y={y}:fontsize={fs}"
-        f":fontcolor={fontcolor}{stroke}{box_part}:{enable}{vo}"
+        f"{last_v}drawtext={font_opt}:text='{txt}':x={t.x}:y={t.y}:fontsize={t.font_size}"
+        f":fontcolor={fontcolor}{stroke}{box_part}:{t.enable}{vo}"
     )
     return filters, vo, vcount + 1
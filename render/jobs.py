@@ -0,0 +1,828 @@
+# render/jobs.py
+"""
+Render job queue.
+
+The API views only validate + localize the timeline and enqueue a RenderJob
+row. A separate pool of render workers (`python manage.py render_worker`)
+claims queued rows, builds the ffmpeg command and runs it, so gunicorn
+workers never block on an encode.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.timezone import now
+
+from content.models import VideoContent, video_proxy_upload_to
+
+from . import fairshare, render_cache, scheduler
+from .models import RenderJob
+from .ffmpegkit.builder import build_ffmpeg_cmd, build_ffmpeg_cmd_still
+from .ffmpegkit.cost import plan_cost, plan_type
+from .ffmpegkit.segments import plan_segmented_render, preview_window
+from .ffmpegkit.stills import plan_still_render, StillPlan
+from .ffmpegkit.hls import build_hls_remux_cmd
+from .ffmpegkit.flatten import FlattenReport
+from .ffmpegkit.ir import compile_timeline
+from .ffmpegkit.probe import probe_media
+from .ffmpegkit.proxy import build_proxy_cmd, needs_proxy
+from .scheduler import Slot
+
+
+def _resolve_ffmpeg_bin() -> str | None:
+    ff = getattr(settings, "FFMPEG_BIN", None)
+    if ff:
+        ff = os.path.expandvars(os.path.expanduser(str(ff)))
+        if os.path.isfile(ff):
+            return ff
+        found = shutil.which(ff)
+        if found:
+            return found
+    return shutil.which("ffmpeg")
+
+
+def _output_abs(job: RenderJob) -> str:
+    return os.path.join(str(settings.MEDIA_ROOT), job.output_rel)
+
+
+# ---- enqueue ----
+
+def default_priority(kind: str, mode: str) -> int:
+    if kind == "image":
+        return RenderJob.PRIORITY_STILL
+    if mode == "preview":
+        return RenderJob.PRIORITY_INTERACTIVE
+    return RenderJob.PRIORITY_FINAL
+
+
+def enqueue_render(*, user, kind: str, mode: str, timeline: dict, output_rel: str,
+                   locked=None, job_id=None, hls: bool = False, stats: dict | None = None,
+                   coalesce_key: str = "", priority: int | None = None) -> RenderJob:
+    extra = {"id": job_id} if job_id is not None else {}
+    return RenderJob.objects.create(
+        **extra,
+        user=user,
+        locked=locked,
+        kind=kind,
+        mode=mode,
+        timeline=timeline,
+        output_rel=output_rel,
+        hls=hls,
+        stats=stats or {},
+        coalesce_key=coalesce_key,
+        priority=default_priority(kind, mode) if priority is None else priority,
+    )
+
+
+# ---- preview coalescing ----
+
+def inflight_preview(coalesce_key: str, timeline: dict) -> RenderJob | None:
+    """A queued/running preview for the same key and the same localized timeline, to share instead of re-rendering."""
+    inflight = RenderJob.objects.filter(
+        coalesce_key=coalesce_key, mode="preview", kind="video", status__in=("queued", "running"),
+    ).order_by("-created_at")
+    for job in inflight:
+        if job.timeline == timeline:
+            return job
+    return None
+
+
+def supersede_previews(coalesce_key: str, keep) -> int:
+    """
+    Cancel every other in-flight preview for the key. Queued ones are cleaned up
+    here; running ones notice at their next progress write, kill ffmpeg and clean
+    up in the worker (see _ProgressTracker).
+    """
+    cancelled = 0
+    inflight = RenderJob.objects.filter(
+        coalesce_key=coalesce_key, mode="preview", status__in=("queued", "running"),
+    ).exclude(pk=keep)
+    for job in inflight:
+        was = job.status
+        if RenderJob.objects.filter(pk=job.pk, status=was).update(
+            status="cancelled", error="Superseded by a newer preview.", finished_at=now(),
+        ):
+            cancelled += 1
+            if was == "queued":
+                _discard_output(job)
+    return cancelled
+
+
+def job_status_payload(job: RenderJob) -> dict:
+    queue_seconds = None
+    run_seconds = None
+    if job.started_at:
+        queue_seconds = round((job.started_at - job.created_at).total_seconds(), 3)
+        if job.finished_at:
+            run_seconds = round((job.finished_at - job.started_at).total_seconds(), 3)
+    return {
+        "job_id": str(job.id),
+        "render_id": job.id.hex,
+        "kind": job.kind,
+        "mode": job.mode,
+        "priority": job.get_priority_display(),
+        "status": job.status,
+        "error": job.error or None,
+        "cache_hit": job.cache_hit,
+        "stats": job.stats or {},
+        "locked_id": job.locked_id,
+        "output": job.output_rel,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "queue_seconds": queue_seconds,
+        "run_seconds": run_seconds,
+        "progress": _percent(job),
+        "fps": job.progress_fps,
+        "speed": job.progress_speed,
+        "eta_seconds": job.eta_seconds,
+    }
+
+
+def _percent(job: RenderJob) -> float:
+    if job.status == "done":
+        return 100.0
+    return round(100.0 * (job.progress or 0.0), 1)
+
+
+# ---- execution ----
+
+class RenderCancelled(Exception):
+    """The job stopped being 'running' (superseded) while ffmpeg was still encoding."""
+
+
+def _finish(job: RenderJob, status: str, error: str = "") -> bool:
+    """Record the outcome of a running job. False when it was cancelled meanwhile (nothing written)."""
+    job.status = status
+    job.error = error
+    job.finished_at = now()
+    fields = {"status": status, "error": error, "finished_at": job.finished_at}
+    if status == "done":
+        job.progress = 1.0
+        job.eta_seconds = 0.0
+        fields.update(progress=1.0, eta_seconds=0.0)
+    return bool(RenderJob.objects.filter(pk=job.pk).exclude(status="cancelled").update(**fields))
+
+
+def _discard_output(job: RenderJob) -> None:
+    if job.hls:
+        # the preview directory holds only this job's playlist/segments/MP4
+        shutil.rmtree(os.path.dirname(_output_abs(job)), ignore_errors=True)
+    else:
+        try:
+            os.remove(_output_abs(job))
+        except OSError:
+            pass
+
+
+def _fail(job: RenderJob, error: str) -> None:
+    _discard_output(job)
+    lc = job.locked
+    _finish(job, "failed", error)
+    # Same contract as the old synchronous views: a failed export leaves no LockedContent behind.
+    if lc is not None:
+        lc.delete()
+
+
+# ---- progress ----
+
+def _progress_interval() -> float:
+    return float(getattr(settings, "RENDER_PROGRESS_INTERVAL_SECONDS", 1.0))
+
+
+def _to_float(v) -> float | None:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class _ProgressTracker:
+    """
+    Aggregates ffmpeg `-progress` blocks from one or more concurrent processes
+    (segments each cover their own window, so their out_times add up) and
+    writes percent / fps / speed / ETA to the job row at most once per interval.
+    """
+
+    def __init__(self, job: RenderJob, duration: float):
+        self.job_id = job.pk
+        self.duration = max(float(duration or 0.0), 1e-6)
+        self.interval = _progress_interval()
+        self._lock = threading.Lock()
+        self._streams: dict = {}
+        self._last_flush = 0.0
+        # set once the row is no longer 'running' (cancelled): the runners kill ffmpeg
+        self.cancelled = threading.Event()
+
+    def update(self, stream, block: dict) -> None:
+        # ffmpeg's "out_time_ms" is in microseconds too; prefer the explicit key
+        us = _to_float(block.get("out_time_us") or block.get("out_time_ms"))
+        fps = _to_float(block.get("fps"))
+        speed = _to_float((block.get("speed") or "").rstrip("x"))
+        with self._lock:
+            prev = self._streams.get(stream, (0.0, None, None))
+            self._streams[stream] = (
+                max(0.0, us / 1e6) if us is not None else prev[0],
+                fps if fps is not None else prev[1],
+                speed if speed is not None else prev[2],
+            )
+
+    def flush(self, force: bool = False) -> None:
+        mono = time.monotonic()
+        if not force and mono - self._last_flush < self.interval:
+            return
+        with self._lock:
+            streams = list(self._streams.values())
+        if not streams:
+            return
+        self._last_flush = mono
+        done = min(self.duration, sum(s[0] for s in streams))
+        fps = sum(s[1] for s in streams if s[1]) or None
+        speed = sum(s[2] for s in streams if s[2]) or None
+        eta = round((self.duration - done) / speed, 1) if speed else None
+        updated = RenderJob.objects.filter(pk=self.job_id, status="running").update(
+            progress=round(done / self.duration, 4),
+            progress_fps=fps,
+            progress_speed=speed,
+            eta_seconds=eta,
+        )
+        if not updated:
+            self.cancelled.set()
+
+
+def _wait(proc: subprocess.Popen) -> float:
+    """Reap ffmpeg; returns the CPU seconds (user + system) it used, 0.0 where the OS can't tell."""
+    try:
+        _pid, status, usage = os.wait4(proc.pid, 0)
+    except (AttributeError, ChildProcessError):
+        proc.wait()
+        return 0.0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _run_ffmpeg(ffmpeg_bin: str, args: list, on_progress=None, slot: Slot | None = None,
+                cancel: threading.Event | None = None) -> float:
+    """
+    Run ffmpeg, feeding each `-progress` key=value block on stdout to on_progress.
+    Blocks arrive about twice a second, so line-by-line parsing costs nothing next to the encode.
+    The process gets the slot's CPUs and niceness, and is killed (RenderCancelled)
+    at the first progress block after `cancel` is set.
+    Returns the CPU seconds ffmpeg used; raises CalledProcessError (with stderr) on a non-zero exit.
+    """
+    cmd = [*scheduler.slot_command(slot), ffmpeg_bin, *args]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # drain stderr concurrently so a chatty failure can't fill the pipe and stall ffmpeg
+    err: list = []
+    drain = threading.Thread(target=lambda: err.append(proc.stderr.read()), daemon=True)
+    drain.start()
+
+    block: dict = {}
+    for raw in proc.stdout:
+        key, sep, val = raw.decode("ascii", "ignore").strip().partition("=")
+        if not sep:
+            continue
+        if key == "progress":
+            if on_progress is not None:
+                on_progress(block)
+            block = {}
+            if cancel is not None and cancel.is_set():
+                proc.kill()
+                break
+        else:
+            block[key] = val
+
+    cpu = _wait(proc)
+    rc = proc.returncode
+    drain.join()
+    if cancel is not None and cancel.is_set():
+        raise RenderCancelled()
+    if rc:
+        raise subprocess.CalledProcessError(rc, [ffmpeg_bin, *args], stderr=b"".join(err))
+    return cpu
+
+
+def _run_segmented(ffmpeg_bin: str, plan, tracker: _ProgressTracker | None = None,
+                   slot: Slot | None = None) -> float:
+    """
+    Render all segments (and the single audio pass) in parallel processes,
+    then stream-copy concat them. Returns total CPU seconds; raises CalledProcessError like a single run.
+    The first process to fail stops the others, so a bad segment doesn't hold the slot until the rest finish.
+    """
+    def _seg_progress(i):
+        return (lambda b: tracker.update(i, b)) if tracker else None
+
+    cancel = tracker.cancelled if tracker else None
+    stop = threading.Event()  # job cancelled or a sibling failed: kill every process
+    with ThreadPoolExecutor(max_workers=len(plan.segment_cmds) + 1) as ex:
+        futs = [ex.submit(_run_ffmpeg, ffmpeg_bin, c, _seg_progress(i), slot, stop)
+                for i, c in enumerate(plan.segment_cmds)]
+        if plan.audio_cmd:
+            futs.append(ex.submit(_run_ffmpeg, ffmpeg_bin, plan.audio_cmd, None, slot, stop))
+        # progress rows are written from this thread only: pool threads never open DB connections
+        pending = set(futs)
+        while pending:
+            done, pending = wait(pending, timeout=_progress_interval(), return_when=FIRST_EXCEPTION)
+            if tracker:
+                tracker.flush()
+            if (cancel is not None and cancel.is_set()) or any(fut.exception() for fut in done):
+                stop.set()
+    if cancel is not None and cancel.is_set():
+        raise RenderCancelled()
+    for fut in futs:
+        # the failure itself, not the RenderCancelled of the siblings it stopped
+        if fut.exception() is not None and not isinstance(fut.exception(), RenderCancelled):
+            raise fut.exception()
+    cpu = sum(fut.result() for fut in futs)
+    with open(plan.concat_list_path, "w", encoding="utf-8") as f:
+        f.write(plan.concat_list_body)
+    return cpu + _run_ffmpeg(ffmpeg_bin, plan.concat_cmd, slot=slot)
+
+
+def _run_stills(ffmpeg_bin: str, plan: StillPlan, on_progress=None, slot: Slot | None = None,
+                cancel: threading.Event | None = None) -> float:
+    """
+    Compose each distinct frame once (at most one per budgeted thread at a time),
+    then encode the still loop. Returns total CPU seconds. `cancel` stops the
+    composes as well as the encode.
+    """
+    parallel = slot.threads if slot else (os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max(1, min(len(plan.still_cmds), parallel))) as ex:
+        futs = [ex.submit(_run_ffmpeg, ffmpeg_bin, c, None, slot, cancel) for c in plan.still_cmds]
+        pending = set(futs)
+        while pending:
+            done, pending = wait(pending, timeout=_progress_interval(), return_when=FIRST_EXCEPTION)
+            if on_progress is not None:
+                on_progress({})  # flushes the job row, which is how a cancel is noticed
+            if (cancel is not None and cancel.is_set()) or any(fut.exception() for fut in done):
+                for fut in pending:
+                    fut.cancel()  # don't start the stills still queued
+                break
+    if cancel is not None and cancel.is_set():
+        raise RenderCancelled()
+    for fut in futs:
+        if not fut.cancelled() and fut.exception() is not None:
+            raise fut.exception()
+    cpu = sum(fut.result() for fut in futs)
+    return cpu + _run_ffmpeg(ffmpeg_bin, plan.encode_cmd, on_progress, slot, cancel)
+
+
+def cache_variant(kind: str, mode: str) -> str:
+    return "still" if kind == "image" else mode
+
+
+def build_plan(timeline: dict, kind: str, mode: str, output_abs: str, *, hls: bool = False,
+               threads: int | None = None, report: FlattenReport | None = None):
+    """
+    (compiled timeline, plan, args, workdir) for rendering a localized timeline into
+    output_abs: a StillPlan / SegmentedPlan when a fast path applies (args is None),
+    else the single ffmpeg command (plan is None). Intermediates go to workdir (None
+    when unused), which the caller removes. Raises when the graph can't be built.
+    """
+    workdir = None
+    plan = None
+    try:
+        # typed IR, compiled once and shared by every planner below
+        tl = compile_timeline(timeline)
+        if mode == "preview":
+            tl = preview_window(tl, timeline.get("previewStart"), timeline.get("previewEnd"),
+                                timeline.get("previewFps"))
+        if kind == "image":
+            args = build_ffmpeg_cmd_still(tl, output_abs, fmt="png", threads=threads, report=report)
+        else:
+            hls_dir = os.path.dirname(output_abs) if hls else None
+            if getattr(settings, "RENDER_STILL_FASTPATH", True):
+                workdir = tempfile.mkdtemp(prefix="render_")
+                plan = plan_still_render(tl, output_abs, workdir, mode, hls_dir=hls_dir, threads=threads,
+                                         report=report)
+            if plan is None and mode == "final" and getattr(settings, "RENDER_SEGMENTED_FINAL", True):
+                workdir = workdir or tempfile.mkdtemp(prefix="render_")
+                plan = plan_segmented_render(tl, output_abs, workdir, cpus=threads, report=report)
+            args = None if plan else build_ffmpeg_cmd(
+                tl, output_abs, mode=mode, threads=threads, hls_dir=hls_dir, report=report
+            )
+    except Exception:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    return tl, plan, args, workdir
+
+
+def _remux_hls(job: RenderJob, output_abs: str) -> bool:
+    """Cached MP4 -> VOD playlist by stream copy. False means render normally instead."""
+    ffmpeg_bin = _resolve_ffmpeg_bin()
+    if not ffmpeg_bin:
+        return False
+    try:
+        _run_ffmpeg(ffmpeg_bin, build_hls_remux_cmd(output_abs, os.path.dirname(output_abs)))
+    except (subprocess.CalledProcessError, OSError):
+        return False
+    return True
+
+
+def _complete(job: RenderJob) -> None:
+    if job.locked_id:
+        lc = job.locked
+        lc.file.name = job.output_rel
+        lc.status = "saved"
+        lc.save(update_fields=["file", "status"])
+    if not _finish(job, "done"):
+        _discard_output(job)  # superseded just as it finished
+
+
+def run_render_job(job: RenderJob, slot: Slot | None = None) -> None:
+    """
+    Build and run ffmpeg for a claimed job, then record the outcome
+    on the job (and its LockedContent, for saves).
+    Identical timelines over identical assets are served from the render cache.
+    `slot` (see scheduler) sets the job's thread budget and CPU affinity;
+    without one ffmpeg picks its own thread counts.
+    """
+    output_abs = _output_abs(job)
+    os.makedirs(os.path.dirname(output_abs), exist_ok=True)
+
+    timeline = job.timeline
+    proxies = 0
+    if job.mode == "preview" and _proxies_enabled():
+        try:
+            timeline, proxies = _use_proxies(timeline)
+        except Exception:
+            pass  # previews of the originals are only slower
+
+    # The cache is an optimization only: any cache error falls through to a normal render.
+    try:
+        cache_key = render_cache.cache_key(timeline, cache_variant(job.kind, job.mode))
+    except Exception:
+        cache_key = None
+    if cache_key:
+        try:
+            hit = render_cache.fetch(cache_key, output_abs)
+        except Exception:
+            hit = False
+        if hit and job.hls:
+            hit = _remux_hls(job, output_abs)
+        if hit:
+            job.cache_hit = True
+            job.save(update_fields=["cache_hit"])
+            _complete(job)
+            return
+
+    ffmpeg_bin = _resolve_ffmpeg_bin()
+    if not ffmpeg_bin:
+        _fail(job, "ffmpeg not found. Configure FFMPEG_BIN or PATH.")
+        return
+
+    threads = slot.threads if slot else None
+    if slot:
+        slot.nice = scheduler.priority_nice(job.priority)
+    report = FlattenReport()
+    try:
+        tl, plan, args, workdir = build_plan(timeline, job.kind, job.mode, output_abs, hls=job.hls,
+                                             threads=threads, report=report)
+    except Exception as e:
+        _fail(job, f"Failed to build ffmpeg graph: {e}")
+        return
+
+    job.stats = {**(job.stats or {}), "flatten": report.as_dict()}
+    if job.mode == "preview":
+        job.stats["proxies"] = proxies
+    if slot:
+        job.stats["slot"] = {"index": slot.index, "threads": slot.threads,
+                             "cpus": list(slot.cpus) if slot.cpus else None}
+    try:
+        # the model's prediction, kept next to the measured cpu_seconds for calibration (see explain)
+        job.stats["cost"] = {"plan": plan_type(plan or args),
+                             "cpu_seconds": round(plan_cost(tl, plan or args).cpu_seconds, 3)}
+    except Exception:
+        pass
+    job.save(update_fields=["stats"])
+
+    tracker = _ProgressTracker(job, 1.0 if job.kind == "image" else tl.duration)
+
+    def _on_progress(block):
+        tracker.update(0, block)
+        tracker.flush()
+
+    try:
+        if isinstance(plan, StillPlan):
+            cpu = _run_stills(ffmpeg_bin, plan, _on_progress, slot, tracker.cancelled)
+        elif plan:
+            cpu = _run_segmented(ffmpeg_bin, plan, tracker, slot)
+        else:
+            cpu = _run_ffmpeg(ffmpeg_bin, args, _on_progress, slot, tracker.cancelled)
+    except RenderCancelled:
+        _discard_output(job)
+        return
+    except subprocess.CalledProcessError as e:
+        _fail(job, "ffmpeg failed: " + (e.stderr or b"").decode("utf-8", errors="ignore"))
+        return
+    except OSError as e:
+        _fail(job, f"ffmpeg could not be started: {e}")
+        return
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    job.cpu_seconds = round(cpu, 3)
+    job.save(update_fields=["cpu_seconds"])
+
+    if cache_key:
+        try:
+            render_cache.store(cache_key, output_abs)
+        except Exception:
+            pass
+
+    _complete(job)
+
+
+# ---- preview proxies ----
+
+def _proxies_enabled() -> bool:
+    return bool(getattr(settings, "RENDER_PROXIES", True))
+
+
+def _use_proxies(timeline: dict) -> tuple[dict, int]:
+    """
+    Point every video track whose upload has a ready proxy at the proxy instead.
+    Returns (timeline, number of tracks switched); one query per render.
+    """
+    media_root = os.path.join(str(settings.MEDIA_ROOT), "")
+    names = {
+        os.path.relpath(t["src"], media_root)
+        for t in timeline.get("tracks", [])
+        if t.get("type") == "video" and str(t.get("src") or "").startswith(media_root)
+    }
+    if not names:
+        return timeline, 0
+    rows = VideoContent.objects.filter(file__in=names, proxy_status="ready").values_list("file", "proxy")
+    proxies = {
+        os.path.join(media_root, name): os.path.join(media_root, proxy)
+        for name, proxy in rows if proxy and os.path.isfile(os.path.join(media_root, proxy))
+    }
+    if not proxies:
+        return timeline, 0
+
+    tracks = []
+    switched = 0
+    for t in timeline.get("tracks", []):
+        if t.get("type") == "video" and t.get("src") in proxies:
+            t = {**t, "src": proxies[t["src"]]}
+            switched += 1
+        tracks.append(t)
+    return {**timeline, "tracks": tracks}, switched
+
+
+def _claim_next_upload(worker_name: str, waiting: str, claimed_status: str) -> VideoContent | None:
+    """Same conditional-UPDATE claim as _claim_next, for uploads in proxy_status `waiting`."""
+    candidates = (
+        VideoContent.objects.filter(proxy_status=waiting)
+        .order_by("created_at")
+        .values_list("id", flat=True)[:10]
+    )
+    for video_id in candidates:
+        claimed = VideoContent.objects.filter(pk=video_id, proxy_status=waiting).update(
+            proxy_status=claimed_status, proxy_worker=worker_name
+        )
+        if claimed:
+            return VideoContent.objects.get(pk=video_id)
+    return None
+
+
+def _claim_next_proxy(worker_name: str) -> VideoContent | None:
+    return _claim_next_upload(worker_name, "pending", "running")
+
+
+def _claim_next_probe(worker_name: str) -> VideoContent | None:
+    return _claim_next_upload(worker_name, "probe", "probing")
+
+
+def run_probe_job(video: VideoContent) -> None:
+    """
+    Read a claimed upload's metadata: warms the probe cache so renders never wait on
+    ffprobe, fills duration_seconds, and queues a preview proxy for heavy originals.
+    """
+    meta = None
+    try:
+        meta = probe_media(video.file.path) if video.file else None
+    except Exception:
+        pass
+    update = {"proxy_status": "", "proxy_worker": ""}
+    if meta and meta.get("duration") and not video.duration_seconds:
+        update["duration_seconds"] = meta["duration"]
+    if _proxies_enabled() and needs_proxy(meta, int(getattr(settings, "RENDER_PROXY_MAX_DIM", 720))):
+        update["proxy_status"] = "pending"
+    VideoContent.objects.filter(pk=video.pk, proxy_status="probing").update(**update)
+
+
+def run_proxy_job(video: VideoContent, slot: Slot | None = None) -> None:
+    """Transcode a claimed upload into its preview proxy (within `slot`'s budget, if given)."""
+    ffmpeg_bin = _resolve_ffmpeg_bin()
+    src = video.file.path if video.file else None
+    if not ffmpeg_bin or not src or not os.path.isfile(src):
+        VideoContent.objects.filter(pk=video.pk).update(proxy_status="failed", proxy_worker="")
+        return
+
+    stem = os.path.splitext(os.path.basename(video.file.name))[0]
+    rel = video_proxy_upload_to(video, f"{video.pk}-{stem}.mp4")
+    out_abs = os.path.join(str(settings.MEDIA_ROOT), rel)
+    os.makedirs(os.path.dirname(out_abs), exist_ok=True)
+    tmp = f"{out_abs}.part.mp4"
+    max_dim = int(getattr(settings, "RENDER_PROXY_MAX_DIM", 720))
+    if slot:
+        slot.nice = scheduler.priority_nice(RenderJob.PRIORITY_BATCH)  # nobody is waiting on a proxy
+    try:
+        _run_ffmpeg(ffmpeg_bin, build_proxy_cmd(src, tmp, max_dim, threads=slot.threads if slot else None),
+                    slot=slot)
+        os.replace(tmp, out_abs)
+    except (subprocess.CalledProcessError, OSError):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        VideoContent.objects.filter(pk=video.pk).update(proxy_status="failed", proxy_worker="")
+        return
+
+    try:
+        probe_media(out_abs)  # previews then never wait on ffprobe for it
+    except Exception:
+        pass
+    VideoContent.objects.filter(pk=video.pk).update(proxy=rel, proxy_status="ready", proxy_worker="")
+
+
+# ---- worker pool ----
+
+def _claim_next(worker_name: str, max_priority: int | None = None) -> RenderJob | None:
+    """
+    Atomically move the next queued job to 'running': most urgent priority class
+    first, then weighted fair share between users (see fairshare), optionally only
+    jobs at max_priority or more urgent. The conditional UPDATE makes this safe
+    across threads and processes without row locks.
+    """
+    for job_id in fairshare.candidates(max_priority):
+        claimed = RenderJob.objects.filter(pk=job_id, status="queued").update(
+            status="running", started_at=now(), worker=worker_name
+        )
+        if claimed:
+            return RenderJob.objects.select_related("locked").get(pk=job_id)
+    return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def requeue_orphaned_jobs(host: str) -> int:
+    """
+    Jobs (and proxy transcodes / upload probes) left running by a dead worker process on this
+    host died with it; put them back in the queue.
+    """
+    requeued = 0
+    running = RenderJob.objects.filter(status="running", worker__startswith=f"{host}:")
+    for job_id, worker in running.values_list("id", "worker"):
+        try:
+            pid = int(worker.split(":")[1])
+        except (IndexError, ValueError):
+            continue
+        if pid == os.getpid() or _pid_alive(pid):
+            continue
+        requeued += RenderJob.objects.filter(pk=job_id, status="running").update(
+            status="queued", started_at=None, worker="", progress=0.0,
+            progress_fps=None, progress_speed=None, eta_seconds=None,
+        )
+
+    for claimed_status, waiting in (("running", "pending"), ("probing", "probe")):
+        running = VideoContent.objects.filter(proxy_status=claimed_status, proxy_worker__startswith=f"{host}:")
+        for video_id, worker in running.values_list("id", "proxy_worker"):
+            try:
+                pid = int(worker.split(":")[1])
+            except (IndexError, ValueError):
+                continue
+            if pid == os.getpid() or _pid_alive(pid):
+                continue
+            requeued += VideoContent.objects.filter(pk=video_id, proxy_status=claimed_status).update(
+                proxy_status=waiting, proxy_worker="",
+            )
+    return requeued
+
+
+class RenderWorkerPool:
+    """
+    N threads, each claiming and running one job at a time. ffmpeg runs as a
+    subprocess, so threads spend their time waiting and the GIL is not a factor.
+    A thread only claims work while it holds one of the host's render slots
+    (scheduler.acquire_slot), so all worker processes together never run more
+    than RENDER_MAX_CONCURRENT encodes. `interactive_workers` more threads only
+    run interactive previews and stills, in the reserved slots when the regular
+    ones are all busy, so they never queue behind long exports.
+    """
+
+    def __init__(self, workers: int = 2, poll_seconds: float = 1.0, interactive_workers: int = 1):
+        self.workers = max(1, int(workers))
+        self.interactive_workers = max(0, int(interactive_workers))
+        self.poll_seconds = max(0.1, float(poll_seconds))
+        self.host = socket.gethostname()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def _loop(self, worker_name: str, interactive: bool = False) -> None:
+        while not self._stop.is_set():
+            close_old_connections()
+            slot = scheduler.acquire_slot()
+            if slot is None and interactive and self._interactive_waiting():
+                slot = scheduler.acquire_slot(reserved=True)
+            if slot is None:
+                # host at capacity: leave the queue to whoever frees a slot
+                self._stop.wait(self.poll_seconds)
+                continue
+            try:
+                busy = self._run_next(worker_name, slot, interactive)
+            finally:
+                slot.release()
+            if not busy:
+                self._stop.wait(self.poll_seconds)
+        close_old_connections()
+
+    @staticmethod
+    def _interactive_waiting() -> bool:
+        try:
+            return RenderJob.objects.filter(status="queued", priority__lte=RenderJob.PRIORITY_STILL).exists()
+        except Exception:
+            return False
+
+    def _run_next(self, worker_name: str, slot: Slot, interactive: bool = False) -> bool:
+        """Run one queued job (or, when there is none, one upload probe or proxy transcode). False when idle."""
+        max_priority = RenderJob.PRIORITY_STILL if interactive or slot.reserved else None
+        try:
+            job = _claim_next(worker_name, max_priority)
+        except Exception:
+            job = None
+        if job is None:
+            if interactive:
+                return False
+            # idle: read new uploads' metadata, then build their preview proxies
+            return self._run_next_probe(worker_name) or self._run_next_proxy(worker_name, slot)
+        try:
+            run_render_job(job, slot)
+        except Exception as e:
+            _fail(job, f"Render worker error: {e}")
+        return True
+
+    def _run_next_probe(self, worker_name: str) -> bool:
+        try:
+            video = _claim_next_probe(worker_name)
+        except Exception:
+            return False
+        if video is None:
+            return False
+        try:
+            run_probe_job(video)
+        except Exception:
+            VideoContent.objects.filter(pk=video.pk, proxy_status="probing").update(proxy_status="", proxy_worker="")
+        return True
+
+    def _run_next_proxy(self, worker_name: str, slot: Slot) -> bool:
+        if not _proxies_enabled():
+            return False
+        try:
+            video = _claim_next_proxy(worker_name)
+        except Exception:
+            return False
+        if video is None:
+            return False
+        try:
+            run_proxy_job(video, slot)
+        except Exception:
+            VideoContent.objects.filter(pk=video.pk).update(proxy_status="failed", proxy_worker="")
+        return True
+
+    def start(self) -> None:
+        requeue_orphaned_jobs(self.host)
+        for i in range(self.workers + self.interactive_workers):
+            name = f"{self.host}:{os.getpid()}:{i}"
+            interactive = i >= self.workers
+            th = threading.Thread(target=self._loop, args=(name, interactive), daemon=True,
+                                  name=f"render-{'interactive' if interactive else 'worker'}-{i}")
+            th.start()
+            self._threads.append(th)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def join(self) -> None:
+        # join with a timeout so the main thread still sees KeyboardInterrupt
+        while any(th.is_alive() for th in self._threads):
+            for th in self._threads:
+                th.join(timeout=0.5)
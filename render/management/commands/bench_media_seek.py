@@ -0,0 +1,144 @@
+"""
+Reference run (600 s synthetic 720p30 H.264 source, GOP 250, 5 s clip at srcIn=480 s,
+ffmpeg 6.0 static, 1 CPU, median of 3): trim filter 22.04 s, input seek 0.49 s (45x).
+
+--check-sync renders a track that starts at a non-zero time, with srcIn off a keyframe,
+through the real builder and reports where its video flash and audio beep land.
+"""
+import os
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from render.jobs import _resolve_ffmpeg_bin
+from render.ffmpegkit.builder import build_ffmpeg_cmd
+from render.ffmpegkit.ir import compile_track
+from render.ffmpegkit.media import _media_input_flags
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark a trimmed video track: decode-and-discard trim filter vs "
+        "input-level -ss/-t seeking (what the builder emits)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--src", help="Source video. Default: a synthetic long H.264 clip.")
+        parser.add_argument("--synthetic-seconds", type=float, default=600.0,
+                            help="Length of the generated source when --src is not given.")
+        parser.add_argument("--src-in", type=float, default=None,
+                            help="srcIn in seconds. Default: 80%% of the source length.")
+        parser.add_argument("--length", type=float, default=5.0, help="Clip length (srcOut - srcIn).")
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--check-sync", action="store_true",
+                            help="Instead of timing, check A/V sync of a track starting at a non-zero time.")
+
+    def _make_source(self, ffmpeg_bin: str, seconds: float, workdir: str) -> str:
+        path = os.path.join(workdir, "long_source.mp4")
+        self.stdout.write(f"generating {seconds:.0f}s synthetic source ...")
+        subprocess.run(
+            [
+                ffmpeg_bin, "-nostdin", "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={seconds}",
+                "-c:v", "libx264", "-preset", "ultrafast", "-g", "250", "-pix_fmt", "yuv420p",
+                "-y", path,
+            ],
+            check=True,
+        )
+        return path
+
+    def _time(self, ffmpeg_bin: str, args: list, runs: int) -> float:
+        samples = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            subprocess.run([ffmpeg_bin, "-nostdin", "-hide_banner", "-loglevel", "error", *args,
+                            "-f", "null", "-"], check=True)
+            samples.append(time.perf_counter() - t0)
+        return statistics.median(samples)
+
+    def _events(self, ffmpeg_bin: str, path: str) -> tuple[float | None, float | None]:
+        """(first white frame, first non-silent audio) in seconds of `path`."""
+        err = subprocess.run(
+            [ffmpeg_bin, "-nostdin", "-i", path,
+             "-vf", "signalstats,metadata=print:key=lavfi.signalstats.YAVG",
+             "-af", "silencedetect=n=-30dB:d=0.05", "-f", "null", "-"],
+            capture_output=True, text=True,
+        ).stderr
+        flash = t = None
+        for line in err.splitlines():
+            m = re.search(r"pts_time:([\d.]+)", line)
+            if m:
+                t = float(m.group(1))
+            m = re.search(r"YAVG=([\d.]+)", line)
+            if m and flash is None and float(m.group(1)) > 128:
+                flash = t
+        ends = re.findall(r"silence_end: ([\d.]+)", err)
+        return flash, (float(ends[0]) if ends else None)
+
+    def _check_sync(self, ffmpeg_bin: str, workdir: str) -> None:
+        src = os.path.join(workdir, "sync_source.mp4")
+        # white frames and a 1 kHz beep, both at source 5.0-5.2 s
+        subprocess.run(
+            [
+                ffmpeg_bin, "-nostdin", "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i",
+                "color=black:s=320x240:r=30:d=12,drawbox=color=white:t=fill:enable='between(t,5,5.199)'",
+                "-f", "lavfi", "-i", "sine=f=1000:d=12,volume=volume=0:enable='not(between(t,5,5.2))'",
+                "-c:v", "libx264", "-g", "250", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", "-y", src,
+            ],
+            check=True,
+        )
+        start, si = 3.0, 1.5
+        tl = {"width": 320, "height": 240, "fps": 30, "duration": 12, "background": "#000000", "tracks": [
+            {"type": "video", "src": src, "start": start, "end": 10.0, "srcIn": si, "srcOut": si + 7.0,
+             "x": 0, "y": 0, "width": 320, "height": 240, "z": 1}]}
+        out = os.path.join(workdir, "sync.mp4")
+        subprocess.run([ffmpeg_bin, "-nostdin", "-hide_banner", "-loglevel", "error",
+                        *build_ffmpeg_cmd(tl, out, mode="final")], check=True, stdout=subprocess.DEVNULL)
+        flash, beep = self._events(ffmpeg_bin, out)
+        expected = start + 5.0 - si
+        self.stdout.write(f"track start={start}s srcIn={si}s: expected {expected:.3f}s")
+        self.stdout.write(f"  video flash : {flash}")
+        self.stdout.write(f"  audio beep  : {beep}")
+        if flash is None or beep is None or abs(flash - expected) > 0.034 or abs(beep - expected) > 0.05:
+            raise CommandError("A/V out of sync.")
+
+    def handle(self, *args, **options):
+        ffmpeg_bin = _resolve_ffmpeg_bin()
+        if not ffmpeg_bin:
+            raise CommandError("ffmpeg not found. Configure FFMPEG_BIN or PATH.")
+        if options["check_sync"]:
+            with tempfile.TemporaryDirectory(prefix="bench_sync_") as workdir:
+                self._check_sync(ffmpeg_bin, workdir)
+            return
+
+        with tempfile.TemporaryDirectory(prefix="bench_seek_") as workdir:
+            src = options["src"] or self._make_source(ffmpeg_bin, options["synthetic_seconds"], workdir)
+            total = options["synthetic_seconds"] if not options["src"] else None
+            si = options["src_in"]
+            if si is None:
+                if total is None:
+                    raise CommandError("--src-in is required with --src.")
+                si = round(total * 0.8, 3)
+            so = si + options["length"]
+
+            track = compile_track({"type": "video", "src": src, "start": 0, "end": options["length"],
+                                   "srcIn": si, "srcOut": so})
+            trim_args = ["-i", src, "-filter_complex",
+                         f"[0:v]trim=start={si}:end={so},setpts=PTS-STARTPTS[v]", "-map", "[v]"]
+            seek_args = [*_media_input_flags(track), "-i", src, "-filter_complex",
+                         "[0:v]setpts=PTS-STARTPTS[v]", "-map", "[v]"]
+
+            runs = max(1, options["runs"])
+            trim_s = self._time(ffmpeg_bin, trim_args, runs)
+            seek_s = self._time(ffmpeg_bin, seek_args, runs)
+
+        self.stdout.write(f"clip: srcIn={si}s srcOut={so}s  (median of {runs})")
+        self.stdout.write(f"  trim filter : {trim_s:8.3f}s")
+        self.stdout.write(f"  input seek  : {seek_s:8.3f}s")
+        if seek_s > 0:
+            self.stdout.write(f"  speedup     : {trim_s / seek_s:8.1f}x")
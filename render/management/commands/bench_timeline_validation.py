@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from render.serializers import TRACK_SERIALIZERS, COMPILED_TRACK_SERIALIZERS
+
+
+def _sample_tracks(n: int) -> list:
+    base = {"start": 0.0, "end": 10.0}
+    samples = [
+        {"type": "video", "src": "/media/a.mp4", "x": 0, "y": 0, "w": 640, "h": 360, "srcIn": 1.5, "srcOut": 9.0},
+        {"type": "image", "src": "/media/logo.png", "x": 10, "y": 10, "w": 120, "h": 120},
+        {"type": "audio", "src": "/media/music.mp3", "volume": 0.8},
+        {"type": "text", "text": "Hello", "x": 100, "y": 100, "fontSize": 42, "color": "#ffffff", "bgColor": "#000000"},
+        {"type": "datetime", "text": "", "x": 100, "y": 200, "isLive": True},
+        {"type": "circle", "x": 300, "y": 300, "radius": 40, "fill": "#ff0000", "outline": "#000", "outlineWidth": 2},
+        {"type": "triangle", "x": 400, "y": 300, "width": 80, "height": 60, "direction": "left"},
+        {"type": "rectangle", "x": 500, "y": 300, "width": 120, "height": 60, "borderRadius": 8},
+        {"type": "line", "x": 50, "y": 900, "length": 300, "rotation": 15, "color": "#fff", "thickness": 3},
+        {"type": "ellipse", "x": 700, "y": 300, "width": 90, "height": 40, "fill": "#ffff00"},
+        {"type": "sign", "x": 900, "y": 100, "width": 300, "height": 120, "text": "Exit",
+         "showComponents": {"text": True, "icon": True, "background": True},
+         "colors": {"background": "#ffffff", "text": "#000000"}, "fontSizes": {"text": 32}},
+        {"type": "weather", "x": 1200, "y": 600, "width": 400, "height": 300, "location": "Oslo",
+         "showComponents": {"summary": True, "temperature": True, "icon": True},
+         "colors": {"background": "#eeeeee"}, "fontSizes": {"location": 40},
+         "layout": {"location": {"x": 10, "y": 10, "width": 200, "height": 40}},
+         "data": {"summary": "Rain", "temperature": 4.5, "icon": "10d"}},
+    ]
+    return [dict(base, **samples[i % len(samples)], id=f"t{i}", z=i) for i in range(n)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark track validation: a DRF serializer per track (previous path) vs "
+        "the compiled validator TimelineSerializer uses. Reports tracks/second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tracks", type=int, default=1000, help="Tracks per run (all track types, round robin).")
+        parser.add_argument("--runs", type=int, default=5)
+
+    def _time(self, fn, tracks, runs: int) -> float:
+        samples = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            for tr in tracks:
+                fn(tr)
+            samples.append(time.perf_counter() - t0)
+        return statistics.median(samples)
+
+    def handle(self, *args, **options):
+        tracks = _sample_tracks(max(1, options["tracks"]))
+        runs = max(1, options["runs"])
+
+        def drf(tr):
+            s = TRACK_SERIALIZERS[tr["type"]](data=tr)
+            s.is_valid(raise_exception=True)
+            return s.validated_data
+
+        def compiled(tr):
+            return COMPILED_TRACK_SERIALIZERS[tr["type"]].validate(tr)
+
+        for tr in tracks[:len(TRACK_SERIALIZERS)]:
+            if drf(tr) != compiled(tr):
+                raise CommandError(f"validated data differs for track type {tr['type']!r}")
+
+        drf_s = self._time(drf, tracks, runs)
+        compiled_s = self._time(compiled, tracks, runs)
+
+        n = len(tracks)
+        self.stdout.write(f"{n} tracks  (median of {runs})")
+        self.stdout.write(f"  serializer per track : {n / drf_s:12.0f} tracks/s")
+        self.stdout.write(f"  compiled             : {n / compiled_s:12.0f} tracks/s")
+        if compiled_s > 0:
+            self.stdout.write(f"  speedup              : {drf_s / compiled_s:12.1f}x")
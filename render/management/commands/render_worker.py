@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from render.jobs import RenderWorkerPool
+from render.scheduler import max_concurrent
+
+
+class Command(BaseCommand):
+    help = "Run a pool of render workers that execute queued RenderJob rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int,
+            default=getattr(settings, "RENDER_WORKERS", 2),
+            help="Number of concurrent ffmpeg jobs in this process (the host-wide RENDER_MAX_CONCURRENT also applies).",
+        )
+        parser.add_argument(
+            "--interactive-workers", type=int,
+            default=getattr(settings, "RENDER_INTERACTIVE_WORKERS", 1),
+            help="Extra threads that only run interactive previews and stills.",
+        )
+        parser.add_argument(
+            "--poll", type=float,
+            default=getattr(settings, "RENDER_WORKER_POLL_SECONDS", 1.0),
+            help="Seconds to wait between queue polls when idle.",
+        )
+
+    def handle(self, *args, **options):
+        pool = RenderWorkerPool(workers=options["workers"], poll_seconds=options["poll"],
+                                interactive_workers=options["interactive_workers"])
+        pool.start()
+        self.stdout.write(
+            f"render_worker: {pool.workers} worker(s) + {pool.interactive_workers} interactive on {pool.host}, "
+            f"{max_concurrent()} render slot(s) per host"
+        )
+        try:
+            pool.join()
+        except KeyboardInterrupt:
+            self.stdout.write("render_worker: stopping")
+            pool.stop()
+            pool.join()
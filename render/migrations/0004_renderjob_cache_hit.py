@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('render', '0003_renderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='cache_hit',
+            field=models.BooleanField(default=False),
+        ),
+    ]
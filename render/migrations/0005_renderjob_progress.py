@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('render', '0004_renderjob_cache_hit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='eta_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='renderjob',
+            name='progress',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='renderjob',
+            name='progress_fps',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='renderjob',
+            name='progress_speed',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
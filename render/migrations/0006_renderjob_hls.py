@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('render', '0005_renderjob_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='hls',
+            field=models.BooleanField(default=False),
+        ),
+    ]
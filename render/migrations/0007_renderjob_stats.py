@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('render', '0006_renderjob_hls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
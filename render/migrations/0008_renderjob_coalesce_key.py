@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('render', '0007_renderjob_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='coalesce_key',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='renderjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('done', 'done'), ('failed', 'failed'), ('cancelled', 'cancelled')], db_index=True, default='queued', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='renderjob',
+            index=models.Index(fields=['coalesce_key', 'status'], name='render_rend_coalesc_3df700_idx'),
+        ),
+    ]
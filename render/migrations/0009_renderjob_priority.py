@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('render', '0008_renderjob_coalesce_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'interactive'), (1, 'still'), (2, 'final'), (3, 'batch')], default=2),
+        ),
+        migrations.AddIndex(
+            model_name='renderjob',
+            index=models.Index(fields=['status', 'priority', 'created_at'], name='render_rend_status_319e56_idx'),
+        ),
+    ]
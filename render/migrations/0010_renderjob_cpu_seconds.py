@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('render', '0009_renderjob_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='cpu_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.conf import settings
 from django.db import models
 
@@ -43,3 +45,87 @@ class LockedContent(models.Model):
 
     def __str__(self):
         return f"{self.name or self.type} • {self.status} • {self.orientation}"
+
+
+class RenderJob(models.Model):
+    """
+    One queued ffmpeg render. The API enqueues rows; render workers
+    (`manage.py render_worker`) claim them and write the result back.
+    """
+    KIND_CHOICES = (("image", "image"), ("video", "video"))
+    MODE_CHOICES = (("preview", "preview"), ("final", "final"))
+    STATUS_CHOICES = (
+        ("queued", "queued"),
+        ("running", "running"),
+        ("done", "done"),
+        ("failed", "failed"),
+        ("cancelled", "cancelled"),
+    )
+    # dispatch order: lower runs first (see render.jobs._claim_next)
+    PRIORITY_INTERACTIVE = 0  # video previews someone is waiting for
+    PRIORITY_STILL = 1
+    PRIORITY_FINAL = 2
+    PRIORITY_BATCH = 3
+    PRIORITY_CHOICES = (
+        (PRIORITY_INTERACTIVE, "interactive"),
+        (PRIORITY_STILL, "still"),
+        (PRIORITY_FINAL, "final"),
+        (PRIORITY_BATCH, "batch"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="render_jobs",
+        null=True,
+        blank=True,
+    )
+    locked = models.ForeignKey(
+        LockedContent,
+        on_delete=models.SET_NULL,
+        related_name="render_jobs",
+        null=True,
+        blank=True,
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default="final")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued", db_index=True)
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=PRIORITY_FINAL)
+
+    timeline = models.JSONField()  # validated + localized timeline
+    output_rel = models.CharField(max_length=500)  # relative to MEDIA_ROOT
+    error = models.TextField(blank=True, default="")
+    worker = models.CharField(max_length=128, blank=True, default="")
+    cache_hit = models.BooleanField(default=False)
+    # preview also streams as fMP4/HLS next to output_rel (see ffmpegkit.hls)
+    hls = models.BooleanField(default=False)
+    # previews for the same user/project share this key: a newer one supersedes the rest
+    coalesce_key = models.CharField(max_length=200, blank=True, default="")
+    # what the builder did for this render (e.g. {"flatten": {...}})
+    stats = models.JSONField(default=dict, blank=True)
+
+    # live progress reported by ffmpeg -progress (0..1), throttled writes from the worker
+    progress = models.FloatField(default=0.0)
+    progress_fps = models.FloatField(null=True, blank=True)
+    progress_speed = models.FloatField(null=True, blank=True)
+    eta_seconds = models.FloatField(null=True, blank=True)
+    # user + system CPU time of every ffmpeg process the job ran (fair-share accounting)
+    cpu_seconds = models.FloatField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["coalesce_key", "status"]),
+            models.Index(fields=["status", "priority", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}/{self.mode} • {self.status} • {self.id}"
@@ -7,6 +7,20 @@ from django.http import (
 from django.utils.http import http_date
 from django.utils._os import safe_join
 
+# HLS previews (ffmpegkit.hls): live playlist + fMP4 segments
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/iso.segment", ".m4s")
+
+def _add_cache_headers(resp, path: str):
+    name = os.path.basename(path)
+    if name.endswith(".m3u8"):
+        # live playlists grow while the preview encodes
+        resp["Cache-Control"] = "no-cache"
+    elif name.endswith(".m4s") or (name == "init.mp4" and "previews/" in path.replace("\\", "/")):
+        # segments are written once under a unique render id
+        resp["Cache-Control"] = "public, max-age=86400, immutable"
+    return resp
+
 def _add_cors_headers(resp):
     # Public media: allow any origin. If you prefer, restrict to your frontend origin(s).
     resp["Access-Control-Allow-Origin"] = "*"
@@ -47,7 +61,7 @@ def serve_media(request, path: str):
         resp = HttpResponse(content_type=content_type)
         resp["Content-Length"] = str(stat.st_size)
         resp["Last-Modified"] = http_date(stat.st_mtime)
-        return _add_cors_headers(resp)
+        return _add_cors_headers(_add_cache_headers(resp, path))
 
     # Range support
     range_header = request.headers.get("Range") or request.META.get("HTTP_RANGE")
@@ -81,10 +95,10 @@ def serve_media(request, path: str):
             resp["Content-Length"] = str(end - start + 1)
             resp["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
             resp["Last-Modified"] = http_date(stat.st_mtime)
-            return _add_cors_headers(resp)
+            return _add_cors_headers(_add_cache_headers(resp, path))
 
     # No Range → full file
     resp = FileResponse(open(fullpath, "rb"), content_type=content_type)
     resp["Content-Length"] = str(stat.st_size)
     resp["Last-Modified"] = http_date(stat.st_mtime)
-    return _add_cors_headers(resp)
+    return _add_cors_headers(_add_cache_headers(resp, path))
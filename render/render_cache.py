@@ -0,0 +1,245 @@
+# render/render_cache.py
+"""
+Content-addressed render result cache.
+
+Key = sha256 over:
+  - the canonical (sorted-key JSON) validated timeline, with every localized
+    asset path replaced by its fingerprint (size + content hash), so the same
+    project hits even when a remote asset was downloaded to a different tmp file
+  - the render variant (preview / final / still)
+  - ffmpegkit BUILDER_VERSION
+
+Results live under RENDER_CACHE_DIR and are served by hard-linking into
+previews/ or locked/ (copy when the link crosses devices). A small sqlite index
+shared by all processes tracks sizes and last use for LRU eviction by total
+bytes, plus hit/miss counters.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+from django.conf import settings
+
+from .ffmpegkit.builder import BUILDER_VERSION
+
+_HASH_CHUNK = 1024 * 1024
+
+# Keys that never change the rendered pixels.
+_IGNORED_TIMELINE_KEYS = ("name", "meta")
+_IGNORED_TRACK_KEYS = ("id",)
+
+
+def _cache_dir() -> str:
+    return str(getattr(settings, "RENDER_CACHE_DIR", os.path.join(str(settings.BASE_DIR), "cache", "renders")))
+
+
+def _max_bytes() -> int:
+    return int(getattr(settings, "RENDER_CACHE_MAX_BYTES", 5 * 1024 ** 3))
+
+
+def _connect() -> sqlite3.Connection:
+    root = _cache_dir()
+    os.makedirs(root, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " key TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL,"
+        " created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS fingerprints ("
+        " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, digest TEXT NOT NULL)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    return conn
+
+
+def _bump(conn: sqlite3.Connection, name: str, by: int = 1) -> None:
+    conn.execute(
+        "INSERT INTO counters(name, value) VALUES(?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, by),
+    )
+
+
+# ---- fingerprints ----
+
+def _file_fingerprint(conn: sqlite3.Connection, path: str) -> str | None:
+    """
+    'size:sha256' for a local file. The content hash is memoized by (path, size, mtime)
+    so a given asset is read in full only once per change.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    row = conn.execute(
+        "SELECT digest FROM fingerprints WHERE path = ? AND size = ? AND mtime_ns = ?",
+        (path, st.st_size, st.st_mtime_ns),
+    ).fetchone()
+    if row:
+        return f"{st.st_size}:{row[0]}"
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    conn.execute(
+        "INSERT OR REPLACE INTO fingerprints(path, size, mtime_ns, digest) VALUES(?, ?, ?, ?)",
+        (path, st.st_size, st.st_mtime_ns, digest),
+    )
+    return f"{st.st_size}:{digest}"
+
+
+def _is_time_dependent(tl: dict) -> bool:
+    # Weather cards without dateText print ffmpeg localtime: output depends on when we render.
+    for t in tl.get("tracks", []):
+        if t.get("type") == "weather":
+            sc = t.get("showComponents") or {}
+            if sc.get("date") and not (t.get("data") or {}).get("dateText"):
+                return True
+    return False
+
+
+def _canonical_timeline(conn: sqlite3.Connection, tl: dict) -> dict | None:
+    out = {k: v for k, v in tl.items() if k not in _IGNORED_TIMELINE_KEYS and k != "tracks"}
+    if out.get("backgroundImage"):
+        fp = _file_fingerprint(conn, str(out["backgroundImage"]))
+        if fp is None:
+            return None
+        out["backgroundImage"] = {"asset": fp}
+
+    tracks = []
+    for t in tl.get("tracks", []):
+        t2 = {k: v for k, v in t.items() if k not in _IGNORED_TRACK_KEYS and not k.startswith("_")}
+        if t2.get("type") in ("video", "image", "audio") and t2.get("src"):
+            fp = _file_fingerprint(conn, str(t2["src"]))
+            if fp is None:
+                return None
+            t2["src"] = {"asset": fp}
+        tracks.append(t2)
+    out["tracks"] = tracks
+    return out
+
+
+def cache_key(tl: dict, variant: str) -> str | None:
+    """
+    Returns the cache key for a localized timeline, or None if it must not be cached
+    (time-dependent output, or an asset that isn't a readable local file).
+    """
+    if _is_time_dependent(tl):
+        return None
+    conn = _connect()
+    try:
+        canon = _canonical_timeline(conn, tl)
+    finally:
+        conn.close()
+    if canon is None:
+        return None
+    blob = json.dumps(
+        {"timeline": canon, "variant": variant, "builder": BUILDER_VERSION},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# ---- lookup / store ----
+
+def _link_or_copy(src: str, dst: str) -> None:
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.tmp{os.getpid()}"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def fetch(key: str, output_abs: str) -> bool:
+    """Materialize a cached result at output_abs. Returns True on hit."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+        if row and os.path.isfile(row[0]):
+            _link_or_copy(row[0], output_abs)
+            conn.execute("UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+            _bump(conn, "hits")
+            return True
+        if row:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        _bump(conn, "misses")
+        return False
+    finally:
+        conn.close()
+
+
+def contains(key: str) -> bool:
+    """Whether `key` would hit, without materializing it or touching LRU order and counters."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+    return bool(row) and os.path.isfile(row[0])
+
+
+def store(key: str, output_abs: str) -> None:
+    """Add a freshly rendered file to the cache, then evict down to RENDER_CACHE_MAX_BYTES."""
+    ext = os.path.splitext(output_abs)[1]
+    path = os.path.join(_cache_dir(), key[:2], f"{key}{ext}")
+    _link_or_copy(output_abs, path)
+    size = os.path.getsize(path)
+    now_ts = time.time()
+
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO entries(key, path, size, created, last_used, hits) VALUES(?, ?, ?, ?, ?, 0)",
+            (key, path, size, now_ts, now_ts),
+        )
+        _bump(conn, "stores")
+        _evict(conn, _max_bytes())
+    finally:
+        conn.close()
+
+
+def _evict(conn: sqlite3.Connection, max_bytes: int) -> None:
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= max_bytes:
+        return
+    for key, path, size in conn.execute("SELECT key, path, size FROM entries ORDER BY last_used").fetchall():
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        total -= size
+        _bump(conn, "evictions")
+        _bump(conn, "evicted_bytes", size)
+
+
+def stats() -> dict:
+    conn = _connect()
+    try:
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    finally:
+        conn.close()
+    return {
+        "entries": entries,
+        "bytes": total,
+        "max_bytes": _max_bytes(),
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+        "stores": counters.get("stores", 0),
+        "evictions": counters.get("evictions", 0),
+        "evicted_bytes": counters.get("evicted_bytes", 0),
+    }
@@ -0,0 +1,232 @@
+# render/scheduler.py
+"""
+Node-level render admission.
+
+Every ffmpeg job on this host (any render_worker process, any pool thread) runs
+in one of RENDER_MAX_CONCURRENT slots. A slot is an exclusive flock on
+slots/<i>.lock under RENDER_SCHEDULER_DIR, so the cap holds across processes and
+the slot of a worker that dies is released with its file descriptors. Workers
+take a slot before claiming a queued job: jobs beyond capacity stay queued
+instead of starting and oversubscribing the CPUs.
+
+Each slot carries an explicit thread budget (its share of the CPUs, reduced when
+load beyond what the other busy slots account for leaves less headroom) that the builders pass to ffmpeg as
+-threads / -filter_threads, and optionally a CPU-affinity set of that many cores
+(RENDER_CPU_AFFINITY) so concurrent encodes do not migrate across each other's
+caches.
+
+Priorities: workers dispatch queued jobs by RenderJob.priority (interactive
+previews, stills, finals, background batch). RENDER_INTERACTIVE_SLOTS extra
+slots may only run interactive/still jobs, so a preview never waits behind a
+box full of exports, and final/batch encodes run at a higher nice value
+(RENDER_FINAL_NICE / RENDER_BATCH_NICE): they keep the CPUs to themselves when
+nothing else runs and yield to interactive encodes the moment one starts.
+
+The API side rejects new renders with 429 + Retry-After once RENDER_MAX_QUEUED
+jobs are already waiting.
+"""
+import math
+import os
+import shutil
+from dataclasses import dataclass
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # no cross-process slots without flock: only the per-process worker count applies
+    fcntl = None
+
+# jobs sampled to estimate Retry-After
+_RECENT_JOBS = 20
+
+
+def _scheduler_dir() -> str:
+    return str(getattr(settings, "RENDER_SCHEDULER_DIR", os.path.join(str(settings.BASE_DIR), "cache", "scheduler")))
+
+
+def available_cpus() -> list[int]:
+    """CPUs this process may run on (cgroup/taskset aware where the OS exposes it)."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return list(range(os.cpu_count() or 1))
+
+
+def threads_per_job() -> int:
+    return max(1, int(getattr(settings, "RENDER_THREADS_PER_JOB", 4)))
+
+
+def max_concurrent() -> int:
+    """Configured cap, or as many jobs as fit RENDER_THREADS_PER_JOB threads each on this host."""
+    n = int(getattr(settings, "RENDER_MAX_CONCURRENT", 0))
+    if n > 0:
+        return n
+    return max(1, len(available_cpus()) // threads_per_job())
+
+
+def _load_average() -> float | None:
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def interactive_slots() -> int:
+    return max(0, int(getattr(settings, "RENDER_INTERACTIVE_SLOTS", 1)))
+
+
+def priority_nice(priority: int) -> int:
+    """Niceness for ffmpeg processes of a job of this priority."""
+    from .models import RenderJob
+
+    if priority >= RenderJob.PRIORITY_BATCH:
+        return int(getattr(settings, "RENDER_BATCH_NICE", 10))
+    if priority >= RenderJob.PRIORITY_FINAL:
+        return int(getattr(settings, "RENDER_FINAL_NICE", 5))
+    return 0
+
+
+@dataclass
+class Slot:
+    index: int
+    threads: int                       # ffmpeg thread budget for the job
+    cpus: tuple[int, ...] | None       # affinity set, when RENDER_CPU_AFFINITY is on
+    reserved: bool = False             # one of the interactive-only slots
+    nice: int = 0                      # set from the claimed job's priority
+    _fd: int | None = None
+
+    def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)  # closing the descriptor releases the flock
+            self._fd = None
+
+
+def slot_threads() -> int:
+    """A slot's thread budget on an otherwise idle host (its share of the CPUs)."""
+    return max(1, len(available_cpus()) // max_concurrent())
+
+
+def _budget(index: int, slots: int, busy: int = 0) -> tuple[int, tuple[int, ...] | None]:
+    """Thread budget and affinity for slot `index` while `busy` other slots are running."""
+    cpus = available_cpus()
+    share = max(1, len(cpus) // slots)
+    threads = share
+    load = _load_average()
+    if load is not None:
+        # each busy slot accounts for about `share` of the load; only the rest is someone
+        # else's work, and what it leaves after the busy slots' shares is ours
+        external = max(0.0, load - busy * share)
+        threads = max(1, min(share, int(len(cpus) - external - busy * share)))
+
+    affinity = None
+    if getattr(settings, "RENDER_CPU_AFFINITY", False):
+        first = (index * share) % len(cpus)
+        affinity = tuple(cpus[first:first + share]) or tuple(cpus)
+    return threads, affinity
+
+
+def acquire_slot(reserved: bool = False) -> Slot | None:
+    """
+    A free render slot on this host, or None when every slot is busy (or the box is overloaded).
+    reserved=True takes one of the RENDER_INTERACTIVE_SLOTS instead; only interactive and
+    still jobs may run in those.
+    """
+    slots = max_concurrent()
+    indices = range(slots, slots + interactive_slots()) if reserved else range(slots)
+    if not indices:
+        return None
+    max_load = float(getattr(settings, "RENDER_MAX_LOAD_PER_CPU", 0))
+    if max_load > 0:
+        load = _load_average()
+        if load is not None and load > max_load * len(available_cpus()):
+            return None
+
+    if fcntl is None:
+        threads, affinity = _budget(indices[0], slots)
+        return Slot(index=indices[0], threads=threads, cpus=affinity, reserved=reserved)
+
+    slot_dir = os.path.join(_scheduler_dir(), "slots")
+    os.makedirs(slot_dir, exist_ok=True)
+    for i in indices:
+        fd = os.open(os.path.join(slot_dir, f"{i}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            continue
+        busy = _busy_slots(slot_dir, slots + interactive_slots(), i)
+        threads, affinity = _budget(i, slots, busy)
+        return Slot(index=i, threads=threads, cpus=affinity, reserved=reserved, _fd=fd)
+    return None
+
+
+def _busy_slots(slot_dir: str, total: int, own: int) -> int:
+    """
+    Slots other than `own` currently held by some worker. Probes each lock without
+    blocking; a probe holds a free lock for an instant, so a worker racing for that
+    slot just finds it busy and retries on its next poll.
+    """
+    busy = 0
+    for i in range(total):
+        if i == own:
+            continue
+        path = os.path.join(slot_dir, f"{i}.lock")
+        if not os.path.exists(path):
+            continue
+        fd = os.open(path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            busy += 1
+        finally:
+            os.close(fd)
+    return busy
+
+
+def slot_command(slot: Slot | None) -> list[str]:
+    """
+    Command prefix that starts a process on the slot's CPUs and at its niceness
+    (taskset / nice, each skipped when not installed). Both exec into the command,
+    so every thread ffmpeg starts inherits them and the pid stays ffmpeg's; setting
+    them after Popen would only reach ffmpeg's main thread.
+    """
+    if slot is None:
+        return []
+    prefix: list[str] = []
+    if slot.nice and shutil.which("nice"):
+        prefix += ["nice", "-n", str(slot.nice)]
+    if slot.cpus and shutil.which("taskset"):
+        prefix += ["taskset", "-c", ",".join(str(c) for c in slot.cpus)]
+    return prefix
+
+
+# ---- API admission ----
+
+def _recent_run_seconds() -> float:
+    from .models import RenderJob
+
+    rows = (
+        RenderJob.objects.filter(status="done", started_at__isnull=False, finished_at__isnull=False)
+        .order_by("-finished_at")
+        .values_list("started_at", "finished_at")[:_RECENT_JOBS]
+    )
+    runs = [(f - s).total_seconds() for s, f in rows]
+    return sum(runs) / len(runs) if runs else 10.0
+
+
+def retry_after() -> int | None:
+    """
+    Seconds a client should wait when the render queue is full (RENDER_MAX_QUEUED
+    jobs waiting), else None. Estimated from recent run times and the slot count.
+    """
+    from .models import RenderJob
+
+    limit = int(getattr(settings, "RENDER_MAX_QUEUED", 0))
+    if limit <= 0:
+        return None
+    queued = RenderJob.objects.filter(status="queued").count()
+    if queued < limit:
+        return None
+    waves = (queued - limit + 1) / max_concurrent()
+    return max(1, math.ceil(waves * _recent_run_seconds()))
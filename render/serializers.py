@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from .validation import CompiledSerializer
+
 
 class BaseTrackSerializer(serializers.Serializer):
     id = serializers.CharField()
@@ -389,6 +391,25 @@ class WeatherTrackSerializer(serializers.Serializer):
         return data
 
 
+TRACK_SERIALIZERS = {
+    "video": VideoTrackSerializer,
+    "image": ImageTrackSerializer,
+    "text": TextTrackSerializer,
+    "datetime": DateTimeTrackSerializer,
+    "audio": AudioTrackSerializer,
+    "circle": CircleTrackSerializer,
+    "triangle": TriangleTrackSerializer,
+    "rectangle": RectangleTrackSerializer,
+    "line": LineTrackSerializer,
+    "ellipse": EllipseTrackSerializer,
+    "sign": SignTrackSerializer,
+    "weather": WeatherTrackSerializer,
+}
+
+# Same validated data and errors as TRACK_SERIALIZERS, without a serializer instance per track
+COMPILED_TRACK_SERIALIZERS = {t: CompiledSerializer(cls) for t, cls in TRACK_SERIALIZERS.items()}
+
+
 class TimelineSerializer(serializers.Serializer):
     duration = serializers.FloatField(min_value=0.0, required=False, default=0.0)
     width = serializers.IntegerField(min_value=16)
@@ -409,35 +430,10 @@ class TimelineSerializer(serializers.Serializer):
         typed_tracks = []
         for tr in data.get("tracks", []):
             t = tr.get("type")
-            if t == "video":
-                s = VideoTrackSerializer(data=tr)
-            elif t == "image":
-                s = ImageTrackSerializer(data=tr)
-            elif t == "text":
-                s = TextTrackSerializer(data=tr)
-            elif t == "datetime":
-                s = DateTimeTrackSerializer(data=tr)
-            elif t == "audio":
-                s = AudioTrackSerializer(data=tr)
-            elif t == "circle":
-                s = CircleTrackSerializer(data=tr)
-            elif t == "triangle":
-                s = TriangleTrackSerializer(data=tr)
-            elif t == "rectangle":
-                s = RectangleTrackSerializer(data=tr)
-            elif t == "line":
-                s = LineTrackSerializer(data=tr)
-            elif t == "ellipse":
-                s = EllipseTrackSerializer(data=tr)
-            elif t == "sign":
-                s = SignTrackSerializer(data=tr)
-            elif t == "weather":
-                s = WeatherTrackSerializer(data=tr)
-            else:
+            compiled = COMPILED_TRACK_SERIALIZERS.get(t)
+            if compiled is None:
                 raise serializers.ValidationError(f"Unknown track type: {t}")
-
-            s.is_valid(raise_exception=True)
-            typed_tracks.append(s.validated_data)
+            typed_tracks.append(compiled.validate(tr))
 
         data["tracks"] = typed_tracks
 
@@ -452,3 +448,34 @@ class TimelineSerializer(serializers.Serializer):
                     )
 
         return data
+
+
+class PreviewSerializer(TimelineSerializer):
+    """
+    A timeline plus an optional preview window: only [previewStart, previewEnd)
+    is rendered, at previewFps (never above the timeline fps). Tracks entirely
+    outside the window are dropped here, so they are never localized.
+    """
+    previewStart = serializers.FloatField(min_value=0.0, required=False)
+    previewEnd = serializers.FloatField(min_value=0.0, required=False)
+    previewFps = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        data = TimelineSerializer.validate(self, data)
+
+        if "previewFps" in data:
+            data["previewFps"] = min(data["previewFps"], data["fps"])
+        if "previewStart" not in data and "previewEnd" not in data:
+            return data
+
+        dur = float(data.get("duration") or 0.0)
+        if dur <= 0:
+            raise serializers.ValidationError("A preview window needs a timeline duration.")
+        t0 = data.setdefault("previewStart", 0.0)
+        t1 = data["previewEnd"] = min(data.get("previewEnd", dur), dur)
+        if t1 <= t0:
+            raise serializers.ValidationError("previewEnd must be after previewStart (and within the duration).")
+
+        # same test as ffmpegkit.segments.window_timeline
+        data["tracks"] = [tr for tr in data["tracks"] if not (tr["end"] < t0 or tr["start"] >= t1)]
+        return data
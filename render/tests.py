@@ -1,3 +1,871 @@
-from django.test import TestCase
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from collections.abc import Mapping
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework import serializers
+
+from . import asset_cache, fairshare, render_cache, scheduler
+from .ffmpegkit import probe, segments
+from .ffmpegkit.builder import _preview_timeline, build_ffmpeg_cmd
+from .ffmpegkit.flatten import Layer, _Group, _per_frame_nodes, _unflattened_nodes, flatten_layers
+from .ffmpegkit.inputs import plan_media_inputs
+from .ffmpegkit.ir import compile_timeline, compile_track
+from .ffmpegkit.media import _media_input_flags, _src_window
+from .ffmpegkit.segments import preview_window
+from .ffmpegkit.shapes import sprite
+from .ffmpegkit.shapes.circle import _emit_circle_overlays
+from .ffmpegkit.shapes.rectangle import _emit_rectangle_overlays, _rectangle_clip
+from .ffmpegkit.stills import _frame_intervals
+from .ffmpegkit.textdraw import _emit_text_overlay
+from .jobs import _resolve_ffmpeg_bin
+from .models import RenderJob
+from .serializers import COMPILED_TRACK_SERIALIZERS, TRACK_SERIALIZERS, PreviewSerializer
+from .validation import CompiledSerializer
+
+# smallest valid track of each type
+_MINIMAL = {
+    "video": {"src": "clip.mp4", "x": 0, "y": 0},
+    "image": {"src": "pic.png", "x": 0, "y": 0},
+    "text": {"x": 0, "y": 0},
+    "datetime": {"x": 0, "y": 0},
+    "audio": {"src": "song.mp3"},
+    "circle": {"x": 0, "y": 0, "radius": 10},
+    "triangle": {"x": 0, "y": 0, "width": 10, "height": 10},
+    "rectangle": {"x": 0, "y": 0, "width": 10, "height": 10},
+    "line": {"x": 0, "y": 0, "length": 10, "rotation": 0, "color": "#fff", "thickness": 1},
+    "ellipse": {"x": 0, "y": 0, "width": 10, "height": 10},
+    "sign": {"x": 0, "y": 0, "width": 10, "height": 10},
+    "weather": {"x": 0, "y": 0, "width": 10, "height": 10},
+}
+
+# what an editor typically sends
+_REPRESENTATIVE = {
+    "video": {"src": "clip.mp4", "x": 10.5, "y": 20, "w": 640, "h": 360, "rotation": 90, "opacity": 0.5,
+              "volume": 0.8, "muted": True, "playbackRate": 1.5, "srcIn": 2, "srcOut": 7.25, "enable": True},
+    "image": {"src": "pic.png", "x": 1, "y": 2, "w": 100, "h": 100, "opacity": 1},
+    "text": {"x": 5, "y": 5, "text": "Hello, 'world'", "fontFamily": "DejaVu Sans", "fontSize": 64,
+             "color": "#ffffff", "align": "center", "strokeColor": None, "strokeWidth": 2.5,
+             "shadowColor": "", "shadowBlur": 3, "bgColor": "#000000@0.5", "padding": 12},
+    "datetime": {"x": 5, "y": 5, "isLive": True, "useUTC": False, "ffFormat": "%H\\:%M", "offsetDays": -1.5,
+                 "align": "right"},
+    "audio": {"src": "song.mp3", "volume": 0.25, "gainDb": -6, "srcIn": 0, "srcOut": 30},
+    "circle": {"x": 50, "y": 50, "radius": 0.5, "fill": "red", "outline": "#000", "outlineWidth": 2,
+               "opacity": 0.3},
+    "triangle": {"x": 1, "y": 1, "width": 1, "height": 1, "color": "blue", "direction": "left"},
+    "rectangle": {"x": -10, "y": -10, "width": 300, "height": 100, "fill": "#123456", "borderRadius": 8.5},
+    "line": {"x": 0, "y": 0, "length": 200, "rotation": -45.5, "color": "green", "thickness": 3, "opacity": 0},
+    "ellipse": {"x": 3, "y": 4, "width": 30, "height": 40, "outline": "white", "outlineWidth": 1.5},
+    "sign": {"x": 0, "y": 0, "width": 400, "height": 120, "rotation": 5, "text": "EXIT", "symbolType": "arrow",
+             "customSymbol": "", "showComponents": {"text": True, "arrow": True, "border": True},
+             "colors": {"background": "#ff0000", "text": None, "border": ""},
+             "fontSizes": {"text": 32, "symbol": 1}, "iconSize": 24,
+             "image": {"url": "", "width": 10, "height": 10, "borderRadius": 0, "borderWidth": 2,
+                       "maintainAspectRatio": False, "opacity": 0.5}},
+    "weather": {"x": 0, "y": 0, "width": 600, "height": 300, "location": "Paris", "lat": 48.85, "lon": 2.35,
+                "units": "imperial", "language": "fr", "showDaytimeOnly": True, "horizontalAlign": "center",
+                "verticalAlign": "bottom", "showComponents": {"temperature": True, "location": False},
+                "colors": {"background": "#000", "temperature": "#f80"}, "fontSizes": {"temperature": 40},
+                "iconSize": 64, "image": {"width": 100}, "name": None,
+                "layout": {"temperature": {"x": 10, "y": 10, "width": 100, "height": 50}},
+                "data": {"summary": "Sunny", "icon": "01d", "temperature": 21.5, "humidity": 40,
+                         "windDirection": "NE", "dateText": "Mon 1 Jan"}},
+}
+
+_MISSING = object()  # leaves the key out of the track
+
+
+def _track(track_type: str, **overrides) -> dict:
+    data = {"id": "t1", "type": track_type, "start": 0, "end": 5, "z": 1, **_MINIMAL[track_type]}
+    data.update(overrides)
+    return {k: v for k, v in data.items() if v is not _MISSING}
+
+
+def _bounds(field):
+    return getattr(field, "min_value", None), getattr(field, "max_value", None)
+
+
+def _field_values(field) -> list:
+    """Representative, boundary and invalid values for one serializer field."""
+    if isinstance(field, serializers.Serializer):
+        nested = [{}, [], "x", 1, None]
+        for name, child in field.fields.items():
+            nested += [{name: v} for v in _field_values(child)]
+        return nested
+    if isinstance(field, serializers.DictField):
+        item = {"x": 0, "y": 0, "width": 1, "height": 1}
+        return [{}, {"k": item}, {"k": {}}, {"k": {**item, "width": 0}}, {1: item}, [], "x", None]
+    if isinstance(field, serializers.ChoiceField):
+        return [*field.choices, "bogus", "", None, 1, True]
+    if isinstance(field, serializers.BooleanField):
+        return [True, False, "true", "False", 1, 0, 2, None, "", "x"]
+    if isinstance(field, serializers.IntegerField):
+        lo, hi = _bounds(field)
+        values = [0, 1, -1, 1.0, 1.5, "3", " 3 ", "abc", True, None, "", 2 ** 63, [1]]
+        for b in (lo, hi):
+            if b is not None:
+                values += [b - 1, b, b + 1]
+        return values
+    if isinstance(field, serializers.FloatField):
+        lo, hi = _bounds(field)
+        values = [0, 0.0, 1, -1, 0.5, 1e300, "1.5", "abc", True, False, None, "",
+                  float("inf"), float("-inf"), float("nan"), 10 ** 400, {}]
+        for b in (lo, hi):
+            if b is not None:
+                values += [b - 0.001, b, int(b) if b == int(b) else b, b + 0.001]
+        return values
+    if isinstance(field, serializers.CharField):
+        return ["x", "", "   ", "  padded  ", "é ü", "a\x00b", "\ud800", None, 5, 1.5, True, [], {}]
+    raise AssertionError(f"no test values for {type(field).__name__}")
+
+
+def _canonical(value):
+    """Validated data with value types made explicit (1 and 1.0 and True must not compare equal)."""
+    if isinstance(value, Mapping):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    if isinstance(value, float):
+        return ("float", repr(value))
+    return (type(value).__name__, value)
+
+
+def _outcome(validate, data):
+    try:
+        return "valid", _canonical(validate(data))
+    except serializers.ValidationError as e:
+        return "invalid", e.detail
+
+
+def _drf(serializer_class, data):
+    s = serializer_class(data=data)
+    s.is_valid(raise_exception=True)
+    return s.validated_data
+
+
+class CompiledSerializerTests(SimpleTestCase):
+    def assertSameAsDrf(self, track_type, data):
+        compiled = COMPILED_TRACK_SERIALIZERS[track_type]
+        expected = _outcome(lambda d: _drf(TRACK_SERIALIZERS[track_type], d), data)
+        self.assertEqual(_outcome(compiled.validate, data), expected)
+
+    def test_every_track_type_compiles(self):
+        for track_type, compiled in COMPILED_TRACK_SERIALIZERS.items():
+            with self.subTest(track_type=track_type):
+                compiled.validate(_track(track_type))
+                self.assertIsNotNone(compiled._schema, "falls back to DRF for every track")
+
+    def test_representative_tracks(self):
+        for track_type in TRACK_SERIALIZERS:
+            for data in (_track(track_type), _track(track_type, **_REPRESENTATIVE[track_type])):
+                with self.subTest(track_type=track_type, data=data):
+                    self.assertSameAsDrf(track_type, data)
+
+    def test_every_field_boundaries(self):
+        for track_type, serializer_class in TRACK_SERIALIZERS.items():
+            for name, field in serializer_class().fields.items():
+                for value in [_MISSING, *_field_values(field)]:
+                    data = _track(track_type, **{name: value})
+                    with self.subTest(track_type=track_type, field=name, value=value):
+                        self.assertSameAsDrf(track_type, data)
+
+    def test_track_level_errors(self):
+        for track_type in TRACK_SERIALIZERS:
+            cases = [
+                _track(track_type, start=5, end=4.999),   # validate(): end before start
+                _track(track_type, start=3, end=3),
+                _track(track_type, start=_MISSING, end=_MISSING),
+                {**_track(track_type), "unknown": 1},       # unknown keys are dropped
+                [],
+                "track",
+                None,
+            ]
+            for data in cases:
+                with self.subTest(track_type=track_type, data=data):
+                    self.assertSameAsDrf(track_type, data)
+
+    def test_returns_fresh_defaults(self):
+        compiled = COMPILED_TRACK_SERIALIZERS["weather"]
+        first = compiled.validate(_track("weather"))
+        first["location"] = "changed"
+        self.assertEqual(compiled.validate(_track("weather"))["location"], "")
+
+    def test_uncompilable_serializer_uses_drf(self):
+        class Custom(serializers.Serializer):
+            n = serializers.IntegerField()
+
+            def validate_n(self, value):
+                if value == 13:
+                    raise serializers.ValidationError("unlucky")
+                return value * 2
+
+        compiled = CompiledSerializer(Custom)
+        self.assertEqual(compiled.validate({"n": 2}), {"n": 4})
+        self.assertIsNone(compiled._schema)
+        with self.assertRaises(serializers.ValidationError) as ctx:
+            compiled.validate({"n": 13})
+        self.assertEqual(ctx.exception.detail, {"n": ["unlucky"]})
+
+
+def _render_alpha(ffmpeg_bin: str, clip: str, label: str, w: int, h: int) -> bytes:
+    """Alpha plane of the first frame a shape clip filter emits."""
+    out = subprocess.run(
+        [ffmpeg_bin, "-v", "error", "-filter_complex", clip, "-map", f"[{label}]", "-frames:v", "1",
+         "-f", "rawvideo", "-pix_fmt", "rgba", "pipe:1"],
+        check=True, capture_output=True,
+    ).stdout
+    return out[3:w * h * 4:4]
+
+
+@unittest.skipUnless(sprite.np is not None and _resolve_ffmpeg_bin(), "needs numpy, Pillow and ffmpeg")
+class ShapeSpriteFallbackTests(SimpleTestCase):
+    def test_rectangle_alpha_matches_geq_fallback(self):
+        ffmpeg_bin = _resolve_ffmpeg_bin()
+        w, h = 40, 30
+        for color, opacity in (("#3366cc", 0.6), ("#3366cc80", None), ("red", 1.0)):
+            with self.subTest(color=color, opacity=opacity), tempfile.TemporaryDirectory() as tmp, \
+                    mock.patch.object(sprite, "SPRITE_DIR", tmp):
+                clip = _rectangle_clip("shape", w, h, color, opacity, 25, radius=8)
+                self.assertTrue(clip.startswith("movie="), "sprite path not taken")
+                sprite_alpha = _render_alpha(ffmpeg_bin, clip, "shape", w, h)
+                with mock.patch.object(sprite, "np", None):
+                    clip = _rectangle_clip("shape", w, h, color, opacity, 25, radius=8)
+                self.assertIn("geq=", clip)
+                geq_alpha = _render_alpha(ffmpeg_bin, clip, "shape", w, h)
+
+                full = max(sprite_alpha)
+                self.assertEqual(set(geq_alpha), {0, full})
+                # geq tests pixel corners, sprites cover pixel areas: compare away from the edge
+                for y in range(1, h - 1):
+                    for x in range(1, w - 1):
+                        around = {sprite_alpha[(y + dy) * w + x + dx] for dy in (-1, 0, 1) for dx in (-1, 0, 1)}
+                        if len(around) == 1:
+                            self.assertEqual(geq_alpha[y * w + x], sprite_alpha[y * w + x], (x, y))
+                self.assertAlmostEqual(sum(geq_alpha) / sum(sprite_alpha), 1.0, delta=0.05)
+
+
+class RenderCacheKeyTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        settings_override = override_settings(RENDER_CACHE_DIR=os.path.join(self.tmp, "cache"))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.clip = self._asset("clip.mp4", b"frames")
+
+    def _asset(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.tmp, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _timeline(self, **overrides) -> dict:
+        tl = {
+            "width": 640, "height": 360, "fps": 30, "duration": 5, "name": "Project",
+            "tracks": [
+                {"id": "v1", "type": "video", "src": self.clip, "start": 0, "end": 5, "x": 0, "y": 0},
+                {"id": "t1", "type": "text", "text": "hi", "start": 1, "end": 2, "x": 10, "y": 10},
+            ],
+        }
+        tl.update(overrides)
+        return tl
+
+    def test_stable_across_presentation_only_changes(self):
+        key = render_cache.cache_key(self._timeline(), "final")
+        self.assertEqual(len(key), 64)
+        self.assertEqual(render_cache.cache_key(self._timeline(), "final"), key)
+
+        renamed = self._timeline(name="Other", meta={"editor": "x"})
+        for t in renamed["tracks"]:
+            t["id"] = t["id"] + "-copy"
+        renamed["tracks"][0]["_localized_from"] = "https://example.com/clip.mp4"
+        self.assertEqual(render_cache.cache_key(renamed, "final"), key)
+
+        reordered = dict(reversed(list(self._timeline().items())))
+        reordered["tracks"] = [dict(reversed(list(t.items()))) for t in reordered["tracks"]]
+        self.assertEqual(render_cache.cache_key(reordered, "final"), key)
+
+    def test_asset_identity_is_its_content(self):
+        key = render_cache.cache_key(self._timeline(), "final")
+        moved = self._asset("elsewhere.mp4", b"frames")
+        tl = self._timeline()
+        tl["tracks"][0]["src"] = moved
+        self.assertEqual(render_cache.cache_key(tl, "final"), key)
+
+        with open(self.clip, "wb") as f:
+            f.write(b"other frames")
+        self.assertNotEqual(render_cache.cache_key(self._timeline(), "final"), key)
+
+    def test_invalidated_by_what_changes_pixels(self):
+        key = render_cache.cache_key(self._timeline(), "final")
+        self.assertNotEqual(render_cache.cache_key(self._timeline(), "preview"), key)
+        self.assertNotEqual(render_cache.cache_key(self._timeline(fps=25), "final"), key)
+        tl = self._timeline()
+        tl["tracks"][1]["text"] = "ho"
+        self.assertNotEqual(render_cache.cache_key(tl, "final"), key)
+        with mock.patch.object(render_cache, "BUILDER_VERSION", "next"):
+            self.assertNotEqual(render_cache.cache_key(self._timeline(), "final"), key)
+
+    def test_uncacheable_timelines(self):
+        tl = self._timeline()
+        tl["tracks"][0]["src"] = os.path.join(self.tmp, "missing.mp4")
+        self.assertIsNone(render_cache.cache_key(tl, "final"))
+
+        weather = {"id": "w", "type": "weather", "start": 0, "end": 5, "showComponents": {"date": True}}
+        self.assertIsNone(render_cache.cache_key(self._timeline(tracks=[weather]), "final"))
+        weather["data"] = {"dateText": "Mon 1 Jan"}
+        self.assertIsNotNone(render_cache.cache_key(self._timeline(tracks=[weather]), "final"))
+
+
+class ProbeCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        cache_path = mock.patch.object(probe, "PROBE_CACHE_PATH", os.path.join(self.tmp, "probe.sqlite3"))
+        cache_path.start()
+        self.addCleanup(cache_path.stop)
+        self.probed = []
+        ffprobe = mock.patch.object(probe, "_run_ffprobe", side_effect=self._fake_ffprobe)
+        ffprobe.start()
+        self.addCleanup(ffprobe.stop)
+
+    def _fake_ffprobe(self, path):
+        self.probed.append(path)
+        if path.endswith(".bad"):
+            return None
+        return {"has_video": True, "duration": float(os.path.getsize(path)) if os.path.exists(path) else 1.0}
+
+    def _file(self, name: str, data: bytes = b"x") -> str:
+        path = os.path.join(self.tmp, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_probes_each_file_once(self):
+        a, b = self._file("a.mp4"), self._file("b.mp4", b"xyz")
+        self.assertEqual(probe.probe_many([a, b, a]), {a: {"has_video": True, "duration": 1.0},
+                                                        b: {"has_video": True, "duration": 3.0}})
+        self.assertEqual(sorted(self.probed), [a, b])
+        self.assertEqual(probe.probe_many([b, a])[b]["duration"], 3.0)
+        self.assertEqual(probe.probe_media(a)["duration"], 1.0)
+        self.assertEqual(len(self.probed), 2)
+
+    def test_changed_file_is_probed_again(self):
+        a = self._file("a.mp4")
+        probe.probe_many([a])
+        self._file("a.mp4", b"longer")
+        self.assertEqual(probe.probe_media(a)["duration"], 6.0)
+        self.assertEqual(self.probed, [a, a])
+
+    def test_failures_and_urls_are_not_persisted(self):
+        bad, url = self._file("upload.bad"), "https://example.com/clip.mp4"
+        missing = os.path.join(self.tmp, "missing.mp4")
+        self.assertEqual(probe.probe_many([bad, url, missing]), {url: {"has_video": True, "duration": 1.0}})
+        probe.probe_many([bad, url, missing])
+        self.assertEqual(self.probed, [bad, url, bad, url])
+
+    def test_parse_rate(self):
+        self.assertEqual(probe._parse_rate("30000/1001"), 30000 / 1001)
+        self.assertEqual(probe._parse_rate("25"), 25.0)
+        for rate in (None, "", "0/0", "0", "1/0", "x/y"):
+            self.assertIsNone(probe._parse_rate(rate), rate)
+
+
+def _tl(tracks, duration=60.0, fps=30, **extra) -> dict:
+    return {"width": 640, "height": 360, "fps": fps, "duration": duration, "tracks": tracks, **extra}
+
+
+def _text(start, end, **extra) -> dict:
+    return {"id": f"t{start}", "type": "text", "text": "x", "start": start, "end": end, "x": 0, "y": 0, **extra}
+
+
+class SegmentPlanTests(SimpleTestCase):
+    def test_segment_count(self):
+        self.assertEqual(segments._segment_count(60, 8), 4)       # by cpus (2 threads per segment)
+        self.assertEqual(segments._segment_count(25, 16), 2)      # by length (10 s minimum)
+        self.assertEqual(segments._segment_count(9, 16), 1)
+        self.assertEqual(segments._segment_count(3600, 256), segments.MAX_SEGMENTS)
+
+    def test_cuts_fall_on_the_gop_grid_without_nearby_boundaries(self):
+        tl = compile_timeline(_tl([_text(0, 60), _text(27, 33)]))
+        self.assertEqual(segments._plan_cuts(tl, 60, 30, 3), [20.0, 40.0])
+
+    def test_cuts_snap_to_nearby_track_boundaries(self):
+        tl = compile_timeline(_tl([_text(0, 23), _text(23, 36.5), _text(36.5, 60)]))
+        self.assertEqual(segments._plan_cuts(tl, 60, 30, 3), [23.0, 36.5])
+
+    def test_cuts_are_frame_aligned(self):
+        tl = compile_timeline(_tl([_text(0, 20.99), _text(20.99, 60)], fps=25))
+        cuts = segments._plan_cuts(tl, 60, 25, 3)
+        self.assertEqual(cuts, [21.0, 40.0])
+        for c in cuts:
+            self.assertAlmostEqual(c * 25, round(c * 25))
+
+    def test_cuts_keep_a_second_between_them_and_the_ends(self):
+        tl = compile_timeline(_tl([], duration=3))
+        self.assertEqual(segments._plan_cuts(tl, 3, 30, 3), [2.0])
+
+    def test_plan_windows_cover_the_timeline(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+        tl = _tl([_text(0, 60), _text(12, 31)])
+        plan = segments.plan_segmented_render(tl, os.path.join(workdir, "out.mp4"), workdir, cpus=8)
+        self.assertEqual(plan.windows, [(0.0, 12.0), (12.0, 31.0), (31.0, 44.0), (44.0, 60.0)])
+        self.assertEqual(len(plan.segment_cmds), 4)
+        self.assertEqual(plan.threads_per_segment, 2)
+        self.assertIsNone(plan.audio_cmd)  # nothing audible
+        self.assertEqual(plan.concat_list_body, "".join(f"file '{p}'\n" for p in plan.segment_paths))
+        self.assertIsNone(segments.plan_segmented_render(_tl([], duration=15), "out.mp4", workdir, cpus=8))
+
+
+class WindowTimelineTests(SimpleTestCase):
+    def _media(self, kind, start, end, **extra) -> dict:
+        return {"id": f"{kind}{start}", "type": kind, "src": f"/media/{kind}{start}", "start": start, "end": end,
+                "x": 0, "y": 0, **extra}
+
+    def test_tracks_are_clipped_and_rebased(self):
+        tl = _tl([_text(0, 10), _text(5, 15), _text(12, 18), _text(20, 30)])
+        sub = segments.window_timeline(tl, 10, 20)
+        self.assertEqual(sub.duration, 10)
+        # a track ending exactly at t0 still shows on the first frame (enable=between is inclusive)
+        self.assertEqual([(t.start, t.end) for t in sub.tracks], [(0, 0), (0, 5), (2, 8)])
+
+    def test_media_already_playing_skips_into_its_source(self):
+        tl = _tl([self._media("video", 4, 30, srcIn=2), self._media("audio", 0, 30), self._media("video", 12, 20)])
+        sub = segments.window_timeline(tl, 10, 20)
+        self.assertEqual([(t.start, t.end, t.t_offset) for t in sub.tracks], [(0, 10, 6), (0, 10, 10), (2, 10, 0)])
+
+    def test_ended_sources(self):
+        video = self._media("video", 0, 30, srcIn=1, srcOut=6)
+        audio = self._media("audio", 0, 30, srcOut=5)
+        long_video = self._media("video", 0, 30)
+        tl = _tl([video, audio, long_video])
+        sub = segments.window_timeline(tl, 10, 20, probes={long_video["src"]: {"duration": 12.0}})
+        # video holds its last frame; audio that already ended is silent for the whole window
+        self.assertEqual([t.type for t in sub.tracks], ["video", "video"])
+        self.assertAlmostEqual(sub.tracks[0].t_offset, 5 - 1 / 30)
+        self.assertEqual(sub.tracks[1].t_offset, 10)
+        sub = segments.window_timeline(tl, 20, 30, probes={long_video["src"]: {"duration": 12.0}})
+        self.assertAlmostEqual(sub.tracks[1].t_offset, 12 - 1 / 30)
+
+
+class MediaInputSeekTests(SimpleTestCase):
+    def _video(self, start=0, end=10, **extra):
+        return compile_track({"id": "v", "type": "video", "src": "/media/a.mp4", "start": start, "end": end,
+                              "x": 0, "y": 0, **extra})
+
+    def test_src_window(self):
+        cases = [
+            ({}, (0.0, 10)),                                   # whole track, from the source start
+            ({"srcIn": 2}, (0.0, 10)),                         # srcIn alone is ignored
+            ({"srcIn": 2, "srcOut": 7}, (2.0, 5.0)),
+            ({"srcIn": 7, "srcOut": 7}, (0.0, 10)),            # empty range is ignored
+            ({"srcIn": 1, "srcOut": 30}, (1.0, 10)),           # never longer than the track
+            ({"srcOut": 4}, (0.0, 4.0)),
+        ]
+        for extra, expected in cases:
+            with self.subTest(extra=extra):
+                self.assertEqual(_src_window(self._video(**extra)), expected)
+        self.assertEqual(_src_window(self._video(start=3, end=3)), (0.0, None))
+
+    def test_src_window_inside_a_time_window(self):
+        t = self._video(srcIn=2, srcOut=9)
+        t.t_offset = 3.0
+        self.assertEqual(_src_window(t), (5.0, 4.0))
+        t = self._video()
+        t.t_offset = 4.5
+        self.assertEqual(_src_window(t), (4.5, 10))
+
+    def test_input_flags(self):
+        self.assertEqual(_media_input_flags(self._video(srcIn=2, srcOut=7)), ["-ss", "2.000", "-t", "5.000"])
+        self.assertEqual(_media_input_flags(self._video(end=2.5)), ["-t", "2.500"])
+        self.assertEqual(_media_input_flags(self._video(start=1, end=1)), [])
+
+    def test_flags_precede_their_input(self):
+        tl = _tl([{"id": "v", "type": "video", "src": "/media/a.mp4", "start": 1, "end": 6, "srcIn": 2,
+                   "srcOut": 9, "x": 0, "y": 0}], duration=10)
+        args = build_ffmpeg_cmd(tl, "/tmp/out.mp4", mode="final")
+        i = args.index("/media/a.mp4")
+        self.assertEqual(args[i - 5:i + 1], ["-ss", "2.000", "-t", "5.000", "-i", "/media/a.mp4"])
+        self.assertNotIn("trim=", args[args.index("-filter_complex") + 1])
+
+
+class MediaInputPlanTests(SimpleTestCase):
+    def _plan(self, tracks, probes=None):
+        flags, srcs = [], []
+        compiled = [compile_track(t) for t in tracks]
+        filters = plan_media_inputs(compiled, 10.0, probes or {}, flags, srcs)
+        return compiled, filters, flags, srcs
+
+    def _track(self, id, type, src, start=0, end=10, **extra):
+        return {"id": id, "type": type, "src": src, "start": start, "end": end, "x": 0, "y": 0, **extra}
+
+    def test_repeated_image_is_opened_once(self):
+        ts, filters, flags, srcs = self._plan([
+            self._track("a", "image", "/media/logo.png", 0, 3),
+            self._track("b", "image", "/media/logo.png", 5, 9),
+            self._track("c", "image", "/media/other.png"),
+        ])
+        self.assertEqual(srcs, ["/media/logo.png", "/media/other.png"])
+        self.assertEqual(flags[0], ["-loop", "1", "-t", "10.0"])
+        self.assertEqual([t.in_idx for t in ts], [0, 0, 1])
+        self.assertEqual([t.fan for t in ts], [0, 1, None])
+        self.assertEqual(len(filters), 1)
+        self.assertTrue(filters[0].startswith("[0:v]split=2"))
+
+    def test_video_with_different_windows_gets_its_own_input(self):
+        ts, filters, flags, srcs = self._plan([
+            self._track("a", "video", "/media/a.mp4", 0, 5),
+            self._track("b", "video", "/media/a.mp4", 0, 5),
+            self._track("c", "video", "/media/a.mp4", 0, 5, srcIn=1, srcOut=6),
+            self._track("d", "video", "/media/a.mp4", 2, 7),
+        ], probes={"/media/a.mp4": {"has_audio": True}})
+        self.assertEqual(len(srcs), 3)
+        self.assertEqual([t.in_idx for t in ts], [0, 0, 1, 2])
+        self.assertTrue(all(t.has_audio for t in ts))
+        self.assertEqual(len(filters), 2)
+        self.assertTrue(filters[0].startswith("[0:v]split=2"))
+        self.assertTrue(filters[1].startswith("[0:a]asplit=2"))
+
+    def test_shared_input_without_audio_skips_asplit(self):
+        ts, filters, _, _ = self._plan([
+            self._track("a", "video", "/media/a.mp4"),
+            self._track("b", "video", "/media/a.mp4"),
+        ])
+        self.assertFalse(any(t.has_audio for t in ts))
+        self.assertEqual([f.split("]")[0] for f in filters], ["[0:v"])
+
+    def test_replanning_clears_stale_fan(self):
+        ts, _, _, _ = self._plan([self._track("a", "image", "/media/logo.png"),
+                                  self._track("b", "image", "/media/logo.png")])
+        flags, srcs = [], []
+        self.assertEqual(plan_media_inputs(ts[:1], 10.0, {}, flags, srcs), [])
+        self.assertIsNone(ts[0].fan)
+
+
+class StillIntervalTests(SimpleTestCase):
+    def _intervals(self, tracks, fps=10, total_frames=50):
+        ts = [compile_track(t) for t in tracks]
+        return [(f0, f1, [t.id for t in visible]) for f0, f1, visible in _frame_intervals(ts, fps, total_frames)]
+
+    def test_intervals_follow_enable_between(self):
+        # between(t,start,end) includes the end frame, so a track ending at 2 s still shows on frame 20
+        self.assertEqual(self._intervals([_text(0, 2, id="a"), _text(1, 3, id="b")]), [
+            (0, 10, ["a"]), (10, 21, ["a", "b"]), (21, 31, ["b"]), (31, 50, []),
+        ])
+
+    def test_identical_visible_sets_are_merged(self):
+        self.assertEqual(self._intervals([_text(1, 3, id="b"), _text(1, 3, id="c")]), [
+            (0, 10, []), (10, 31, ["b", "c"]), (31, 50, []),
+        ])
+
+    def test_start_between_frames_rounds_up(self):
+        self.assertEqual(self._intervals([_text(1.55, 10, id="a")]), [(0, 16, []), (16, 50, ["a"])])
+
+    def test_intervals_cover_every_frame(self):
+        intervals = self._intervals([_text(0.3, 1.2, id="a"), _text(2, 7, id="b"), _text(4.5, 4.6, id="c")])
+        self.assertEqual(intervals[0][0], 0)
+        self.assertEqual(intervals[-1][1], 50)
+        for prev, cur in zip(intervals, intervals[1:]):
+            self.assertEqual(prev[1], cur[0])
+            self.assertNotEqual(prev[2], cur[2])
+
+
+class FlattenTests(SimpleTestCase):
+    def _rect(self, id, start=0, end=5, **extra):
+        return compile_track({"id": id, "type": "rectangle", "start": start, "end": end, "x": 10, "y": 10,
+                              "width": 50, "height": 20, **extra})
+
+    def _plan(self, tracks, W=640, H=360, duration=10.0):
+        plan = flatten_layers([Layer(t, None) for t in tracks], W, H, duration)
+        return [[l.track.id for l in p.layers] if isinstance(p, _Group) else p.track.id for p in plan]
+
+    def test_unflattened_nodes_match_the_emitters(self):
+        cases = [
+            (self._rect("r"), _emit_rectangle_overlays),
+            (self._rect("r", outline="#ffffff", outlineWidth=2), _emit_rectangle_overlays),
+            (compile_track({"id": "c", "type": "circle", "start": 0, "end": 5, "x": 50, "y": 50, "radius": 20}),
+             _emit_circle_overlays),
+            (compile_track({"id": "c", "type": "circle", "start": 0, "end": 5, "x": 50, "y": 50, "radius": 20,
+                            "outline": "#ffffff", "outlineWidth": 3}), _emit_circle_overlays),
+        ]
+        for t, emit in cases:
+            with self.subTest(track=t):
+                filters, _, _ = emit(t, "[v0]", 1, 30)
+                self.assertEqual(_unflattened_nodes(t), _per_frame_nodes(filters))
+        t = compile_track(_text(0, 5))
+        self.assertEqual(_unflattened_nodes(t), _per_frame_nodes(_emit_text_overlay(t, "[v0]", 1)[0]))
+
+    def test_consecutive_static_layers_with_one_window_are_grouped(self):
+        self.assertEqual(self._plan([self._rect("a"), self._rect("b"), self._rect("c", start=1)]),
+                         [["a", "b"], "c"])
+
+    def test_dropped_layer_does_not_split_a_group(self):
+        tracks = [self._rect("a"), self._rect("hidden", opacity=0), self._rect("off", x=2000),
+                  self._rect("empty", start=3, end=3), self._rect("late", start=11, end=12), self._rect("b")]
+        self.assertEqual(self._plan(tracks), [["a", "b"]])
+
+    def test_animated_layer_splits_a_group(self):
+        moving = self._rect("m")
+        moving.static = False
+        self.assertEqual(self._plan([self._rect("a"), moving, self._rect("b")]), ["a", "m", "b"])
+
+    def test_text_is_never_dropped_for_opacity(self):
+        self.assertEqual(self._plan([compile_track(_text(0, 5, id="t", opacity=0))]), ["t"])
+
+
+class _FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise OSError(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+class _FakeSession:
+    """Replays queued responses (or raises queued exceptions) and records request headers."""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, stream, timeout, headers):
+        self.requests.append(dict(headers))
+        r = self.responses.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+
+class AssetCacheTests(SimpleTestCase):
+    url = "https://cdn.example.com/logo.png"
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        cm = override_settings(ASSET_CACHE_DIR=root, ASSET_CACHE_FRESH_SECONDS=300,
+                               ASSET_CACHE_MIN_AGE_SECONDS=3600, ASSET_CACHE_MAX_BYTES=1 << 20)
+        cm.enable()
+        self.addCleanup(cm.disable)
+
+    def _age(self, seconds):
+        conn = asset_cache._connect()
+        try:
+            conn.execute("UPDATE urls SET checked = checked - ?", (seconds,))
+            conn.execute("UPDATE blobs SET last_used = last_used - ?", (seconds,))
+        finally:
+            conn.close()
+
+    def test_download_then_hit(self):
+        session = _FakeSession(_FakeResponse(200, b"png-bytes", {"ETag": '"v1"'}))
+        path, how = asset_cache.fetch(self.url, session)
+        self.assertEqual(how, "download")
+        self.assertTrue(path.endswith(".png"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"png-bytes")
+        self.assertEqual(asset_cache.fetch(self.url, session), (path, "cache"))
+        self.assertEqual(len(session.requests), 1)
+        st = asset_cache.stats()
+        self.assertEqual((st["hits"], st["misses"], st["bytes"]), (1, 1, 9))
+
+    def test_stale_entry_is_revalidated(self):
+        session = _FakeSession(_FakeResponse(200, b"png-bytes", {"ETag": '"v1"'}), _FakeResponse(304))
+        path, _ = asset_cache.fetch(self.url, session)
+        self._age(600)
+        self.assertEqual(asset_cache.fetch(self.url, session), (path, "cache"))
+        self.assertEqual(session.requests[1], {"If-None-Match": '"v1"'})
+        self.assertEqual(asset_cache.stats()["revalidations"], 1)
+
+    def test_unreachable_origin_serves_stale_copy(self):
+        session = _FakeSession(_FakeResponse(200, b"png-bytes"), OSError("down"))
+        path, _ = asset_cache.fetch(self.url, session)
+        self._age(600)
+        self.assertEqual(asset_cache.fetch(self.url, session), (path, "cache"))
+        self.assertEqual(asset_cache.stats()["stale_hits"], 1)
+        with self.assertRaises(OSError):
+            asset_cache.fetch("https://cdn.example.com/other.png", _FakeSession(OSError("down")))
+
+    def test_eviction_keeps_recently_used_blobs(self):
+        old, _ = asset_cache.fetch("https://cdn.example.com/a.png", _FakeSession(_FakeResponse(200, b"a" * 600)))
+        self._age(7200)
+        recent, _ = asset_cache.fetch("https://cdn.example.com/b.png", _FakeSession(_FakeResponse(200, b"b" * 600)))
+        with override_settings(ASSET_CACHE_MAX_BYTES=1000):
+            newest, _ = asset_cache.fetch("https://cdn.example.com/c.png",
+                                          _FakeSession(_FakeResponse(200, b"c" * 600)))
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))  # younger than the minimum age, kept past the cap
+        self.assertTrue(os.path.exists(newest))
+        st = asset_cache.stats()
+        self.assertEqual((st["evictions"], st["bytes"]), (1, 1200))
+
+
+class PreviewResolutionTests(SimpleTestCase):
+    def _rect(self):
+        return {"id": "r", "type": "rectangle", "start": 0, "end": 5, "x": 300, "y": 150, "width": 600,
+                "height": 300, "outline": "#ffffff", "outlineWidth": 6}
+
+    def test_small_canvas_is_kept(self):
+        tl = compile_timeline(_tl([self._rect()]))
+        self.assertIs(_preview_timeline(tl), tl)
+
+    def test_canvas_and_tracks_are_scaled_together(self):
+        tl = _preview_timeline(compile_timeline(_tl([self._rect()], width=1920, height=1080)))
+        self.assertEqual((tl.width, tl.height), (1280, 720))
+        r = tl.tracks[0]
+        self.assertEqual((r.x, r.y, r.width, r.height, r.outline_width), (200, 100, 400, 200, 4))
+
+    def test_portrait_canvas_fits_the_height_with_even_width(self):
+        tl = _preview_timeline(compile_timeline(_tl([], width=1080, height=1920)))
+        self.assertEqual((tl.width, tl.height), (404, 720))
+
+    def test_preview_graph_runs_at_preview_size(self):
+        tl = _tl([self._rect()], duration=5, width=1920, height=1080)
+        preview, final = (self._graph(tl, mode) for mode in ("preview", "final"))
+        self.assertIn("s=1280x720", preview)
+        self.assertNotIn("scale=", preview)
+        self.assertIn("s=1920x1080", final)
+
+    def _graph(self, tl, mode):
+        args = build_ffmpeg_cmd(tl, "/tmp/o.mp4", mode=mode)
+        return args[args.index("-filter_complex") + 1]
+
+
+class PreviewWindowTests(SimpleTestCase):
+    def _validate(self, **extra):
+        tracks = [_text(0, 2, id="a", z=0), _text(2.5, 5, id="b", z=0), _text(6, 8, id="c", z=0)]
+        s = PreviewSerializer(data={**_tl(tracks, duration=10), **extra})
+        self.assertTrue(s.is_valid(), s.errors)
+        return s.validated_data
+
+    def test_window_drops_tracks_outside_it(self):
+        data = self._validate(previewStart=2.5, previewEnd=5.5)
+        self.assertEqual([t["id"] for t in data["tracks"]], ["b"])
+        data = self._validate(previewStart=2)  # a track ending at the window start is still on its first frame
+        self.assertEqual([t["id"] for t in data["tracks"]], ["a", "b", "c"])
+
+    def test_window_is_clamped_to_the_duration(self):
+        data = self._validate(previewStart=3, previewEnd=30, previewFps=60)
+        self.assertEqual((data["previewStart"], data["previewEnd"], data["previewFps"]), (3.0, 10.0, 30))
+
+    def test_invalid_windows(self):
+        for extra in ({"previewStart": 5, "previewEnd": 4}, {"previewStart": 12}):
+            with self.subTest(extra=extra):
+                s = PreviewSerializer(data={**_tl([], duration=10), **extra})
+                self.assertFalse(s.is_valid())
+
+    def test_preview_window_rebases_and_lowers_fps(self):
+        data = self._validate()
+        tl = preview_window(data, 2.5, 7, fps=12)
+        self.assertEqual((tl.duration, tl.fps), (4.5, 12))
+        self.assertEqual([(t.id, t.start, t.end) for t in tl.tracks], [("b", 0.0, 2.5), ("c", 3.5, 4.5)])
+        self.assertEqual(preview_window(data, fps=60).fps, 30)
+        self.assertIs(preview_window(tl), tl)
+
+
+class SchedulerBudgetTests(SimpleTestCase):
+    def _budget(self, index=0, slots=4, busy=0, load=None, cpus=16):
+        with mock.patch.object(scheduler, "available_cpus", return_value=list(range(cpus))), \
+                mock.patch.object(scheduler, "_load_average", return_value=load):
+            return scheduler._budget(index, slots, busy)
+
+    def test_share_without_load_average(self):
+        self.assertEqual(self._budget(), (4, None))
+        self.assertEqual(self._budget(slots=32), (1, None))
+
+    def test_busy_slots_do_not_count_as_external_load(self):
+        cases = [
+            (0, 0.0, 4),    # idle box
+            (3, 12.0, 4),   # the load is our own three busy slots
+            (0, 14.0, 2),   # someone else's work leaves two CPUs
+            (2, 12.0, 4),   # 8 from busy slots + 4 external still leaves a full share
+            (2, 14.0, 2),
+            (3, 40.0, 1),   # overloaded: never below one thread
+        ]
+        for busy, load, threads in cases:
+            with self.subTest(busy=busy, load=load):
+                self.assertEqual(self._budget(busy=busy, load=load)[0], threads)
+
+    @override_settings(RENDER_CPU_AFFINITY=True)
+    def test_affinity_sets(self):
+        self.assertEqual(self._budget(index=1)[1], (4, 5, 6, 7))
+        self.assertEqual(self._budget(index=5)[1], (4, 5, 6, 7))  # interactive slots wrap around
+        self.assertEqual(self._budget(index=2, slots=4, cpus=6)[1], (2,))
+
+
+class FairShareTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.a = User.objects.create_user("fair-a", "fair-a@example.com", "pw")
+        self.b = User.objects.create_user("fair-b", "fair-b@example.com", "pw")
+        self.at = now()
+
+    def _job(self, user, priority=RenderJob.PRIORITY_FINAL, age=0, **fields):
+        job = RenderJob.objects.create(user=user, kind="video", priority=priority, timeline={}, **fields)
+        RenderJob.objects.filter(pk=job.pk).update(created_at=self.at - timedelta(seconds=age))
+        return job.id
+
+    def _used(self, user, cpu_seconds):
+        self._job(user, status="done", cpu_seconds=cpu_seconds, finished_at=self.at - timedelta(seconds=60))
+
+    def _running(self, user, threads, elapsed=10, priority=RenderJob.PRIORITY_FINAL):
+        self._job(user, priority=priority, status="running", started_at=self.at - timedelta(seconds=elapsed),
+                  stats={"slot": {"threads": threads}})
+
+    def test_priority_then_usage_then_arrival(self):
+        self._used(self.b, 100)
+        b_final = self._job(self.b, age=30)
+        a_final = self._job(self.a, age=20)
+        self._job(self.a, age=10)  # behind a_final: only each user's oldest job is a candidate
+        a_preview = self._job(self.a, priority=RenderJob.PRIORITY_INTERACTIVE, age=5)
+        self.assertEqual(list(fairshare.candidates()), [a_preview, a_final, b_final])
+        self.assertEqual(list(fairshare.candidates(max_priority=RenderJob.PRIORITY_STILL)), [a_preview])
+
+    def test_arrival_breaks_ties(self):
+        a_final = self._job(self.a, age=10)
+        b_final = self._job(self.b, age=20)
+        self.assertEqual(list(fairshare.candidates()), [b_final, a_final])
+
+    def test_running_jobs_count_elapsed_time_times_threads(self):
+        self._used(self.b, 50)
+        a_final = self._job(self.a, age=10)
+        b_final = self._job(self.b, age=20)
+        # interactive, so a's running jobs do not hit the final/batch cap
+        self._running(self.a, threads=2, priority=RenderJob.PRIORITY_INTERACTIVE)  # ~20 cpu-seconds so far
+        self.assertEqual(list(fairshare.candidates()), [a_final, b_final])
+        self._running(self.a, threads=6, priority=RenderJob.PRIORITY_INTERACTIVE)  # ~80 in total
+        self.assertEqual(list(fairshare.candidates()), [b_final, a_final])
+
+    def test_weights(self):
+        self._used(self.a, 50)
+        self._used(self.b, 100)
+        a_final = self._job(self.a, age=10)
+        b_final = self._job(self.b, age=20)
+        self.assertEqual(list(fairshare.candidates()), [a_final, b_final])
+        with override_settings(RENDER_USER_WEIGHTS={str(self.b.id): 4}):
+            self.assertEqual(list(fairshare.candidates()), [b_final, a_final])
+
+    @override_settings(RENDER_USER_MAX_RUNNING=1)
+    def test_running_cap_holds_back_finals_only(self):
+        self._running(self.a, threads=1)
+        self._job(self.a, age=10)
+        a_preview = self._job(self.a, priority=RenderJob.PRIORITY_INTERACTIVE, age=5)
+        b_final = self._job(self.b, age=20)
+        self.assertEqual(list(fairshare.candidates()), [a_preview, b_final])
@@ -7,6 +7,12 @@ from .views import (
     ImagePreviewView,      # NEW image preview
     ImageSaveView,         # NEW image export
     LockedListView,
+    RenderJobStatusView,
+    RenderJobEventsView,
+    RenderCacheStatsView,
+    AssetCacheStatsView,
+    RenderQueueStatsView,
+    RenderExplainView,
 )
 
 urlpatterns = [
@@ -16,5 +22,11 @@ urlpatterns = [
     path("render", RenderSaveView.as_view(), name="render-save"),                       # video
     path("render/image/preview", ImagePreviewView.as_view(), name="render-image-preview"),
     path("render/image", ImageSaveView.as_view(), name="render-image"),
+    path("render/explain", RenderExplainView.as_view(), name="render-explain"),
+    path("render/jobs/<uuid:job_id>", RenderJobStatusView.as_view(), name="render-job-status"),
+    path("render/jobs/<uuid:job_id>/events", RenderJobEventsView.as_view(), name="render-job-events"),
+    path("render/cache/stats", RenderCacheStatsView.as_view(), name="render-cache-stats"),
+    path("render/cache/assets/stats", AssetCacheStatsView.as_view(), name="render-asset-cache-stats"),
+    path("render/queue/stats", RenderQueueStatsView.as_view(), name="render-queue-stats"),
     path("locked/list/<str:orientation>", LockedListView.as_view(), name="locked-list-by-orientation"),
 ]
@@ -0,0 +1,232 @@
+"""
+Compiled track validation.
+
+TimelineSerializer used to build a fresh DRF serializer per track; every
+instance deep-copies its declared fields (and those of nested serializers)
+before validating, which dominates request time for timelines with hundreds
+of tracks.
+
+CompiledSerializer walks a serializer class's fields once and compiles them
+into a flat list of steps (type check, coercion, min/max, blank/null/default
+handling), then validates each track in a single pass over that list with no
+per-field objects. It only has a fast path for input that is valid: anything
+unusual or invalid (wrong types, out-of-range numbers, blank strings,
+.validate() errors, ...) is re-validated with the real serializer, so
+validated data and error messages are exactly DRF's.
+"""
+from collections.abc import Mapping
+
+from rest_framework import serializers
+from rest_framework.fields import empty, _UnvalidatedField
+
+
+class _Slow(Exception):
+    """The fast path cannot vouch for this value; validate with DRF."""
+
+
+class _Uncompilable(Exception):
+    """The serializer uses a feature the compiler does not reproduce."""
+
+
+def _number_bounds(field):
+    lo, hi = field.min_value, field.max_value
+    # any validator beyond the min/max ones the field adds itself needs DRF
+    if len(field.validators) != (lo is not None) + (hi is not None):
+        return None
+    return lo, hi
+
+
+def _fast_float(field):
+    bounds = _number_bounds(field)
+    if bounds is None:
+        return None
+    lo, hi = bounds
+
+    def check(v):
+        if type(v) is not float and type(v) is not int:
+            raise _Slow
+        try:
+            f = float(v)
+        except OverflowError:
+            raise _Slow
+        if (lo is not None and f < lo) or (hi is not None and f > hi):
+            raise _Slow
+        return f
+    return check
+
+
+def _fast_int(field):
+    bounds = _number_bounds(field)
+    if bounds is None:
+        return None
+    lo, hi = bounds
+
+    def check(v):
+        if type(v) is not int or (lo is not None and v < lo) or (hi is not None and v > hi):
+            raise _Slow
+        return v
+    return check
+
+
+def _fast_char(field):
+    # CharField always carries the null-character and surrogate validators; anything else needs DRF
+    if field.max_length is not None or field.min_length is not None or len(field.validators) != 2:
+        return None
+    allow_blank, trim = field.allow_blank, field.trim_whitespace
+
+    def check(v):
+        if type(v) is not str or "\x00" in v or not v.isascii() and _has_surrogates(v):
+            raise _Slow
+        if trim:
+            v = v.strip()
+        if v == "":
+            if not allow_blank:
+                raise _Slow
+        return v
+    return check
+
+
+def _has_surrogates(v: str) -> bool:
+    try:
+        v.encode("utf-8")
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+def _fast_bool(field):
+    def check(v):
+        if type(v) is not bool:
+            raise _Slow
+        return v
+    return check
+
+
+def _fast_choice(field):
+    choices = dict(field.choice_strings_to_values)
+
+    def check(v):
+        if type(v) is not str or v not in choices:
+            raise _Slow
+        return choices[v]
+    return check
+
+
+def _fast_dict(field):
+    if field.validators or not field.allow_empty:
+        return None
+    child = field.child
+    if isinstance(child, _UnvalidatedField):
+        def check(v):
+            if type(v) is not dict:
+                raise _Slow
+            return {str(k): x for k, x in v.items()}
+        return check
+
+    child_check = _value_check(child)
+
+    def check(v):
+        if type(v) is not dict:
+            raise _Slow
+        return {str(k): child_check(x) for k, x in v.items()}
+    return check
+
+
+_FAST = {
+    serializers.FloatField: _fast_float,
+    serializers.IntegerField: _fast_int,
+    serializers.CharField: _fast_char,
+    serializers.BooleanField: _fast_bool,
+    serializers.ChoiceField: _fast_choice,
+    serializers.DictField: _fast_dict,
+}
+
+
+def _value_check(field):
+    """(value) -> internal value for a present (possibly None) value, or raise _Slow."""
+    if isinstance(field, serializers.Serializer) and not getattr(field, "many", False):
+        fast = _Schema(field).run
+    else:
+        factory = _FAST.get(type(field))
+        fast = factory(field) if factory else None
+        if fast is None:
+            raise _Uncompilable(type(field).__name__)
+    allow_null = field.allow_null
+
+    def check(v):
+        if v is None:
+            if not allow_null:
+                raise _Slow
+            return None
+        return fast(v)
+    return check
+
+
+class _Schema:
+    """One serializer's writable fields as (name, required, default, check) steps."""
+
+    def __init__(self, serializer: serializers.Serializer):
+        if serializer.validators:
+            raise _Uncompilable("serializer-level validators")
+        self.steps = []
+        for field in serializer._writable_fields:
+            name = field.field_name
+            if field.source_attrs != [name] or hasattr(serializer, "validate_" + name):
+                raise _Uncompilable(name)
+            self.steps.append((name, field.required, field.default, _value_check(field)))
+        overridden = type(serializer).validate is not serializers.Serializer.validate
+        self.validate = serializer.validate if overridden else None
+
+    def run(self, data) -> dict:
+        if not isinstance(data, Mapping):
+            raise _Slow
+        ret = {}
+        for name, required, default, check in self.steps:
+            v = data.get(name, empty)
+            if v is empty:
+                if required:
+                    raise _Slow
+                if default is not empty:
+                    ret[name] = default() if callable(default) else default
+                continue
+            ret[name] = check(v)
+        if self.validate is not None:
+            try:
+                ret = self.validate(ret)
+            except Exception:
+                raise _Slow  # DRF reports it (or raises it) exactly as before
+            if ret is None:
+                raise _Slow
+        return ret
+
+
+class CompiledSerializer:
+    """
+    Validates plain data like `serializer_class(data=data)` + `is_valid(raise_exception=True)`
+    and returns its validated_data, compiling the serializer's fields on first use.
+    Serializers using features the compiler does not know are always validated by DRF.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._schema = None
+        self._compiled = False
+
+    def _compile(self):
+        try:
+            self._schema = _Schema(self.serializer_class())
+        except _Uncompilable:
+            self._schema = None
+        self._compiled = True
+
+    def validate(self, data) -> dict:
+        if not self._compiled:
+            self._compile()
+        if self._schema is not None:
+            try:
+                return self._schema.run(data)
+            except _Slow:
+                pass
+        s = self.serializer_class(data=data)
+        s.is_valid(raise_exception=True)
+        return s.validated_data
@@ -1,23 +1,38 @@
 import os
+import json
+import hashlib
+import time
 import uuid
-import subprocess
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, unquote
 
 from django.conf import settings
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from django.utils.timezone import now
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 
-from .serializers import TimelineSerializer
-from .models import LockedContent
-from .ffmpegkit.builder import build_ffmpeg_cmd, build_ffmpeg_cmd_still  # speed-aware
+from account.jwt import QueryTokenJWTAuthentication
+
+from .serializers import PreviewSerializer, TimelineSerializer
+from .models import LockedContent, RenderJob
+from .jobs import enqueue_render, inflight_preview, job_status_payload, supersede_previews, _resolve_ffmpeg_bin
+from .ffmpegkit.hls import HLS_PLAYLIST, write_placeholder_playlist
+from . import asset_cache, fairshare, render_cache, scheduler
+from .explain import explain_render
+from .asset_index import ASSET_INDEX, _url_prefix, parse_ref, resolve_refs
 
 try:
     import requests
+    import requests.adapters
 except ImportError:
     requests = None
 
@@ -37,118 +52,121 @@ def _strip_leading_slashes(path_or_url: str) -> str:
     return unquote(path_or_url.lstrip("/"))
 
 
-def _map_media_static_to_fs(path_part: str) -> str | None:
-    media_url = getattr(settings, "MEDIA_URL", "") or ""
-    static_url = getattr(settings, "STATIC_URL", "") or ""
-    m_prefix = media_url if media_url.endswith("/") else media_url + "/"
-    s_prefix = static_url if static_url.endswith("/") else static_url + "/"
-
-    if m_prefix and path_part.startswith(m_prefix.lstrip("/")):
-        rel = path_part[len(m_prefix.lstrip("/")):]
-        candidate = os.path.join(str(settings.MEDIA_ROOT), rel)
-        if os.path.isfile(candidate):
-            return candidate
-
-    if s_prefix and path_part.startswith(s_prefix.lstrip("/")):
-        rel = path_part[len(s_prefix.lstrip("/")):]
-        static_root = getattr(settings, "STATIC_ROOT", None)
-        if static_root:
-            candidate = os.path.join(str(static_root), rel)
-            if os.path.isfile(candidate):
-                return candidate
-    return None
-
-
 def _try_map_to_local_file(src_or_url: str) -> str | None:
     p = urlparse(src_or_url)
-    if p.scheme in ("http", "https"):
-        path_part = _strip_leading_slashes(p.path)
-        hit = _map_media_static_to_fs(path_part)
-        if hit:
-            return hit
-        rel_path = path_part
-    else:
-        if src_or_url.startswith("/"):
-            hit = _map_media_static_to_fs(_strip_leading_slashes(src_or_url))
-            if hit:
-                return hit
-        rel_path = _strip_leading_slashes(src_or_url)
-
-    if not rel_path:
+    path_part = p.path if p.scheme in ("http", "https") else src_or_url
+    key = _strip_leading_slashes(path_part)
+    if not key:
         return None
+    return ASSET_INDEX.resolve(key)
 
-    candidates_rel = [rel_path]
-    if rel_path.startswith("videos/"):
-        candidates_rel.append(rel_path[len("videos/"):])
-
-    for base in getattr(settings, "ASSET_FALLBACK_DIRS", []):
-        for rel in candidates_rel:
-            candidate = os.path.join(str(base), rel)
-            if os.path.isfile(candidate):
-                return candidate
-
-    videos_root = getattr(settings, "VIDEOS_ROOT", None)
-    if videos_root:
-        for rel in candidates_rel:
-            candidate = os.path.join(str(videos_root), rel)
-            if os.path.isfile(candidate):
-                return candidate
-    return None
 
+def _is_own_media_url(request, src_or_url: str) -> bool:
+    """True for URLs this server would answer from MEDIA_ROOT / STATIC_ROOT / VIDEOS_ROOT itself."""
+    p = urlparse(src_or_url)
+    if p.netloc and p.netloc != request.get_host():
+        return False
+    key = (p.path if p.scheme else src_or_url).lstrip("/")
+    for name in ("MEDIA_URL", "STATIC_URL", "VIDEOS_URL"):
+        # "static/" and "/static/" both mean /static/...; a CDN URL never matches a path
+        prefix = _url_prefix(getattr(settings, name, ""))
+        if prefix and key.startswith(prefix):
+            return True
+    return False
 
-_ASSET_CACHE: dict[str, str] = {}
 
+_HTTP_SESSION = None
+_HTTP_LOCK = threading.Lock()
 
-def _download_once_to_tmp(abs_url: str) -> str:
-    if abs_url in _ASSET_CACHE:
-        return _ASSET_CACHE[abs_url]
-    if requests is None:
-        raise RuntimeError("The 'requests' package is required to download remote assets.")
 
-    import tempfile
-    parsed = urlparse(abs_url)
-    fname = os.path.basename(parsed.path) or "asset"
-    root, ext = os.path.splitext(fname)
-    fd, tmp_path = tempfile.mkstemp(prefix="render_asset_", suffix=ext or "")
-    os.close(fd)
+def _localize_workers() -> int:
+    return max(1, int(getattr(settings, "RENDER_LOCALIZE_WORKERS", 8)))
 
-    try:
-        with requests.get(abs_url, stream=True, timeout=30) as r:
-            r.raise_for_status()
-            with open(tmp_path, "wb") as f:
-                shutil.copyfileobj(r.raw, f)
-    except Exception:
-        try:
-            os.remove(tmp_path)
-        except OSError:
-            pass
-        raise
 
-    _ASSET_CACHE[abs_url] = tmp_path
-    return tmp_path
+def _http_session():
+    """Process-wide session: keep-alive connections are pooled per host and reused across requests."""
+    global _HTTP_SESSION
+    with _HTTP_LOCK:
+        if _HTTP_SESSION is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=_localize_workers())
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _HTTP_SESSION = session
+    return _HTTP_SESSION
 
 
-def _to_local_path(request, src_or_url: str) -> str:
+def _to_local_path(request, src_or_url: str) -> tuple[str, str]:
+    """(local path, how it was resolved: local / cache / download / passthrough)."""
     local = _try_map_to_local_file(src_or_url)
     if local and os.path.exists(local):
-        return local
+        return local, "local"
 
     p = urlparse(src_or_url)
     if p.scheme in ("http", "https"):
         abs_url = src_or_url if p.netloc else _normalize_src_to_abs_url(request, src_or_url)
-        return _download_once_to_tmp(abs_url)
-
-    if src_or_url.startswith("/"):
+    elif src_or_url.startswith("/"):
         abs_url = _normalize_src_to_abs_url(request, src_or_url)
-        return _download_once_to_tmp(abs_url)
+    else:
+        return src_or_url, "passthrough"
+
+    if _is_own_media_url(request, abs_url):
+        # our own media/static files are on this disk or nowhere: never download them from ourselves
+        raise FileNotFoundError(f"asset not found: {src_or_url}")
+    if requests is None:
+        raise RuntimeError("The 'requests' package is required to download remote assets.")
+    return asset_cache.fetch(abs_url, _http_session())
 
-    return src_or_url
 
+def _timed_local_path(request, src: str) -> tuple[str, str, float]:
+    t0 = time.perf_counter()
+    path, how = _to_local_path(request, src)
+    return path, how, time.perf_counter() - t0
 
-def _localize_timeline_assets(request, timeline: dict) -> dict:
+
+def _localize_timeline_assets(request, timeline: dict) -> tuple[dict, dict]:
+    """
+    Map backgroundImage and every media src to a local file, resolving/downloading all
+    distinct sources concurrently. Sources may also be typed content references
+    ("video:123", "image:45", "warning:7") owned by the requesting user.
+    Returns (localized timeline, timing report).
+    """
     tl = dict(timeline)
+    srcs = []
+    if tl.get("backgroundImage"):
+        srcs.append(tl["backgroundImage"])
+    for tr in tl.get("tracks", []):
+        if tr.get("type") in ("video", "image", "audio") and tr.get("src"):
+            srcs.append(tr["src"])
+    srcs = list(dict.fromkeys(srcs))  # each distinct source once
+    ASSET_INDEX.ensure_built()  # the first build queries the content models: not from pool threads
+
+    t0 = time.perf_counter()
+    # typed references ("video:123") map straight to storage paths, all in one query
+    refs = [src for src in srcs if parse_ref(src)]
+    resolved = {}
+    if refs:
+        paths = resolve_refs(refs, request.user)
+        dt = time.perf_counter() - t0
+        resolved = {ref: (paths[ref], "ref", dt) for ref in refs}
+        srcs = [src for src in srcs if src not in resolved]
+
+    workers = min(len(srcs), _localize_workers())
+    if workers <= 1:
+        for src in srcs:
+            resolved[src] = _timed_local_path(request, src)
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="localize")
+        try:
+            futures = {src: pool.submit(_timed_local_path, request, src) for src in srcs}
+            for src, fut in futures.items():
+                resolved[src] = fut.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    total = time.perf_counter() - t0
+
     if tl.get("backgroundImage"):
-        tl["backgroundImage"] = _to_local_path(request, tl["backgroundImage"])
+        tl["backgroundImage"] = resolved[tl["backgroundImage"]][0]
 
     # keep orientation untouched (if present)
     # tl.get("orientation") may be used by your ffmpeg builder if needed
@@ -160,10 +178,19 @@ def _localize_timeline_assets(request, timeline: dict) -> dict:
         if ttype in ("video", "image", "audio"):
             src = tr2.get("src")
             if src:
-                tr2["src"] = _to_local_path(request, src)
+                tr2["src"] = resolved[src][0]
         new_tracks.append(tr2)
     tl["tracks"] = new_tracks
-    return tl
+
+    report = {
+        "seconds": round(total, 3),
+        "concurrency": max(1, workers),
+        "assets": [
+            {"src": src, "source": how, "seconds": round(dt, 3)}
+            for src, (_path, how, dt) in resolved.items()
+        ],
+    }
+    return tl, report
 
 
 def _ensure_dir_inside_media(subdir: str) -> str:
@@ -182,30 +209,65 @@ def _media_url_for(request, rel_path: str) -> str:
     return request.build_absolute_uri(media_url + rel_path)
 
 
-def _resolve_ffmpeg_bin() -> str | None:
-    ff = getattr(settings, "FFMPEG_BIN", None)
-    if ff:
-        ff = os.path.expandvars(os.path.expanduser(str(ff)))
-        if os.path.isfile(ff):
-            return ff
-        found = shutil.which(ff)
-        if found:
-            return found
-    return shutil.which("ffmpeg")
-
-
 def _sanitize_orientation(raw) -> str:
     val = (raw or "").strip().lower()
     return "portrait" if val == "portrait" else "landscape"
 
 
+def _locked_payload(request, lc: LockedContent, output_rel: str) -> dict:
+    return {
+        "id": lc.id,
+        "name": lc.name,
+        "type": lc.type,
+        "duration_seconds": lc.duration_seconds,
+        "status": lc.status,
+        "created_at": lc.created_at,
+        "file": output_rel,
+        "file_url": _media_url_for(request, output_rel),
+        "orientation": lc.orientation,
+    }
+
+
+def _queue_full_response() -> Response | None:
+    """429 + Retry-After while the render queue is at RENDER_MAX_QUEUED (see scheduler)."""
+    wait = scheduler.retry_after()
+    if wait is None:
+        return None
+    return Response(
+        {"error": "Render queue is full. Try again later.", "retry_after": wait},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(wait)},
+    )
+
+
+def _coalesce_key(request) -> str:
+    """Previews supersede each other per user, or per user and project when the client names one."""
+    project = str(getattr(request, "data", {}).get("project") or "").strip()[:100]
+    return f"{request.user.pk}:{project}" if project else str(request.user.pk)
+
+
+def _job_links(request, job: RenderJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "render_id": job.id.hex,
+        "job_status": job.status,
+        "priority": job.get_priority_display(),
+        "status_url": request.build_absolute_uri(reverse("render-job-status", args=[job.id])),
+        "events_url": request.build_absolute_uri(reverse("render-job-events", args=[job.id])),
+    }
+
+
 # --------------------------- VIDEO endpoints ---------------------------
 
 class PreviewRenderView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        ser = TimelineSerializer(data=request.data)
+        full = _queue_full_response()
+        if full:
+            return full
+
+        ser = PreviewSerializer(data=request.data)
         if not ser.is_valid():
             return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
         data = ser.validated_data
@@ -217,43 +279,64 @@ class PreviewRenderView(APIView):
 
         # localize
         try:
-            data_local = _localize_timeline_assets(request, data)
+            data_local, localize = _localize_timeline_assets(request, data)
             data_local["orientation"] = orientation
         except Exception as e:
             return Response({"error": f"Failed to localize assets: {e}"}, status=400)
 
-        rid = uuid.uuid4().hex
-        out_dir = _ensure_dir_inside_media("previews")
-        filename = f"{rid}.mp4"
-        output_path = os.path.join(out_dir, filename)
-
-        try:
-            # FAST preview
-            args = build_ffmpeg_cmd(data_local, output_path, mode="preview")
-        except Exception as e:
-            return Response({"error": f"Failed to build ffmpeg graph: {e}"}, status=400)
-
-        ffmpeg_bin = _resolve_ffmpeg_bin()
-        if not ffmpeg_bin:
+        if not _resolve_ffmpeg_bin():
             return Response({"error": "ffmpeg not found. Configure FFMPEG_BIN or PATH."}, status=400)
 
-        try:
-            subprocess.run(
-                [ffmpeg_bin, *args],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                check=True
-            )
-        except subprocess.CalledProcessError as e:
-            return Response({"error": "ffmpeg failed", "stderr": e.stderr.decode("utf-8", errors="ignore")}, status=500)
-
-        rel_path = f"previews/{filename}"
-        return Response({"preview_url": _media_url_for(request, rel_path), "render_id": rid}, status=200)
+        # only the newest preview per user/project matters: an identical one still in
+        # flight is shared, anything older is cancelled
+        coalesce = bool(getattr(settings, "RENDER_PREVIEW_COALESCE", True))
+        key = _coalesce_key(request) if coalesce else ""
+        job = inflight_preview(key, data_local) if coalesce else None
+        shared = job is not None
+        superseded = 0
+        if job is None:
+            _ensure_dir_inside_media("previews")
+            job_id = uuid.uuid4()
+            hls = bool(getattr(settings, "RENDER_PREVIEW_HLS", True))
+            if hls:
+                # previews/<rid>/: live playlist + fMP4 segments, plus the full MP4 when done
+                rid_dir = f"previews/{job_id.hex}"
+                rel_path = f"{rid_dir}/preview.mp4"
+                write_placeholder_playlist(os.path.join(str(settings.MEDIA_ROOT), rid_dir))
+            else:
+                rel_path = f"previews/{job_id.hex}.mp4"
+            # FAST preview
+            job = enqueue_render(user=request.user, kind="video", mode="preview",
+                                 timeline=data_local, output_rel=rel_path, job_id=job_id, hls=hls,
+                                 stats={"localize": localize}, coalesce_key=key)
+            if coalesce:
+                superseded = supersede_previews(key, keep=job.pk)
+
+        rel_path = job.output_rel
+        playlist_url = _media_url_for(request, f"{os.path.dirname(rel_path)}/{HLS_PLAYLIST}") if job.hls else None
+        return Response({
+            "preview_url": _media_url_for(request, rel_path),
+            "playlist_url": playlist_url,
+            "shared": shared,
+            "superseded": superseded,
+            "window": {
+                "start": data.get("previewStart", 0.0),
+                "end": data.get("previewEnd", data.get("duration")),
+                "fps": data.get("previewFps", data.get("fps")),
+            },
+            "localize": localize,
+            **_job_links(request, job),
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class RenderSaveView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        full = _queue_full_response()
+        if full:
+            return full
+
         ser = TimelineSerializer(data=request.data)
         if not ser.is_valid():
             return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -266,7 +349,7 @@ class RenderSaveView(APIView):
         )
 
         try:
-            data_local = _localize_timeline_assets(request, data)
+            data_local, localize = _localize_timeline_assets(request, data)
             data_local["orientation"] = orientation
         except Exception as e:
             return Response({"error": f"Failed to localize assets: {e}"}, status=400)
@@ -276,6 +359,9 @@ class RenderSaveView(APIView):
         except Exception:
             duration = 0.0
 
+        if not _resolve_ffmpeg_bin():
+            return Response({"error": "ffmpeg not found. Configure FFMPEG_BIN or PATH."}, status=400)
+
         lc = LockedContent.objects.create(
             user=request.user,
             name=name,
@@ -285,47 +371,18 @@ class RenderSaveView(APIView):
             orientation=orientation,
         )
 
-        out_dir = _ensure_dir_inside_media("locked")
+        _ensure_dir_inside_media("locked")
         output_rel = f"locked/{lc.id}.mp4"
-        output_abs = os.path.join(out_dir, f"{lc.id}.mp4")
+        # QUALITY final; bulk exports may ask to yield to everything else
+        batch = str(getattr(request, "data", {}).get("priority") or "").lower() == "batch"
+        job = enqueue_render(user=request.user, kind="video", mode="final",
+                             timeline=data_local, output_rel=output_rel, locked=lc,
+                             stats={"localize": localize},
+                             priority=RenderJob.PRIORITY_BATCH if batch else None)
 
-        ffmpeg_bin = _resolve_ffmpeg_bin()
-        if not ffmpeg_bin:
-            lc.delete()
-            return Response({"error": "ffmpeg not found. Configure FFMPEG_BIN or PATH."}, status=400)
-
-        try:
-            # QUALITY final
-            args = build_ffmpeg_cmd(data_local, output_abs, mode="final")
-        except Exception as e:
-            lc.delete()
-            return Response({"error": f"Failed to build ffmpeg graph: {e}"}, status=400)
-
-        try:
-            subprocess.run(
-                [ffmpeg_bin, *args],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                check=True
-            )
-        except subprocess.CalledProcessError as e:
-            lc.delete()
-            return Response({"error": "ffmpeg failed", "stderr": e.stderr.decode("utf-8", errors="ignore")}, status=500)
-
-        lc.file.name = output_rel
-        lc.status = "saved"
-        lc.save(update_fields=["file", "status"])
-
-        return Response({
-            "id": lc.id,
-            "name": lc.name,
-            "type": lc.type,
-            "duration_seconds": lc.duration_seconds,
-            "status": lc.status,
-            "created_at": lc.created_at,
-            "file": lc.file.name,
-            "file_url": _media_url_for(request, output_rel),
-            "orientation": lc.orientation,
-        }, status=200)
+        return Response({**_locked_payload(request, lc, output_rel), "localize": localize,
+                         **_job_links(request, job)},
+                        status=status.HTTP_202_ACCEPTED)
 
 
 # --------------------------- IMAGE endpoints ---------------------------
@@ -334,6 +391,10 @@ class ImagePreviewView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        full = _queue_full_response()
+        if full:
+            return full
+
         ser = TimelineSerializer(data=request.data)
         if not ser.is_valid():
             return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -344,42 +405,36 @@ class ImagePreviewView(APIView):
         )
 
         try:
-            data_local = _localize_timeline_assets(request, data)
+            data_local, localize = _localize_timeline_assets(request, data)
             data_local["orientation"] = orientation
         except Exception as e:
             return Response({"error": f"Failed to localize assets: {e}"}, status=400)
 
-        rid = uuid.uuid4().hex
-        out_dir = _ensure_dir_inside_media("previews")
-        filename = f"{rid}.png"
-        output_path = os.path.join(out_dir, filename)
-
-        try:
-            args = build_ffmpeg_cmd_still(data_local, output_path, fmt="png")
-        except Exception as e:
-            return Response({"error": f"Failed to build still graph: {e}"}, status=400)
-
-        ffmpeg_bin = _resolve_ffmpeg_bin()
-        if not ffmpeg_bin:
+        if not _resolve_ffmpeg_bin():
             return Response({"error": "ffmpeg not found. Configure FFMPEG_BIN or PATH."}, status=400)
 
-        try:
-            subprocess.run(
-                [ffmpeg_bin, *args],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                check=True
-            )
-        except subprocess.CalledProcessError as e:
-            return Response({"error": "ffmpeg failed", "stderr": e.stderr.decode("utf-8", errors="ignore")}, status=500)
+        _ensure_dir_inside_media("previews")
+        job_id = uuid.uuid4()
+        rel_path = f"previews/{job_id.hex}.png"
+        job = enqueue_render(user=request.user, kind="image", mode="preview",
+                             timeline=data_local, output_rel=rel_path, job_id=job_id,
+                             stats={"localize": localize})
 
-        rel_path = f"previews/{filename}"
-        return Response({"preview_url": _media_url_for(request, rel_path), "render_id": rid}, status=200)
+        return Response({
+            "preview_url": _media_url_for(request, rel_path),
+            "localize": localize,
+            **_job_links(request, job),
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class ImageSaveView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        full = _queue_full_response()
+        if full:
+            return full
+
         ser = TimelineSerializer(data=request.data)
         if not ser.is_valid():
             return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -391,11 +446,14 @@ class ImageSaveView(APIView):
         )
 
         try:
-            data_local = _localize_timeline_assets(request, data)
+            data_local, localize = _localize_timeline_assets(request, data)
             data_local["orientation"] = orientation
         except Exception as e:
             return Response({"error": f"Failed to localize assets: {e}"}, status=400)
 
+        if not _resolve_ffmpeg_bin():
+            return Response({"error": "ffmpeg not found. Configure FFMPEG_BIN or PATH."}, status=400)
+
         lc = LockedContent.objects.create(
             user=request.user,
             name=name,
@@ -405,46 +463,179 @@ class ImageSaveView(APIView):
             orientation=orientation,
         )
 
-        out_dir = _ensure_dir_inside_media("locked")
+        _ensure_dir_inside_media("locked")
         output_rel = f"locked/{lc.id}.png"
-        output_abs = os.path.join(out_dir, f"{lc.id}.png")
+        job = enqueue_render(user=request.user, kind="image", mode="final",
+                             timeline=data_local, output_rel=output_rel, locked=lc,
+                             stats={"localize": localize})
+
+        return Response({**_locked_payload(request, lc, output_rel), "localize": localize,
+                         **_job_links(request, job)},
+                        status=status.HTTP_202_ACCEPTED)
 
-        ffmpeg_bin = _resolve_ffmpeg_bin()
-        if not ffmpeg_bin:
-            lc.delete()
-            return Response({"error": "ffmpeg not found. Configure FFMPEG_BIN or PATH."}, status=400)
+
+class RenderJobStatusView(APIView):
+    """
+    GET /api/render/jobs/<job_id> -> queued / running / done / failed / cancelled, with timings.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = RenderJob.objects.filter(pk=job_id, user=request.user).first()
+        if job is None:
+            return Response({"error": "Render job not found."}, status=404)
+        payload = job_status_payload(job)
+        payload["result_url"] = _media_url_for(request, job.output_rel) if job.status == "done" else None
+        if job.hls:
+            payload["playlist_url"] = _media_url_for(
+                request, f"{os.path.dirname(job.output_rel)}/{HLS_PLAYLIST}"
+            )
+        return Response(payload, status=200)
+
+
+_SSE_POLL_SECONDS = 0.5
+_SSE_RETRY_MS = 1000
+
+
+def _job_snapshot(job: RenderJob) -> dict:
+    payload = job_status_payload(job)
+    snapshot = {k: payload[k] for k in ("status", "progress", "fps", "speed", "eta_seconds", "error")}
+    snapshot["job_id"] = payload["job_id"]
+    return snapshot
+
+
+def _job_event_stream(job_id, max_wait: float, last_event_id: str = ""):
+    """
+    Long-poll over SSE: yields ONE event for the job, then closes. The event is a
+    `progress` (or final `done` / `failed` / `cancelled`) snapshot whose id differs
+    from last_event_id (EventSource sends the last id back as Last-Event-ID when it
+    reconnects, `retry` ms later). When nothing changes within max_wait seconds
+    the stream closes empty. A connection therefore holds a gunicorn worker for at
+    most max_wait, never for the whole render.
+    """
+    yield f"retry: {_SSE_RETRY_MS}\n\n"
+    deadline = time.monotonic() + max_wait
+    try:
+        while True:
+            job = RenderJob.objects.filter(pk=job_id).first()
+            if job is None:
+                yield "event: failed\ndata: {\"error\": \"Render job not found.\"}\n\n"
+                return
+            snapshot = _job_snapshot(job)
+            data = json.dumps(snapshot, sort_keys=True)
+            event_id = hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+            terminal = job.status in ("done", "failed", "cancelled")
+            # a terminal event is repeated to every reconnect: the client closes on it
+            if terminal or event_id != last_event_id:
+                event = job.status if terminal else "progress"
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+                return
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(_SSE_POLL_SECONDS)
+    finally:
+        close_old_connections()
+
+
+class _EventStreamRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept `Accept: text/event-stream` (what EventSource sends).
+    The stream itself is a StreamingHttpResponse; only error responses go through here.
+    """
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode(self.charset)
+
+
+class RenderJobEventsView(APIView):
+    """
+    GET /api/render/jobs/<job_id>/events -> text/event-stream of percent complete and ETA,
+    one event per connection (long-poll; EventSource reconnects and resumes from Last-Event-ID).
+    EventSource cannot send an Authorization header, so the JWT may also be passed as ?token=.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [QueryTokenJWTAuthentication]
+    renderer_classes = [JSONRenderer, _EventStreamRenderer]
+
+    def get(self, request, job_id):
+        if not RenderJob.objects.filter(pk=job_id, user=request.user).exists():
+            return Response({"error": "Render job not found."}, status=404)
+        max_wait = float(getattr(settings, "RENDER_PROGRESS_WAIT_SECONDS", 5))
+        last_event_id = request.headers.get("Last-Event-ID", "")
+        resp = StreamingHttpResponse(_job_event_stream(job_id, max_wait, last_event_id),
+                                     content_type="text/event-stream")
+        resp["Cache-Control"] = "no-cache"
+        resp["X-Accel-Buffering"] = "no"  # don't let a proxy buffer the stream
+        return resp
+
+
+class RenderExplainView(APIView):
+    """
+    POST /api/render/explain -> the plan, filtergraphs, applicable optimizations and
+    estimated CPU/wall seconds for a timeline, without rendering it.
+    Body: the timeline (with preview window fields in preview mode), plus "kind" ("video" | "image",
+    default video) and "mode" ("preview" | "final", default preview).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        raw = getattr(request, "data", {})
+        kind = str(raw.get("kind") or "video").lower()
+        mode = str(raw.get("mode") or "preview").lower()
+        if kind not in ("video", "image") or mode not in ("preview", "final"):
+            return Response({"error": "kind must be video|image and mode preview|final."}, status=400)
+
+        # final renders validate like the final endpoints: no preview window fields
+        serializer_class = TimelineSerializer if mode == "final" else PreviewSerializer
+        ser = serializer_class(data=request.data)
+        if not ser.is_valid():
+            return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = ser.validated_data
 
         try:
-            args = build_ffmpeg_cmd_still(data_local, output_abs, fmt="png")
+            data_local, localize = _localize_timeline_assets(request, data)
+            data_local["orientation"] = _sanitize_orientation(raw.get("orientation") or data.get("orientation"))
         except Exception as e:
-            lc.delete()
-            return Response({"error": f"Failed to build still graph: {e}"}, status=400)
+            return Response({"error": f"Failed to localize assets: {e}"}, status=400)
 
         try:
-            subprocess.run(
-                [ffmpeg_bin, *args],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                check=True
-            )
-        except subprocess.CalledProcessError as e:
-            lc.delete()
-            return Response({"error": "ffmpeg failed", "stderr": e.stderr.decode("utf-8", errors="ignore")}, status=500)
+            result = explain_render(data_local, kind, mode)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response({**result, "localize": localize}, status=200)
 
-        lc.file.name = output_rel
-        lc.status = "saved"
-        lc.save(update_fields=["file", "status"])
 
-        return Response({
-            "id": lc.id,
-            "name": lc.name,
-            "type": lc.type,
-            "duration_seconds": lc.duration_seconds,
-            "status": lc.status,
-            "created_at": lc.created_at,
-            "file": lc.file.name,
-            "file_url": _media_url_for(request, output_rel),
-            "orientation": lc.orientation,
-        }, status=200)
+class RenderCacheStatsView(APIView):
+    """
+    GET /api/render/cache/stats -> render result cache size and hit/miss/eviction counters.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(render_cache.stats(), status=200)
+
+
+class AssetCacheStatsView(APIView):
+    """
+    GET /api/render/cache/assets/stats -> shared remote asset cache size and hit/miss/eviction counters.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(asset_cache.stats(), status=200)
+
+
+class RenderQueueStatsView(APIView):
+    """
+    GET /api/render/queue/stats -> per-user queue depth, wait times, running jobs and fair-share usage.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(fairshare.queue_stats(), status=200)
 
 
 class LockedListView(APIView):